@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Dict, Optional
+from prometheus_client import Counter, Gauge
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import settings
+from app.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight_requests",
+    "Requests currently admitted, by route class",
+    ["route_class"]
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total",
+    "Requests shed with 503, by route class and reason",
+    ["route_class", "reason"]
+)
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """
+    At most `limit` concurrent requests; up to `queue` more wait at most
+    `timeout` seconds for a slot, anything beyond that is rejected at once.
+    """
+    def __init__(self, name: str, limit: int, queue: int, timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._waiters: deque = deque()
+
+    async def acquire(self):
+        if self.active < self.limit and self.waiting == 0:
+            self.active += 1
+            return
+        if self.waiting >= self.queue:
+            raise AdmissionRejected("queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled():
+                # Granted just as the wait timed out: take the slot after all
+                return
+            future.cancel()
+            raise AdmissionRejected("timeout")
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            future.cancel()
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self):
+        # Hand the slot straight to the oldest waiter still waiting
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def status(self) -> Dict[str, int]:
+        return {"limit": self.limit, "queue": self.queue, "active": self.active, "waiting": self.waiting}
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Budget a request is admitted under; None for requests that are never shed"""
+    if method == "OPTIONS" or path in ("/health", "/metrics"):
+        return None
+    if path.endswith("/export"):
+        return "export"
+    if path.startswith("/admin"):
+        return None
+    if path.endswith("/events"):
+        return "events"
+    if method == "POST" and (
+        path.startswith(("/airfare/search/", "/jobs/"))
+        or (path.startswith("/watches/") and path.endswith("/check"))
+    ):
+        return "search"
+    return "default"
+
+
+limiters = {
+    "search": AdmissionLimiter(
+        "search", settings.admission_search_limit, settings.admission_search_queue,
+        settings.admission_queue_timeout_seconds
+    ),
+    "export": AdmissionLimiter(
+        "export", settings.admission_export_limit, settings.admission_export_queue,
+        settings.admission_queue_timeout_seconds
+    ),
+    # Long-lived streams: no point queueing for a slot
+    "events": AdmissionLimiter("events", settings.admission_events_limit, 0, 0),
+    "default": AdmissionLimiter(
+        "default", settings.admission_default_limit, settings.admission_default_queue,
+        settings.admission_queue_timeout_seconds
+    )
+}
+
+
+def admission_status() -> Dict[str, Dict[str, int]]:
+    return {name: limiter.status() for name, limiter in limiters.items()}
+
+
+class AdmissionMiddleware:
+    """
+    Concurrency limits per route class (pure ASGI, so streamed responses keep
+    their slot until the body is sent).
+
+    Upstream-bound searches, exports, SSE streams and everything else (trips,
+    history, locations, ...) each get their own limiter, so a pile-up of slow
+    searches cannot starve the cheap endpoints. Requests that find their
+    class saturated wait briefly in a bounded queue and are otherwise shed
+    with 503 and Retry-After. /health, /metrics and /admin are never limited.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if name is None or not settings.admission_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[name]
+        start = time.perf_counter()
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            ADMISSION_REJECTED.labels(name, e.reason).inc()
+            logger.debug("shed %s %s (%s, %s)", scope["method"], scope["path"], name, e.reason)
+            await self._reject(send)
+            return
+        record_stage("admission", time.perf_counter() - start)
+
+        ADMISSION_IN_FLIGHT.labels(name).inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            ADMISSION_IN_FLIGHT.labels(name).dec()
+            limiter.release()
+
+    async def _reject(self, send: Send):
+        body = json.dumps({"detail": "Server is busy, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.admission_retry_after_seconds).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
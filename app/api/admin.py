@@ -0,0 +1,122 @@
+import asyncio
+import hmac
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import PlainTextResponse
+from typing import Literal, Optional
+from app.admission import admission_status
+from app.api.airfare import export_response
+from app.config import settings
+from app.database import db
+from app.metrics import slow_queries, slow_requests, slowest
+from app.services.payloads import storage_report
+from app.services.profiler import profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Allow the request only with the configured X-Admin-Token"""
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token"
+        )
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(default=10.0, gt=0),
+    interval_ms: float = Query(default=5.0, ge=1, le=1000)
+):
+    """
+    Sample all threads for `seconds` and return collapsed stacks
+    (feed to flamegraph.pl or load into speedscope)
+    """
+    if seconds > settings.profiler_max_seconds:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.profiler_max_seconds}"
+        )
+    try:
+        profiler.start(seconds, interval_ms / 1000)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    # Sleep on the event loop so the requests being profiled keep running
+    while profiler.running:
+        await asyncio.sleep(0.1)
+    return PlainTextResponse(
+        profiler.folded(),
+        headers={"Content-Disposition": "attachment; filename=profile.folded"}
+    )
+
+
+@router.get("/profile/status")
+async def profile_status():
+    """State of the current or last profiling run"""
+    return profiler.status()
+
+
+@router.get("/slow-requests")
+async def get_slow_requests(limit: int = Query(default=50, ge=1, le=1000)):
+    """Slowest recently captured requests with their per-stage breakdown"""
+    return {
+        "threshold_ms": settings.slow_request_threshold_ms,
+        "requests": slowest(slow_requests, limit)
+    }
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(limit: int = Query(default=50, ge=1, le=1000)):
+    """Slowest recently captured DuckDB statements"""
+    return {
+        "threshold_ms": settings.slow_query_threshold_ms,
+        "queries": slowest(slow_queries, limit)
+    }
+
+
+@router.get("/storage")
+async def storage_status():
+    """Search payload storage: logical vs compressed bytes, and rows not yet migrated"""
+    return storage_report(db.connect())
+
+
+@router.get("/admission")
+async def admission():
+    """Per-route-class concurrency limits: active and queued requests"""
+    return admission_status()
+
+
+@router.get("/prefetch")
+async def prefetch_status(request: Request):
+    """Popular routes currently kept warm by the prefetch scheduler"""
+    return request.app.state.prefetcher.status()
+
+
+@router.get("/retention")
+async def retention_status(request: Request):
+    """Search archival: configured age, last run and totals moved to Parquet"""
+    return request.app.state.retention.status()
+
+
+@router.post("/retention/run")
+async def run_retention(request: Request, days: Optional[int] = Query(default=None, ge=0)):
+    """Archive searches older than `days` (default RETENTION_DAYS) now"""
+    return await request.app.state.retention.run_once(days)
+
+
+@router.get("/export")
+async def export_all_searches(
+    export_format: Literal["ndjson", "arrow", "parquet"] = Query("parquet", alias="format"),
+    user_id: Optional[int] = None
+):
+    """Stream every user's search history (or one user's) with results"""
+    return export_response(export_format, user_id=user_id)
@@ -1,50 +1,167 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Request
 from fastapi.exceptions import RequestValidationError
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
 from app.models import (
     AirfareSearchOneWay,
     AirfareSearchReturn,
     AirfareSearchMultiCity,
     AirfareSearchResponse,
+    BatchSearchItem,
+    BatchSearchRequest,
     FlightSegment
 )
+from app.config import settings
 from app.database import db
+from app.log import sampled
+from app.metrics import stage
 from app.services.amadeus import AmadeusService
+from app.services.export import EXTENSIONS, MEDIA_TYPES, export_stream
+from app.services.flight_filters import FlightQuery, apply_to_results
+from app.services.itinerary import optimize_multi_city
+from app.services.locations import location_index
+from app.services.payloads import decode_payload, store_payload, store_payloads
+import asyncio
 import json
-from datetime import date
+import logging
+from datetime import date, time
 
 router = APIRouter(prefix="/airfare", tags=["airfare"])
 amadeus = AmadeusService()
+logger = logging.getLogger(__name__)
 
 # Temporary: Get default user ID for unauthenticated requests
 def get_default_user_id() -> int:
     """Get default user ID for unauthenticated requests"""
-    conn = db.connect()
-    result = conn.execute("SELECT id FROM users LIMIT 1").fetchone()
-    if result:
-        return result[0]
-    # Create anonymous user if none exists
-    conn.execute(
-        "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-        ["anonymous", "anonymous@example.com", "no_password"]
+    with stage("auth"):
+        conn = db.connect()
+        result = conn.execute("SELECT id FROM users LIMIT 1").fetchone()
+        if result:
+            return result[0]
+        # Create anonymous user if none exists
+        conn.execute(
+            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+            ["anonymous", "anonymous@example.com", "no_password"]
+        )
+        conn.commit()
+        result = conn.execute("SELECT id FROM users WHERE username = 'anonymous'").fetchone()
+        return result[0] if result else 1
+
+
+def _loads(blob: str):
+    with stage("serialize"):
+        return json.loads(blob)
+
+
+# Multi-city segments come back as one ordered list per search (NULL for other search types)
+_SEGMENTS_FIELD = """
+    (SELECT list(struct_pack(origin := m.origin, destination := m.destination, departure_date := m.departure_date)
+                 ORDER BY m.segment_order)
+     FROM multi_city_segments m WHERE m.airfare_search_id = s.id)
+"""
+# Full rows join the compressed results; they are only decompressed in _search_row_to_dict
+_SEARCH_FIELDS = f"""
+    s.id, s.trip_id, s.search_type, s.origin, s.destination, s.departure_date, s.return_date,
+    s.passengers, s.search_results, s.created_at, p.codec, p.payload, {_SEGMENTS_FIELD}
+"""
+_SEARCH_SUMMARY_FIELDS = f"""
+    s.id, s.trip_id, s.search_type, s.origin, s.destination, s.departure_date, s.return_date,
+    s.passengers, NULL, s.created_at, NULL, NULL, {_SEGMENTS_FIELD}
+"""
+_SEARCH_FROM = "airfare_searches s LEFT JOIN search_payloads p ON p.hash = s.results_hash"
+
+
+def _search_row_to_dict(row: tuple, query: Optional[FlightQuery] = None, search_results=None) -> dict:
+    """
+    Convert an airfare_searches row (_SEARCH_FIELDS) into the API response shape.
+    Pass search_results when they are still in memory to skip decompressing the stored copy.
+    """
+    if search_results is None:
+        if row[11] is not None:
+            search_results = decode_payload(row[10], row[11])
+        elif row[8]:
+            # Inline JSON of rows not yet moved to search_payloads
+            search_results = _loads(row[8])
+    if search_results is not None and query is not None:
+        search_results = apply_to_results(search_results, query)
+    return {
+        "id": row[0],
+        "trip_id": row[1],
+        "search_type": row[2],
+        "origin": row[3],
+        "destination": row[4],
+        "departure_date": row[5],
+        "return_date": row[6],
+        "passengers": row[7],
+        "search_results": search_results,
+        "created_at": row[9],
+        "segments": row[12]
+    }
+
+
+def _airline_codes(value: Optional[str]) -> Optional[set]:
+    if not value:
+        return None
+    return {code.strip().upper() for code in value.split(",") if code.strip()}
+
+
+def flight_query_params(
+    max_stops: Optional[int] = Query(None, ge=0, description="Maximum number of stops"),
+    airlines: Optional[str] = Query(None, description="Comma-separated carrier codes to include, e.g. 'BA,AA'"),
+    exclude_airlines: Optional[str] = Query(None, description="Comma-separated carrier codes to exclude"),
+    depart_after: Optional[time] = Query(None, description="Earliest departure time of day (HH:MM)"),
+    depart_before: Optional[time] = Query(None, description="Latest departure time of day (HH:MM)"),
+    arrive_after: Optional[time] = Query(None, description="Earliest arrival time of day (HH:MM)"),
+    arrive_before: Optional[time] = Query(None, description="Latest arrival time of day (HH:MM)"),
+    max_duration: Optional[int] = Query(None, ge=1, description="Maximum duration in minutes"),
+    sort: Literal["price", "duration", "departure", "best"] = Query(
+        "price", description="'best' ranks by price-vs-duration Pareto frontier"
+    ),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Number of flights to return per list"),
+    offset: int = Query(0, ge=0)
+) -> FlightQuery:
+    """Filter/sort/paging query parameters shared by search and history endpoints"""
+    return FlightQuery(
+        max_stops=max_stops,
+        airlines=_airline_codes(airlines),
+        exclude_airlines=_airline_codes(exclude_airlines),
+        depart_after=depart_after,
+        depart_before=depart_before,
+        arrive_after=arrive_after,
+        arrive_before=arrive_before,
+        max_duration_minutes=max_duration,
+        sort=sort,
+        limit=limit,
+        offset=offset
     )
-    conn.commit()
-    result = conn.execute("SELECT id FROM users WHERE username = 'anonymous'").fetchone()
-    return result[0] if result else 1
 
 
 @router.post("/search/one-way")
 async def search_one_way(
     search: AirfareSearchOneWay,
-    trip_id: Optional[int] = None
+    trip_id: Optional[int] = None,
+    nearby: bool = False,
+    query: FlightQuery = Depends(flight_query_params)
 ):
-    """Search for one-way flights"""
+    """Search for one-way flights (set nearby=true to cover all metro-area airports)"""
     try:
-        # Log the search request for debugging
-        print(f"Search request: origin={search.origin}, destination={search.destination}, date={search.departure_date}, passengers={search.passengers}")
+        # Resolve city names to IATA codes before any upstream call
+        search.origin = location_index.resolve(search.origin)
+        search.destination = location_index.resolve(search.destination)
+        
+        if logger.isEnabledFor(logging.INFO) and sampled(settings.log_sample_rate):
+            logger.info("search request", extra={
+                "search_type": "one-way",
+                "origin": search.origin,
+                "destination": search.destination,
+                "departure_date": search.departure_date,
+                "passengers": search.passengers,
+                "nearby": nearby
+            })
         
         # Search flights
-        flights = await amadeus.search_flights(
+        search_fn = amadeus.search_nearby if nearby else amadeus.search_flights
+        flights = await search_fn(
             origin=search.origin,
             destination=search.destination,
             departure_date=search.departure_date,
@@ -54,18 +171,15 @@ async def search_one_way(
     except ValueError as e:
         # Amadeus API connection or validation errors
         error_msg = str(e)
-        print(f"Amadeus API error: {error_msg}")
+        logger.warning("flight search rejected: %s", error_msg)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=error_msg
         )
     except Exception as e:
         # Other unexpected errors
-        import traceback
-        error_trace = traceback.format_exc()
         error_msg = f"Flight search failed: {str(e)}"
-        print(f"Unexpected error: {error_msg}")
-        print(f"Traceback:\n{error_trace}")
+        logger.exception("flight search failed")
         # Return more detailed error in development
         detail_msg = error_msg
         if "detail" in str(e).lower() or "error" in str(e).lower():
@@ -81,8 +195,9 @@ async def search_one_way(
         conn.execute(
             """
             INSERT INTO airfare_searches 
-            (trip_id, user_id, search_type, origin, destination, departure_date, passengers, search_results)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            (trip_id, user_id, search_type, origin, destination, departure_date, passengers, results_hash,
+             cabin_class, nearby)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             [
                 trip_id,
@@ -92,47 +207,34 @@ async def search_one_way(
                 search.destination,
                 str(search.departure_date),  # Convert date to string
                 search.passengers,
-                json.dumps(flights)
+                store_payload(conn, flights),
+                (search.cabin_class or "economy").upper(),
+                nearby
             ]
         )
         
         conn.commit()
     except Exception as db_error:
-        print(f"Database error: {db_error}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("failed to save search: %s", db_error)
         # Continue even if database save fails - return the search results
         pass
     
     # Get the created search (or return results directly if DB save failed)
     try:
         result = conn.execute(
-            """
-            SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
-            FROM airfare_searches 
-            WHERE user_id = ? AND origin = ? AND destination = ? AND departure_date = ?
-            ORDER BY created_at DESC LIMIT 1
+            f"""
+            SELECT {_SEARCH_SUMMARY_FIELDS}
+            FROM {_SEARCH_FROM}
+            WHERE s.user_id = ? AND s.origin = ? AND s.destination = ? AND s.departure_date = ?
+            ORDER BY s.created_at DESC LIMIT 1
             """,
             [get_default_user_id(), search.origin, search.destination, str(search.departure_date)]
         ).fetchone()
         
         if result:
-            return {
-                "id": result[0],
-                "trip_id": result[1],
-                "search_type": result[2],
-                "origin": result[3],
-                "destination": result[4],
-                "departure_date": result[5],
-                "return_date": result[6],
-                "passengers": result[7],
-                "search_results": json.loads(result[8]) if result[8] else None,
-                "created_at": result[9]
-            }
+            return _search_row_to_dict(result, query, flights)
     except Exception as db_error:
-        print(f"Database query error: {db_error}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("failed to load saved search: %s", db_error)
         # Fall through to return results directly
     
     # Return results directly if database operations failed
@@ -145,7 +247,7 @@ async def search_one_way(
         "departure_date": str(search.departure_date),
         "return_date": None,
         "passengers": search.passengers,
-        "search_results": flights,
+        "search_results": apply_to_results(flights, query),
         "created_at": None
     }
 
@@ -153,12 +255,19 @@ async def search_one_way(
 @router.post("/search/return")
 async def search_return(
     search: AirfareSearchReturn,
-    trip_id: Optional[int] = None
+    trip_id: Optional[int] = None,
+    nearby: bool = False,
+    query: FlightQuery = Depends(flight_query_params)
 ):
-    """Search for return flights"""
+    """Search for return flights (set nearby=true to cover all metro-area airports)"""
     try:
+        # Resolve city names to IATA codes before any upstream call
+        search.origin = location_index.resolve(search.origin)
+        search.destination = location_index.resolve(search.destination)
+        
         # Search flights
-        flights = await amadeus.search_flights(
+        search_fn = amadeus.search_nearby if nearby else amadeus.search_flights
+        flights = await search_fn(
             origin=search.origin,
             destination=search.destination,
             departure_date=search.departure_date,
@@ -184,8 +293,9 @@ async def search_return(
     conn.execute(
         """
         INSERT INTO airfare_searches 
-        (trip_id, user_id, search_type, origin, destination, departure_date, return_date, passengers, search_results)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        (trip_id, user_id, search_type, origin, destination, departure_date, return_date, passengers, results_hash,
+         cabin_class, nearby)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         [
             trip_id,
@@ -196,7 +306,9 @@ async def search_return(
             search.departure_date,
             search.return_date,
             search.passengers,
-            json.dumps(flights)
+            store_payload(conn, flights),
+            (search.cabin_class or "economy").upper(),
+            nearby
         ]
     )
     
@@ -204,11 +316,11 @@ async def search_return(
     
     # Get the created search
     result = conn.execute(
-        """
-        SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
-        FROM airfare_searches 
-        WHERE user_id = ? AND origin = ? AND destination = ? AND departure_date = ? AND return_date = ?
-        ORDER BY created_at DESC LIMIT 1
+        f"""
+        SELECT {_SEARCH_SUMMARY_FIELDS}
+        FROM {_SEARCH_FROM}
+        WHERE s.user_id = ? AND s.origin = ? AND s.destination = ? AND s.departure_date = ? AND s.return_date = ?
+        ORDER BY s.created_at DESC LIMIT 1
         """,
         [get_default_user_id(), search.origin, search.destination, search.departure_date, search.return_date]
     ).fetchone()
@@ -219,27 +331,212 @@ async def search_return(
             detail="Failed to save search"
         )
     
-    return {
-        "id": result[0],
-        "trip_id": result[1],
-        "search_type": result[2],
-        "origin": result[3],
-        "destination": result[4],
-        "departure_date": result[5],
-        "return_date": result[6],
-        "passengers": result[7],
-        "search_results": json.loads(result[8]) if result[8] else None,
-        "created_at": result[9]
-    }
+    return _search_row_to_dict(result, query, flights)
+
+
+@router.post("/search/batch", response_model=List[BatchSearchItem])
+async def search_batch(
+    batch: BatchSearchRequest,
+    nearby: bool = False,
+    query: FlightQuery = Depends(flight_query_params)
+):
+    """
+    Run many one-way/return searches in one request.
+    Identical queries are searched once; unique queries run concurrently through the
+    search cache and upstream rate limiter, and all results are saved in a single
+    transaction. Returns one item per query, in request order, with its own status.
+    """
+    if len(batch.searches) > settings.batch_max_searches:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch can contain at most {settings.batch_max_searches} searches"
+        )
+    
+    items: List[dict] = [{"index": i, "status_code": 200} for i in range(len(batch.searches))]
+    first_index: dict = {}  # query key -> index of its first occurrence
+    unique = []
+    for i, search in enumerate(batch.searches):
+        return_date = getattr(search, "return_date", None)
+        try:
+            origin = location_index.resolve(search.origin)
+            destination = location_index.resolve(search.destination)
+            if return_date and return_date < search.departure_date:
+                raise ValueError("return_date must not be before departure_date")
+        except ValueError as e:
+            items[i].update(status_code=status.HTTP_400_BAD_REQUEST, error=str(e))
+            continue
+        key = (
+            origin,
+            destination,
+            search.departure_date,
+            return_date,
+            search.passengers,
+            (search.cabin_class or "economy").upper()
+        )
+        if key in first_index:
+            items[i]["duplicate_of"] = first_index[key]
+        else:
+            first_index[key] = i
+            unique.append((i, key))
+    
+    semaphore = asyncio.Semaphore(settings.amadeus_max_concurrency)
+    search_fn = amadeus.search_nearby if nearby else amadeus.search_flights
+    
+    async def run(key: tuple):
+        origin, destination, departure_date, return_date, passengers, cabin_class = key
+        async with semaphore:
+            return await search_fn(
+                origin=origin,
+                destination=destination,
+                departure_date=departure_date,
+                return_date=return_date,
+                passengers=passengers,
+                cabin_class=cabin_class
+            )
+    
+    outcomes = await asyncio.gather(*(run(key) for _, key in unique), return_exceptions=True)
+    
+    succeeded = []
+    for (i, key), outcome in zip(unique, outcomes):
+        if isinstance(outcome, ValueError):
+            items[i].update(status_code=status.HTTP_400_BAD_REQUEST, error=str(outcome))
+        elif isinstance(outcome, BaseException):
+            logger.error("batch search item failed", exc_info=outcome)
+            items[i].update(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, error=f"Flight search failed: {outcome}")
+        else:
+            succeeded.append((i, key, outcome))
+    
+    if succeeded:
+        conn = db.connect()
+        user_id = get_default_user_id()
+        # Reserve ids up front so a single executemany can insert every row
+        ids = [
+            row[0] for row in conn.execute(
+                "SELECT nextval('airfare_searches_id_seq') FROM range(?)",
+                [len(succeeded)]
+            ).fetchall()
+        ]
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            hashes = store_payloads(conn, (flights for _, _, flights in succeeded))
+            conn.executemany(
+                """
+                INSERT INTO airfare_searches
+                (id, trip_id, user_id, search_type, origin, destination, departure_date, return_date, passengers, results_hash,
+                 cabin_class, nearby)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    [
+                        search_id,
+                        batch.trip_id,
+                        user_id,
+                        "return" if key[3] else "one-way",
+                        key[0],
+                        key[1],
+                        key[2],
+                        key[3],
+                        key[4],
+                        results_hash,
+                        key[5],
+                        nearby
+                    ]
+                    for search_id, results_hash, (_, key, _) in zip(ids, hashes, succeeded)
+                ]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        
+        # Only created_at is needed back; results are already in memory
+        placeholders = ", ".join("?" for _ in ids)
+        created = dict(conn.execute(
+            f"SELECT id, created_at FROM airfare_searches WHERE id IN ({placeholders})",
+            ids
+        ).fetchall())
+        for search_id, (i, key, flights) in zip(ids, succeeded):
+            items[i]["search"] = {
+                "id": search_id,
+                "trip_id": batch.trip_id,
+                "search_type": "return" if key[3] else "one-way",
+                "origin": key[0],
+                "destination": key[1],
+                "departure_date": key[2],
+                "return_date": key[3],
+                "passengers": key[4],
+                "search_results": apply_to_results(flights, query),
+                "created_at": created[search_id]
+            }
+    
+    # Duplicates share the outcome of their first occurrence
+    for item in items:
+        original = item.get("duplicate_of")
+        if original is not None:
+            first = items[original]
+            item.update(status_code=first["status_code"], search=first.get("search"), error=first.get("error"))
+    
+    return items
+
+
+def save_multi_city_search(search: AirfareSearchMultiCity, trip_id: Optional[int], all_segments: list) -> int:
+    """Persist a multi-city search and its segments in one transaction; returns the airfare_searches id"""
+    conn = db.connect()
+    user_id = get_default_user_id()
+    
+    conn.execute("BEGIN TRANSACTION")
+    try:
+        # First origin and last destination summarise the route on the search row
+        search_id = conn.execute(
+            """
+            INSERT INTO airfare_searches 
+            (trip_id, user_id, search_type, origin, destination, departure_date, passengers, results_hash)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            RETURNING id
+            """,
+            [
+                trip_id,
+                user_id,
+                "multi-city",
+                search.segments[0].origin,
+                search.segments[-1].destination,
+                search.segments[0].departure_date,
+                search.passengers,
+                store_payload(conn, all_segments)
+            ]
+        ).fetchone()[0]
+        conn.executemany(
+            """
+            INSERT INTO multi_city_segments 
+            (airfare_search_id, segment_order, origin, destination, departure_date)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [
+                [search_id, idx + 1, segment.origin, segment.destination, segment.departure_date]
+                for idx, segment in enumerate(search.segments)
+            ]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return search_id
 
 
 @router.post("/search/multi-city")
 async def search_multi_city(
     search: AirfareSearchMultiCity,
-    trip_id: Optional[int] = None
+    trip_id: Optional[int] = None,
+    optimize: bool = False,
+    query: FlightQuery = Depends(flight_query_params)
 ):
-    """Search for multi-city flights"""
+    """Search for multi-city flights (set optimize=true to also get the cheapest full itineraries)"""
     try:
+        # Resolve city names to IATA codes before any upstream call
+        for seg in search.segments:
+            seg.origin = location_index.resolve(seg.origin)
+            seg.destination = location_index.resolve(seg.destination)
+        
         # Convert segments to dict format
         segments_dict = [
             {
@@ -269,151 +566,87 @@ async def search_multi_city(
             detail=f"Flight search failed: {str(e)}"
         )
     
-    # Save search to database
+    search_id = save_multi_city_search(search, trip_id, all_segments)
     conn = db.connect()
     
-    # Get first and last locations for main search record
-    origin = search.segments[0].origin
-    destination = search.segments[-1].destination
-    
-    conn.execute(
-        """
-        INSERT INTO airfare_searches 
-        (trip_id, user_id, search_type, origin, destination, departure_date, passengers, search_results)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """,
-        [
-            trip_id,
-            get_default_user_id(),
-            "multi-city",
-            origin,
-            destination,
-            search.segments[0].departure_date,
-            search.passengers,
-            json.dumps(all_segments)
-        ]
-    )
-    
-    conn.commit()
-    
-    # Get the created search ID
-    result = conn.execute(
-        """
-        SELECT id FROM airfare_searches 
-        WHERE user_id = ? AND origin = ? AND destination = ? AND departure_date = ? AND search_type = 'multi-city'
-        ORDER BY created_at DESC LIMIT 1
-        """,
-        [get_default_user_id(), origin, destination, search.segments[0].departure_date]
-    ).fetchone()
-    
-    if not result:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to save search"
-        )
-    
-    search_id = result[0]
-    
-    # Save individual segments
-    for idx, segment in enumerate(search.segments):
-        conn.execute(
-            """
-            INSERT INTO multi_city_segments 
-            (airfare_search_id, segment_order, origin, destination, departure_date)
-            VALUES (?, ?, ?, ?, ?)
-            """,
-            [
-                search_id,
-                idx + 1,
-                segment.origin,
-                segment.destination,
-                segment.departure_date
-            ]
-        )
-    
-    conn.commit()
-    
-    # Fetch complete record
+    # Fetch the saved record; the results are still in memory
     result = conn.execute(
-        """
-        SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
-        FROM airfare_searches WHERE id = ?
-        """,
+        f"SELECT {_SEARCH_SUMMARY_FIELDS} FROM {_SEARCH_FROM} WHERE s.id = ?",
         [search_id]
     ).fetchone()
     
-    return {
-        "id": result[0],
-        "trip_id": result[1],
-        "search_type": result[2],
-        "origin": result[3],
-        "destination": result[4],
-        "departure_date": result[5],
-        "return_date": result[6],
-        "passengers": result[7],
-        "search_results": json.loads(result[8]) if result[8] else None,
-        "created_at": result[9]
-    }
+    response = _search_row_to_dict(result, query, all_segments)
+    if optimize:
+        response["itineraries"] = optimize_multi_city(all_segments)
+    return response
 
 
 @router.get("/searches", response_model=List[AirfareSearchResponse])
 async def get_search_history(
-    trip_id: Optional[int] = None
+    trip_id: Optional[int] = None,
+    include_results: bool = Query(False, description="Also decompress and return each search's results"),
+    query: FlightQuery = Depends(flight_query_params)
 ):
-    """Get airfare search history"""
+    """Get airfare search history (results are left out unless include_results=true)"""
     conn = db.connect()
     user_id = get_default_user_id()
+    fields = _SEARCH_FIELDS if include_results else _SEARCH_SUMMARY_FIELDS
     
     if trip_id:
         results = conn.execute(
-            """
-            SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
-            FROM airfare_searches 
-            WHERE user_id = ? AND trip_id = ?
-            ORDER BY created_at DESC
+            f"""
+            SELECT {fields}
+            FROM {_SEARCH_FROM}
+            WHERE s.user_id = ? AND s.trip_id = ?
+            ORDER BY s.created_at DESC
             """,
             [user_id, trip_id]
         ).fetchall()
     else:
         results = conn.execute(
-            """
-            SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
-            FROM airfare_searches 
-            WHERE user_id = ?
-            ORDER BY created_at DESC
+            f"""
+            SELECT {fields}
+            FROM {_SEARCH_FROM}
+            WHERE s.user_id = ?
+            ORDER BY s.created_at DESC
             """,
             [user_id]
         ).fetchall()
     
-    return [
-        {
-            "id": row[0],
-            "trip_id": row[1],
-            "search_type": row[2],
-            "origin": row[3],
-            "destination": row[4],
-            "departure_date": row[5],
-            "return_date": row[6],
-            "passengers": row[7],
-            "search_results": json.loads(row[8]) if row[8] else None,
-            "created_at": row[9]
-        }
-        for row in results
-    ]
+    return [_search_row_to_dict(row, query) for row in results]
+
+
+def export_response(fmt: str, user_id: Optional[int] = None, trip_id: Optional[int] = None) -> StreamingResponse:
+    """Stream an export; the generator runs in the threadpool so DuckDB reads don't block the loop"""
+    return StreamingResponse(
+        export_stream(fmt, user_id=user_id, trip_id=trip_id),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="searches.{EXTENSIONS[fmt]}"'}
+    )
+
+
+@router.get("/searches/export")
+async def export_search_history(
+    export_format: Literal["ndjson", "arrow", "parquet"] = Query("ndjson", alias="format"),
+    trip_id: Optional[int] = None
+):
+    """Stream the full search history with results as NDJSON, Arrow IPC stream or Parquet"""
+    return export_response(export_format, user_id=get_default_user_id(), trip_id=trip_id)
 
 
 @router.get("/searches/{search_id}", response_model=AirfareSearchResponse)
 async def get_search(
-    search_id: int
+    search_id: int,
+    query: FlightQuery = Depends(flight_query_params)
 ):
     """Get a specific airfare search"""
     conn = db.connect()
     user_id = get_default_user_id()
     result = conn.execute(
-        """
-        SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
-        FROM airfare_searches 
-        WHERE id = ? AND user_id = ?
+        f"""
+        SELECT {_SEARCH_FIELDS}
+        FROM {_SEARCH_FROM}
+        WHERE s.id = ? AND s.user_id = ?
         """,
         [search_id, user_id]
     ).fetchone()
@@ -424,16 +657,49 @@ async def get_search(
             detail="Search not found"
         )
     
-    return {
-        "id": result[0],
-        "trip_id": result[1],
-        "search_type": result[2],
-        "origin": result[3],
-        "destination": result[4],
-        "departure_date": result[5],
-        "return_date": result[6],
-        "passengers": result[7],
-        "search_results": json.loads(result[8]) if result[8] else None,
-        "created_at": result[9]
-    }
+    return _search_row_to_dict(result, query)
+
+
 
+@router.get("/searches/{search_id}/itineraries")
+async def get_multi_city_itineraries(
+    search_id: int,
+    k: int = Query(10, ge=1, le=100, description="Number of itineraries to return"),
+    objective: Literal["price", "duration"] = "price",
+    min_connection: Optional[int] = Query(None, ge=0, description="Minimum connection time in minutes"),
+    same_day: bool = Query(True, description="Each leg must depart on its segment's requested date")
+):
+    """Get the top-k full itineraries for a stored multi-city search"""
+    conn = db.connect()
+    user_id = get_default_user_id()
+    result = conn.execute(
+        f"""
+        SELECT s.search_type, s.search_results, p.codec, p.payload
+        FROM {_SEARCH_FROM}
+        WHERE s.id = ? AND s.user_id = ?
+        """,
+        [search_id, user_id]
+    ).fetchone()
+    
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Search not found"
+        )
+    if result[0] != "multi-city":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Itinerary optimization is only available for multi-city searches"
+        )
+    
+    if result[3] is not None:
+        segments = decode_payload(result[2], result[3])
+    else:
+        segments = _loads(result[1]) if result[1] else []
+    return optimize_multi_city(
+        segments,
+        k=k,
+        objective=objective,
+        min_connection_minutes=min_connection,
+        same_day=same_day
+    )
@@ -0,0 +1,227 @@
+import asyncio
+import json
+from datetime import date, timedelta
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, List, Optional
+from app.models import AirfareSearchMultiCity, CalendarSearch, SearchJobResponse
+from app.config import settings
+from app.api.airfare import amadeus, save_multi_city_search
+from app.api.trips import get_default_user_id
+from app.lifecycle import lifecycle
+from app.services.itinerary import optimize_multi_city
+from app.services.jobs import TERMINAL_STATUSES, Job, JobQueueFull, job_runner
+from app.services.locations import location_index
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+async def run_multi_city(job: Job) -> Dict[str, Any]:
+    """Multi-city search; each finished segment is reported as a partial result"""
+    search = AirfareSearchMultiCity(**job.request["search"])
+    for seg in search.segments:
+        seg.origin = location_index.resolve(seg.origin)
+        seg.destination = location_index.resolve(seg.destination)
+    segments = [
+        {"origin": seg.origin, "destination": seg.destination, "departure_date": seg.departure_date}
+        for seg in search.segments
+    ]
+    all_segments = await amadeus.search_multi_city(
+        segments=segments,
+        passengers=search.passengers,
+        cabin_class=search.cabin_class or "economy",
+        on_segment=lambda found: job.report(len(found), len(segments), found[-1])
+    )
+    job.search_id = save_multi_city_search(search, job.request.get("trip_id"), all_segments)
+    result: Dict[str, Any] = {"search_id": job.search_id, "segments": all_segments}
+    if job.request.get("optimize"):
+        result["itineraries"] = optimize_multi_city(all_segments)
+    return result
+
+
+def _cheapest(results: Any) -> Optional[Dict[str, Any]]:
+    if isinstance(results, dict):
+        offers = results.get("itineraries") or results.get("outbound") or []
+    else:
+        offers = results or []
+    return min(offers, key=lambda offer: offer["price"], default=None)
+
+
+async def run_calendar(job: Job) -> Dict[str, Any]:
+    """Cheapest fare per departure date; dates are searched concurrently and reported as they finish"""
+    search = CalendarSearch(**job.request["search"])
+    origin = location_index.resolve(search.origin)
+    destination = location_index.resolve(search.destination)
+    days = (search.end_date - search.start_date).days + 1
+    dates = [search.start_date + timedelta(days=i) for i in range(days)]
+    semaphore = asyncio.Semaphore(settings.amadeus_max_concurrency)
+
+    async def search_date(departure_date: date) -> Dict[str, Any]:
+        return_date = None
+        if search.trip_length_days:
+            return_date = departure_date + timedelta(days=search.trip_length_days)
+        entry: Dict[str, Any] = {"departure_date": departure_date, "return_date": return_date}
+        async with semaphore:
+            try:
+                results = await amadeus.search_flights(
+                    origin=origin,
+                    destination=destination,
+                    departure_date=departure_date,
+                    return_date=return_date,
+                    passengers=search.passengers,
+                    cabin_class=search.cabin_class or "economy"
+                )
+            except ValueError as e:
+                entry["error"] = str(e)
+                return entry
+        entry["cheapest"] = _cheapest(results)
+        return entry
+
+    tasks = [asyncio.ensure_future(search_date(d)) for d in dates]
+    found = []
+    try:
+        for future in asyncio.as_completed(tasks):
+            entry = await future
+            found.append(entry)
+            job.report(len(found), days, entry)
+    finally:
+        # Stop outstanding searches if the job is cancelled
+        for task in tasks:
+            task.cancel()
+
+    found.sort(key=lambda entry: entry["departure_date"])
+    priced = [entry for entry in found if entry.get("cheapest")]
+    if not priced:
+        raise ValueError("No flights found for any date in the range")
+    best = min(priced, key=lambda entry: entry["cheapest"]["price"])
+    return {"origin": origin, "destination": destination, "dates": found, "best": best}
+
+
+job_runner.register("multi-city", run_multi_city)
+job_runner.register("calendar", run_calendar)
+
+
+def _resolve(location: str) -> str:
+    """Resolve a location at submit time, so bad input is a 400 rather than a failed job"""
+    try:
+        return location_index.resolve(location)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _submit(kind: str, request: Dict[str, Any]) -> Dict[str, Any]:
+    user_id = get_default_user_id()
+    try:
+        job_id = job_runner.submit(kind, user_id, request)
+    except JobQueueFull as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    return job_runner.get(job_id, user_id)
+
+
+@router.post("/multi-city", response_model=SearchJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_multi_city(search: AirfareSearchMultiCity, trip_id: Optional[int] = None, optimize: bool = False):
+    """Run a multi-city search in the background; poll or stream the returned job"""
+    for seg in search.segments:
+        seg.origin = _resolve(seg.origin)
+        seg.destination = _resolve(seg.destination)
+    return _submit("multi-city", {
+        "search": search.model_dump(mode="json"),
+        "trip_id": trip_id,
+        "optimize": optimize
+    })
+
+
+@router.post("/calendar", response_model=SearchJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_calendar(search: CalendarSearch):
+    """Find the cheapest fare for each departure date in a range, in the background"""
+    days = (search.end_date - search.start_date).days + 1
+    if days < 1 or days > settings.calendar_max_days:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range must cover 1 to {settings.calendar_max_days} days"
+        )
+    search.origin = _resolve(search.origin)
+    search.destination = _resolve(search.destination)
+    return _submit("calendar", {"search": search.model_dump(mode="json")})
+
+
+@router.get("", response_model=List[SearchJobResponse])
+async def get_jobs(limit: int = Query(default=50, ge=1, le=500)):
+    """Recent jobs, newest first"""
+    return job_runner.list_jobs(get_default_user_id(), limit)
+
+
+@router.get("/{job_id}", response_model=SearchJobResponse)
+async def get_job(job_id: str):
+    """Job status, progress and partial or final results"""
+    job = job_runner.get(job_id, get_default_user_id())
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Server-sent events: the current job state, then one event per progress step
+    (with the new partial result) until the job finishes
+    """
+    job = job_runner.get(job_id, get_default_user_id())
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    queue = job_runner.subscribe(job_id)
+
+    async def stream():
+        try:
+            yield f"event: state\ndata: {json.dumps(job, default=str)}\n\n"
+            if job["status"] in TERMINAL_STATUSES:
+                return
+            while not await request.is_disconnected():
+                try:
+                    event = await lifecycle.next_event(queue, timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Shutting down: end the stream so the client reconnects elsewhere
+                    return
+                yield f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+                if event["event"] in TERMINAL_STATUSES:
+                    return
+        finally:
+            job_runner.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.delete("/{job_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_job(job_id: str):
+    """Cancel a queued or running job"""
+    job = job_runner.get(job_id, get_default_user_id())
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    if not job_runner.cancel(job_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job already {job['status']}"
+        )
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import List
+from app.models import LocationResult
+from app.services.locations import location_index
+
+router = APIRouter(prefix="/locations", tags=["locations"])
+
+
+@router.get("/autocomplete", response_model=List[LocationResult])
+async def autocomplete(
+    q: str = Query(..., min_length=1, description="Prefix of an airport code, city or airport name"),
+    limit: int = Query(default=10, ge=1, le=50)
+):
+    """Autocomplete airports by code, city or name prefix"""
+    return [airport._asdict() for airport in location_index.autocomplete(q, limit)]
+
+
+@router.get("/resolve")
+async def resolve(q: str = Query(..., min_length=1)):
+    """Resolve a city name or airport code to the IATA code used for searches"""
+    try:
+        code = location_index.resolve(q)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    airports = location_index.metro_airports(code) or (code,)
+    return {"query": q, "code": code, "airports": list(airports)}
@@ -1,26 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.models import TripCreate, TripResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import Response
+from pydantic import ValidationError
+from app.models import TripBulkCreate, TripBulkDelete, TripCreate, TripResponse, TripSummary
+from app.config import settings
 from app.database import db
-from typing import List, Optional
+from app.metrics import stage
+from app.services.payloads import delete_unreferenced
+from typing import List, Literal, Optional
+import csv
+import io
+import json
 
 router = APIRouter(prefix="/trips", tags=["trips"])
 
 # Temporary: Get default user ID (1) or create anonymous user
 def get_default_user_id() -> int:
     """Get default user ID for unauthenticated requests"""
-    conn = db.connect()
-    # Try to get or create a default user
-    result = conn.execute("SELECT id FROM users LIMIT 1").fetchone()
-    if result:
-        return result[0]
-    # Create anonymous user if none exists
-    conn.execute(
-        "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
-        ["anonymous", "anonymous@example.com", "no_password"]
-    )
-    conn.commit()
-    result = conn.execute("SELECT id FROM users WHERE username = 'anonymous'").fetchone()
-    return result[0] if result else 1
+    with stage("auth"):
+        conn = db.connect()
+        # Try to get or create a default user
+        result = conn.execute("SELECT id FROM users LIMIT 1").fetchone()
+        if result:
+            return result[0]
+        # Create anonymous user if none exists
+        conn.execute(
+            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+            ["anonymous", "anonymous@example.com", "no_password"]
+        )
+        conn.commit()
+        result = conn.execute("SELECT id FROM users WHERE username = 'anonymous'").fetchone()
+        return result[0] if result else 1
 
 
 @router.post("", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
@@ -58,6 +67,185 @@ async def create_trip(trip: TripCreate):
     }
 
 
+def _trip_row_to_dict(row: tuple) -> dict:
+    return {
+        "id": row[0],
+        "user_id": row[1],
+        "name": row[2],
+        "created_at": row[3]
+    }
+
+
+def insert_trips(user_id: int, trips: List[TripCreate]) -> List[dict]:
+    """Create many trips with one statement; returned in input order"""
+    if len(trips) > settings.trip_bulk_max:
+        raise ValueError(f"At most {settings.trip_bulk_max} trips can be created at once")
+    conn = db.connect()
+    results = conn.execute(
+        """
+        INSERT INTO trips (user_id, name)
+        SELECT ?, unnest(?)
+        RETURNING id, user_id, name, created_at
+        """,
+        [user_id, [trip.name for trip in trips]]
+    ).fetchall()
+    conn.commit()
+    return [_trip_row_to_dict(row) for row in results]
+
+
+def parse_trip_import(content: bytes, fmt: str) -> List[TripCreate]:
+    """Trips from a CSV file with a `name` column, or a JSON list of {"name": ...} objects"""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Import file must be UTF-8")
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or "name" not in reader.fieldnames:
+            raise ValueError("CSV import needs a 'name' column")
+        rows = list(reader)
+    else:
+        try:
+            rows = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get("trips")
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be a list of trips or {\"trips\": [...]}")
+    
+    trips = []
+    for index, row in enumerate(rows):
+        try:
+            trips.append(TripCreate(name=row["name"]) if isinstance(row, dict) else TripCreate(name=row))
+        except KeyError:
+            raise ValueError(f"Trip {index + 1}: missing 'name'")
+        except ValidationError as e:
+            raise ValueError(f"Trip {index + 1}: {e.errors()[0]['msg']}")
+    if not trips:
+        raise ValueError("Import file contains no trips")
+    return trips
+
+
+def delete_trips(user_id: int, trip_ids: List[int]) -> List[int]:
+    """
+    Delete trips with their searches, multi-city segments, price watches and
+    watch changes; returns the ids that were found.
+    
+    Each table is cleared with one set-based statement over all the trips,
+    leaves first, inside a transaction per level: DuckDB checks foreign keys
+    against committed data, so children must be committed before their parent
+    rows can go. An interrupted delete leaves a trip with part of its history
+    and can simply be repeated.
+    """
+    conn = db.connect()
+    conn.execute(
+        "CREATE OR REPLACE TEMP TABLE trip_delete AS SELECT id FROM trips WHERE user_id = ? AND id IN (SELECT unnest(?))",
+        [user_id, trip_ids]
+    )
+    found = [row[0] for row in conn.execute("SELECT id FROM trip_delete").fetchall()]
+    if not found:
+        return []
+    conn.execute("""
+        CREATE OR REPLACE TEMP TABLE trip_delete_searches AS
+        SELECT id, results_hash FROM airfare_searches WHERE trip_id IN (SELECT id FROM trip_delete)
+    """)
+    
+    levels = [
+        [
+            "DELETE FROM multi_city_segments WHERE airfare_search_id IN (SELECT id FROM trip_delete_searches)",
+            "DELETE FROM price_watch_changes WHERE watch_id IN (SELECT id FROM price_watches WHERE trip_id IN (SELECT id FROM trip_delete))"
+        ],
+        [
+            "DELETE FROM airfare_searches WHERE id IN (SELECT id FROM trip_delete_searches)",
+            "DELETE FROM price_watches WHERE trip_id IN (SELECT id FROM trip_delete)"
+        ],
+        ["DELETE FROM trips WHERE id IN (SELECT id FROM trip_delete)"]
+    ]
+    for statements in levels:
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    
+    delete_unreferenced(conn, "SELECT results_hash FROM trip_delete_searches")
+    conn.commit()
+    return found
+
+
+@router.post("/bulk", response_model=List[TripResponse], status_code=status.HTTP_201_CREATED)
+async def create_trips(bulk: TripBulkCreate):
+    """Create many trips at once"""
+    try:
+        return insert_trips(get_default_user_id(), bulk.trips)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/import", response_model=List[TripResponse], status_code=status.HTTP_201_CREATED)
+async def import_trips(
+    file: UploadFile = File(...),
+    import_format: Optional[Literal["csv", "json"]] = Query(None, alias="format", description="Defaults to the file extension")
+):
+    """Import trips from a CSV (`name` column) or JSON file"""
+    fmt = import_format or ("csv" if (file.filename or "").lower().endswith(".csv") else "json")
+    try:
+        trips = parse_trip_import(await file.read(), fmt)
+        return insert_trips(get_default_user_id(), trips)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.get("/export", response_model=List[TripSummary])
+async def export_trips(export_format: Literal["json", "csv"] = Query("json", alias="format")):
+    """All trips with their search and watch counts, as JSON or CSV (re-importable)"""
+    conn = db.connect()
+    results = conn.execute(
+        """
+        SELECT t.id, t.user_id, t.name, t.created_at,
+               (SELECT COUNT(*) FROM airfare_searches s WHERE s.trip_id = t.id) AS searches,
+               (SELECT COUNT(*) FROM price_watches w WHERE w.trip_id = t.id) AS watches
+        FROM trips t
+        WHERE t.user_id = ?
+        ORDER BY t.created_at, t.id
+        """,
+        [get_default_user_id()]
+    ).fetchall()
+    
+    if export_format == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(["id", "user_id", "name", "created_at", "searches", "watches"])
+        writer.writerows(results)
+        return Response(
+            out.getvalue(),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="trips.csv"'}
+        )
+    return [{**_trip_row_to_dict(row), "searches": row[4], "watches": row[5]} for row in results]
+
+
+@router.post("/delete", status_code=status.HTTP_200_OK)
+async def delete_trips_bulk(bulk: TripBulkDelete):
+    """Delete many trips and everything linked to them; returns the ids deleted"""
+    if len(bulk.ids) > settings.trip_bulk_max:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.trip_bulk_max} trips can be deleted at once"
+        )
+    return {"deleted": delete_trips(get_default_user_id(), bulk.ids)}
+
+
 @router.get("", response_model=List[TripResponse])
 async def get_trips():
     """Get all trips"""
@@ -105,16 +293,8 @@ async def get_trip(trip_id: int):
 
 @router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_trip(trip_id: int):
-    """Delete a trip"""
-    conn = db.connect()
-    user_id = get_default_user_id()
-    result = conn.execute(
-        "DELETE FROM trips WHERE id = ? AND user_id = ?",
-        [trip_id, user_id]
-    )
-    conn.commit()
-    
-    if result.rowcount == 0:
+    """Delete a trip with its searches and price watches"""
+    if not delete_trips(get_default_user_id(), [trip_id]):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Trip not found"
@@ -0,0 +1,214 @@
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from app.models import PriceWatchChange, PriceWatchCreate, PriceWatchResponse
+from app.database import db
+from app.lifecycle import lifecycle
+from app.api.trips import get_default_user_id
+from app.services.locations import location_index
+from app.services.price_watch import watch_notifier, webhook_url_error
+
+router = APIRouter(prefix="/watches", tags=["watches"])
+
+_WATCH_FIELDS = """
+    id, trip_id, origin, destination, departure_date, return_date, passengers,
+    cabin_class, webhook_url, active, lowest_price, last_checked_at, created_at,
+    check_failures, last_error
+"""
+
+
+def _watch_row_to_dict(row: tuple) -> dict:
+    return {
+        "id": row[0],
+        "trip_id": row[1],
+        "origin": row[2],
+        "destination": row[3],
+        "departure_date": row[4],
+        "return_date": row[5],
+        "passengers": row[6],
+        "cabin_class": row[7],
+        "webhook_url": row[8],
+        "active": row[9],
+        "lowest_price": row[10],
+        "last_checked_at": row[11],
+        "created_at": row[12],
+        "check_failures": row[13] or 0,
+        "last_error": row[14]
+    }
+
+
+def _get_watch_row(watch_id: int, user_id: int) -> tuple:
+    result = db.connect().execute(
+        f"SELECT {_WATCH_FIELDS} FROM price_watches WHERE id = ? AND user_id = ?",
+        [watch_id, user_id]
+    ).fetchone()
+    if not result:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Price watch not found"
+        )
+    return result
+
+
+@router.post("", response_model=PriceWatchResponse, status_code=status.HTTP_201_CREATED)
+async def create_watch(watch: PriceWatchCreate):
+    """Watch a one-way or return route for price changes, linked to a trip"""
+    conn = db.connect()
+    user_id = get_default_user_id()
+
+    trip = conn.execute(
+        "SELECT id FROM trips WHERE id = ? AND user_id = ?",
+        [watch.trip_id, user_id]
+    ).fetchone()
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trip not found"
+        )
+
+    try:
+        origin = location_index.resolve(watch.origin)
+        destination = location_index.resolve(watch.destination)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    if watch.return_date and watch.return_date < watch.departure_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="return_date must not be before departure_date"
+        )
+    if watch.webhook_url:
+        error = webhook_url_error(watch.webhook_url)
+        if error:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=error
+            )
+
+    result = conn.execute(
+        f"""
+        INSERT INTO price_watches
+        (trip_id, user_id, origin, destination, departure_date, return_date, passengers, cabin_class, webhook_url)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        RETURNING {_WATCH_FIELDS}
+        """,
+        [
+            watch.trip_id,
+            user_id,
+            origin,
+            destination,
+            watch.departure_date,
+            watch.return_date,
+            watch.passengers,
+            (watch.cabin_class or "economy").upper(),
+            watch.webhook_url
+        ]
+    ).fetchone()
+    conn.commit()
+    return _watch_row_to_dict(result)
+
+
+@router.get("", response_model=List[PriceWatchResponse])
+async def get_watches(trip_id: Optional[int] = None):
+    """List price watches, optionally for one trip"""
+    conn = db.connect()
+    user_id = get_default_user_id()
+    if trip_id:
+        results = conn.execute(
+            f"SELECT {_WATCH_FIELDS} FROM price_watches WHERE user_id = ? AND trip_id = ? ORDER BY created_at DESC",
+            [user_id, trip_id]
+        ).fetchall()
+    else:
+        results = conn.execute(
+            f"SELECT {_WATCH_FIELDS} FROM price_watches WHERE user_id = ? ORDER BY created_at DESC",
+            [user_id]
+        ).fetchall()
+    return [_watch_row_to_dict(row) for row in results]
+
+
+@router.get("/events")
+async def watch_events(request: Request, watch_id: Optional[int] = None):
+    """Server-sent events stream of price changes for the user's watches"""
+    user_id = get_default_user_id()
+    queue = watch_notifier.subscribe(user_id)
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await lifecycle.next_event(queue, timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is None:
+                    # Shutting down: end the stream so the client reconnects elsewhere
+                    return
+                if watch_id is None or event["watch_id"] == watch_id:
+                    yield f"event: price_change\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            watch_notifier.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/{watch_id}", response_model=PriceWatchResponse)
+async def get_watch(watch_id: int):
+    """Get a specific price watch"""
+    return _watch_row_to_dict(_get_watch_row(watch_id, get_default_user_id()))
+
+
+@router.get("/{watch_id}/changes", response_model=List[PriceWatchChange])
+async def get_watch_changes(watch_id: int, limit: int = Query(default=100, ge=1, le=1000)):
+    """Detected offer changes for a watch, newest first"""
+    _get_watch_row(watch_id, get_default_user_id())
+    results = db.connect().execute(
+        """
+        SELECT id, watch_id, change_type, offer_id, old_price, new_price, currency, detected_at
+        FROM price_watch_changes
+        WHERE watch_id = ?
+        ORDER BY detected_at DESC, id
+        LIMIT ?
+        """,
+        [watch_id, limit]
+    ).fetchall()
+    return [
+        {
+            "id": row[0],
+            "watch_id": row[1],
+            "change_type": row[2],
+            "offer_id": row[3],
+            "old_price": row[4],
+            "new_price": row[5],
+            "currency": row[6],
+            "detected_at": row[7]
+        }
+        for row in results
+    ]
+
+
+@router.post("/{watch_id}/check", response_model=PriceWatchResponse)
+async def check_watch(watch_id: int, request: Request):
+    """Re-check a watch now instead of waiting for the scheduler"""
+    user_id = get_default_user_id()
+    _get_watch_row(watch_id, user_id)
+    await request.app.state.price_watcher.run_once([watch_id])
+    return _watch_row_to_dict(_get_watch_row(watch_id, user_id))
+
+
+@router.delete("/{watch_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_watch(watch_id: int):
+    """Delete a price watch and its change history"""
+    conn = db.connect()
+    _get_watch_row(watch_id, get_default_user_id())
+    # Separate statements: DuckDB checks foreign keys against the committed state
+    conn.execute("DELETE FROM price_watch_changes WHERE watch_id = ?", [watch_id])
+    conn.execute("DELETE FROM price_watches WHERE id = ?", [watch_id])
+    conn.commit()
@@ -1,26 +1,36 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.config import settings
 from app.database import db
+from app.metrics import stage
 import duckdb
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+# passlib and jose are imported on first use; together they are a large share of import time
+@lru_cache(maxsize=None)
+def _pwd_context():
+    from passlib.context import CryptContext
+    
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with stage("auth"):
+        return _pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _pwd_context().hash(password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    from jose import jwt
+    
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -31,6 +41,16 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> Optional[dict]:
+    """Claims of a valid token; None if it is malformed, forged or expired"""
+    from jose import JWTError, jwt
+    
+    try:
+        return jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+    except JWTError:
+        return None
+
+
 def get_user_by_username(username: str):
     conn = db.connect()
     result = conn.execute(
@@ -78,12 +98,10 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
+    with stage("auth"):
+        payload = decode_access_token(token)
+    username: Optional[str] = payload.get("sub") if payload else None
+    if username is None:
         raise credentials_exception
     user = get_user_by_username(username)
     if user is None:
@@ -0,0 +1,144 @@
+import json
+import logging
+import math
+from collections import OrderedDict
+from datetime import date
+from typing import Optional
+from prometheus_client import Counter
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.admission import route_class
+from app.auth import decode_access_token
+from app.config import settings
+from app.services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = Counter(
+    "client_rate_limited_total",
+    "Search requests rejected with 429 by the per-client rate limit",
+    ["client_type"]
+)
+
+
+def _header(scope: Scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def read_body(receive: Receive) -> bytes:
+    parts = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        parts.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(parts)
+
+
+def search_cost(path: str, body: bytes) -> int:
+    """
+    Upstream searches a request can fan out to: one per batch item, multi-city
+    segment or calendar day, otherwise 1. Bodies that do not parse cost 1; the
+    endpoint rejects them anyway.
+    """
+    if not path.endswith(("/batch", "/multi-city", "/calendar")):
+        return 1
+    try:
+        request = json.loads(body)
+        if path.endswith("/batch"):
+            return max(1, len(request["searches"]))
+        if path.endswith("/multi-city"):
+            return max(1, len(request["segments"]))
+        days = (date.fromisoformat(request["end_date"]) - date.fromisoformat(request["start_date"])).days + 1
+        return max(1, days)
+    except (ValueError, TypeError, KeyError):
+        return 1
+
+
+def client_id(scope: Scope) -> str:
+    """
+    "user:<username>" for requests with a valid bearer token, otherwise
+    "ip:<address>" (the first X-Forwarded-For hop when RATE_LIMIT_TRUST_FORWARDED_FOR is set)
+    """
+    authorization = _header(scope, b"authorization")
+    if authorization and authorization.lower().startswith("bearer "):
+        payload = decode_access_token(authorization[7:])
+        if payload and payload.get("sub"):
+            return f"user:{payload['sub']}"
+    if settings.rate_limit_trust_forwarded_for:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return f"ip:{forwarded.split(',')[0].strip()}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class ClientRateLimitMiddleware:
+    """
+    Per-client token buckets for the search endpoints (the "search" admission
+    class): each client gets rate_limit_search_burst searches at once, refilled
+    at rate_limit_search_per_minute. Batch, multi-city and calendar requests
+    are charged one token per search they fan out to (see search_cost); one
+    larger than the burst is let through only on a full bucket and leaves it
+    in debt. Requests over the limit get 429 with Retry-After. Only the most
+    recently seen rate_limit_max_clients buckets are kept; an evicted client
+    simply starts again with a full bucket.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def _bucket(self, client: str) -> TokenBucket:
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = TokenBucket(settings.rate_limit_search_per_minute / 60, settings.rate_limit_search_burst)
+            self._buckets[client] = bucket
+            if len(self._buckets) > settings.rate_limit_max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+        return bucket
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] != "http"
+            or not settings.rate_limit_enabled
+            or route_class(scope["method"], scope["path"]) != "search"
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        body = await read_body(receive)
+        cost = search_cost(scope["path"], body)
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        client = client_id(scope)
+        bucket = self._bucket(client)
+        if bucket.try_borrow(cost):
+            await self.app(scope, replay_receive, send)
+            return
+
+        RATE_LIMITED.labels(client.split(":", 1)[0]).inc()
+        logger.debug("rate limited %s %s (%s, cost %d)", scope["method"], scope["path"], client, cost)
+        body = json.dumps({"detail": "Too many search requests, retry later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(bucket.retry_after(min(cost, bucket.capacity))))).encode())
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -15,6 +15,122 @@ class Settings(BaseSettings):
     amadeus_client_id: Optional[str] = None
     amadeus_client_secret: Optional[str] = None
     amadeus_use_production: bool = False  # Set to True for production API
+    amadeus_base_url: Optional[str] = None  # Overrides test/production URL, e.g. the local stand-in
+    amadeus_max_offers: int = 10  # 'max' offers requested per search (Amadeus allows up to 250)
+    
+    # Local Amadeus stand-in (app/services/amadeus_stub.py)
+    amadeus_stub_seed: int = 42
+    amadeus_stub_offers: int = 50
+    amadeus_stub_latency_ms: float = 0.0
+    amadeus_stub_latency_jitter_ms: float = 0.0
+    amadeus_stub_error_rate: float = 0.0  # Fraction of searches answered with 500
+    amadeus_stub_throttle_rate: float = 0.0  # Fraction of searches answered with 429
+    
+    # Mock flights served by the services' development fallbacks (app/services/mock_flights.py)
+    mock_flight_offers: int = 10
+    mock_flight_seed: int = 42
+    
+    # Upstream budget and caching
+    amadeus_rate_limit_per_second: float = 10.0  # Test API allows 10 TPS
+    amadeus_rate_limit_burst: int = 10
+    amadeus_max_concurrency: int = 4  # Parallel pair searches per nearby-airport request
+    amadeus_max_connections: int = 20  # Pooled HTTP connections to the Amadeus API
+    flight_cache_ttl_seconds: int = 900
+    flight_cache_max_entries: int = 1000
+    
+    # Popular-route prefetch (app/services/prefetch.py)
+    prefetch_enabled: bool = True
+    prefetch_interval_seconds: float = 60.0
+    prefetch_quota_share: float = 0.2  # Fraction of amadeus_rate_limit_per_second prefetch may use
+    prefetch_max_routes: int = 20
+    prefetch_min_score: float = 2.0  # Decayed search count below which a route stops being refreshed
+    prefetch_half_life_hours: float = 6.0
+    prefetch_window_hours: int = 72
+    prefetch_refresh_ahead_seconds: float = 120.0  # Refresh cached fares this close to expiry
+    
+    # Price watches (app/services/price_watch.py)
+    price_watch_enabled: bool = True
+    price_watch_interval_seconds: int = 1800  # How often each watch is re-checked
+    price_watch_poll_seconds: float = 30.0  # How often the scheduler looks for due watches
+    price_watch_batch_size: int = 200
+    price_watch_webhook_timeout: float = 5.0
+    # Comma-separated hosts a watch's webhook_url may point at, e.g. "localhost,hooks.internal";
+    # empty (the default) disables webhooks, leaving the SSE stream
+    price_watch_webhook_hosts: str = ""
+    # After a failed check the interval doubles per consecutive failure, up to this
+    price_watch_max_backoff_seconds: int = 86400
+    
+    # Background search jobs (app/services/jobs.py)
+    job_workers: int = 4  # Jobs running at once, process-wide
+    job_queue_size: int = 100  # Waiting jobs beyond this are rejected with 503
+    calendar_max_days: int = 62
+    
+    # Batch search
+    batch_max_searches: int = 500
+    trip_bulk_max: int = 10000  # Trips per bulk create/import/delete
+    
+    # Search result storage (app/services/payloads.py)
+    payload_compression_level: int = 3  # zstd level; higher is smaller but slower to save
+    
+    # Retention (app/services/retention.py): old searches move to Parquet under archive_path
+    retention_enabled: bool = False
+    retention_days: int = 180
+    retention_interval_seconds: float = 3600.0
+    retention_batch_size: int = 5000
+    archive_path: str = "./archive"
+    
+    # History export (app/services/export.py)
+    export_batch_rows: int = 2000  # Rows per Arrow record batch / streamed chunk
+    
+    # Admission control (app/admission.py): concurrent requests per route class;
+    # up to *_queue more wait admission_queue_timeout_seconds, the rest get 503
+    admission_enabled: bool = True
+    admission_search_limit: int = 32  # Upstream-bound searches and watch checks
+    admission_search_queue: int = 64
+    admission_export_limit: int = 2
+    admission_export_queue: int = 4
+    admission_events_limit: int = 100  # Open SSE streams; never queued
+    admission_default_limit: int = 64  # Trips, history, locations and the rest of the API
+    admission_default_queue: int = 256
+    admission_queue_timeout_seconds: float = 2.0
+    admission_retry_after_seconds: int = 5
+    
+    # Per-client limits on the search endpoints (app/client_limits.py, app/idempotency.py);
+    # clients are users with a valid bearer token, otherwise IP addresses
+    rate_limit_enabled: bool = True
+    rate_limit_search_per_minute: float = 60.0
+    rate_limit_search_burst: int = 20
+    rate_limit_max_clients: int = 10000  # Least recently seen buckets beyond this are dropped
+    rate_limit_trust_forwarded_for: bool = False  # Use X-Forwarded-For behind a trusted proxy
+    idempotency_enabled: bool = True
+    idempotency_ttl_seconds: int = 86400  # How long an Idempotency-Key replays its response
+    
+    # Shutdown: in-flight requests, then running jobs, get this long before they are cut off
+    shutdown_timeout_seconds: float = 25.0
+    
+    # Itineraries
+    return_itinerary_limit: int = 50  # Top-K round-trip pairs kept per return search
+    multi_city_itinerary_limit: int = 10
+    multi_city_min_connection_minutes: int = 60
+    
+    # Locations
+    # Well-formed IATA codes missing from the bundled dataset (major airports only) are
+    # passed through to Amadeus; turn on to reject them before any upstream call
+    location_strict_codes: bool = False
+    
+    # Observability
+    server_timing_header: bool = False  # Add per-stage Server-Timing header to responses
+    log_level: str = "INFO"
+    log_sample_rate: float = 1.0  # Fraction of high-volume events (search requests) logged
+    log_queue_size: int = 10000  # Records beyond this are dropped instead of blocking
+    
+    # Admin diagnostics (/admin endpoints are disabled unless admin_token is set)
+    admin_token: Optional[str] = None
+    slow_request_threshold_ms: float = 1000.0
+    slow_request_buffer: int = 100
+    slow_query_threshold_ms: float = 100.0
+    slow_query_buffer: int = 100
+    profiler_max_seconds: int = 60
     
     class Config:
         env_file = ".env"
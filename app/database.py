@@ -1,20 +1,78 @@
 import duckdb
+import time
 from typing import Optional
 from app.config import settings
+from app.metrics import record_query, record_stage
+
+# Tables whose integer ids come from a {table}_id_seq sequence
+ID_TABLES = (
+    "users",
+    "trips",
+    "airfare_searches",
+    "multi_city_segments",
+    "price_watches",
+    "price_watch_changes"
+)
+
+
+def _statement_stage(query: str) -> str:
+    """Classify a SQL statement as a db_read or db_write request stage"""
+    keyword = query.lstrip()[:6].upper()
+    return "db_read" if keyword in ("SELECT", "WITH") else "db_write"
+
+
+class TimedConnection:
+    """
+    DuckDB connection wrapper that charges statement time to the current
+    request's db_read/db_write stages and keeps slow statements for inspection.
+    Everything else is delegated.
+    """
+    def __init__(self, conn: duckdb.DuckDBPyConnection):
+        self._conn = conn
+    
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+    
+    def execute(self, query: str, parameters=None):
+        start = time.perf_counter()
+        try:
+            if parameters is None:
+                return self._conn.execute(query)
+            return self._conn.execute(query, parameters)
+        finally:
+            elapsed = time.perf_counter() - start
+            record_stage(_statement_stage(query), elapsed)
+            record_query(query, elapsed)
+    
+    def executemany(self, query: str, parameters=None):
+        start = time.perf_counter()
+        try:
+            return self._conn.executemany(query, parameters or [])
+        finally:
+            elapsed = time.perf_counter() - start
+            record_stage("db_write", elapsed)
+            record_query(query, elapsed)
+    
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return self._conn.commit()
+        finally:
+            record_stage("db_write", time.perf_counter() - start)
 
 
 class Database:
     _instance: Optional['Database'] = None
-    _connection: Optional[duckdb.DuckDBPyConnection] = None
+    _connection: Optional[TimedConnection] = None
     
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
     
-    def connect(self) -> duckdb.DuckDBPyConnection:
+    def connect(self) -> TimedConnection:
         if self._connection is None:
-            self._connection = duckdb.connect(settings.database_path)
+            self._connection = TimedConnection(duckdb.connect(settings.database_path))
             self._initialize_schema()
         return self._connection
     
@@ -22,10 +80,14 @@ class Database:
         """Initialize database schema"""
         conn = self.connect()
         
+        # DuckDB has no auto-increment: integer ids come from sequences
+        for table in ID_TABLES:
+            conn.execute(f"CREATE SEQUENCE IF NOT EXISTS {table}_id_seq")
+        
         # Users table
         conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('users_id_seq'),
                 username VARCHAR(255) UNIQUE NOT NULL,
                 email VARCHAR(255) UNIQUE NOT NULL,
                 hashed_password VARCHAR(255) NOT NULL,
@@ -36,7 +98,7 @@ class Database:
         # Trips table
         conn.execute("""
             CREATE TABLE IF NOT EXISTS trips (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('trips_id_seq'),
                 user_id INTEGER NOT NULL,
                 name VARCHAR(255),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -47,7 +109,7 @@ class Database:
         # Airfare searches table
         conn.execute("""
             CREATE TABLE IF NOT EXISTS airfare_searches (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('airfare_searches_id_seq'),
                 trip_id INTEGER,
                 user_id INTEGER NOT NULL,
                 search_type VARCHAR(50) NOT NULL, -- 'one-way', 'return', 'multi-city'
@@ -56,17 +118,32 @@ class Database:
                 departure_date DATE NOT NULL,
                 return_date DATE,
                 passengers INTEGER DEFAULT 1,
-                search_results JSON,
+                search_results JSON, -- inline results of rows saved before search_payloads
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                results_hash VARCHAR(64), -- search_payloads.hash
+                cabin_class VARCHAR(20) DEFAULT 'ECONOMY',
+                nearby BOOLEAN DEFAULT FALSE, -- every airport pair of both metro areas was searched
                 FOREIGN KEY (trip_id) REFERENCES trips(id),
                 FOREIGN KEY (user_id) REFERENCES users(id)
             )
         """)
         
+        # Content-addressed, compressed search results (app/services/payloads.py)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_payloads (
+                hash VARCHAR(64) PRIMARY KEY, -- sha256 of the canonical JSON
+                codec VARCHAR(10) NOT NULL,
+                raw_size INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
         # Multi-city segments table
         conn.execute("""
             CREATE TABLE IF NOT EXISTS multi_city_segments (
-                id INTEGER PRIMARY KEY,
+                id INTEGER PRIMARY KEY DEFAULT nextval('multi_city_segments_id_seq'),
                 airfare_search_id INTEGER NOT NULL,
                 segment_order INTEGER NOT NULL,
                 origin VARCHAR(10) NOT NULL,
@@ -76,8 +153,107 @@ class Database:
             )
         """)
         
+        # Price watches: saved searches re-checked in the background
+        # snapshot holds {offer_id: [price, currency]} from the last check
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_watches (
+                id INTEGER PRIMARY KEY DEFAULT nextval('price_watches_id_seq'),
+                trip_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                origin VARCHAR(10) NOT NULL,
+                destination VARCHAR(10) NOT NULL,
+                departure_date DATE NOT NULL,
+                return_date DATE,
+                passengers INTEGER DEFAULT 1,
+                cabin_class VARCHAR(20) DEFAULT 'ECONOMY',
+                webhook_url VARCHAR,
+                active BOOLEAN DEFAULT TRUE,
+                snapshot JSON,
+                lowest_price DOUBLE,
+                last_checked_at TIMESTAMP,
+                check_failures INTEGER DEFAULT 0, -- Consecutive failed checks; backs off the next one
+                last_error VARCHAR,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (trip_id) REFERENCES trips(id),
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        
+        # Offer-level differences between consecutive checks of a watch
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS price_watch_changes (
+                id INTEGER PRIMARY KEY DEFAULT nextval('price_watch_changes_id_seq'),
+                watch_id INTEGER NOT NULL,
+                change_type VARCHAR(10) NOT NULL, -- 'added', 'removed', 'price'
+                offer_id VARCHAR NOT NULL,
+                old_price DOUBLE,
+                new_price DOUBLE,
+                currency VARCHAR(3),
+                detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (watch_id) REFERENCES price_watches(id)
+            )
+        """)
+        
+        # Background search jobs (app/services/jobs.py); ids are random hex strings
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS search_jobs (
+                id VARCHAR PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                kind VARCHAR(20) NOT NULL, -- 'multi-city', 'calendar'
+                status VARCHAR(20) NOT NULL, -- 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+                request JSON NOT NULL,
+                progress_done INTEGER DEFAULT 0,
+                progress_total INTEGER DEFAULT 0,
+                partial_results JSON,
+                result JSON,
+                search_id INTEGER,
+                error VARCHAR,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at TIMESTAMP,
+                finished_at TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        
+        # Stored search responses per (client, Idempotency-Key) (app/idempotency.py)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS idempotency_keys (
+                client VARCHAR NOT NULL, -- 'user:<username>' or 'ip:<address>'
+                key VARCHAR NOT NULL,
+                fingerprint VARCHAR(64) NOT NULL, -- sha256 of method, path, query and body
+                status_code INTEGER NOT NULL,
+                content_type VARCHAR,
+                codec VARCHAR(10) NOT NULL,
+                body BLOB NOT NULL,
+                created_at TIMESTAMP NOT NULL,
+                PRIMARY KEY (client, key)
+            )
+        """)
+        
+        self._upgrade_id_defaults(conn)
+        conn.execute("ALTER TABLE airfare_searches ADD COLUMN IF NOT EXISTS results_hash VARCHAR(64)")
+        conn.execute("ALTER TABLE airfare_searches ADD COLUMN IF NOT EXISTS cabin_class VARCHAR(20) DEFAULT 'ECONOMY'")
+        conn.execute("ALTER TABLE airfare_searches ADD COLUMN IF NOT EXISTS nearby BOOLEAN DEFAULT FALSE")
+        conn.execute("ALTER TABLE price_watches ADD COLUMN IF NOT EXISTS check_failures INTEGER DEFAULT 0")
+        conn.execute("ALTER TABLE price_watches ADD COLUMN IF NOT EXISTS last_error VARCHAR")
+        
         conn.commit()
     
+    def _upgrade_id_defaults(self, conn: duckdb.DuckDBPyConnection):
+        """Attach id sequences to tables created before ids had defaults"""
+        for table in ID_TABLES:
+            default = conn.execute(
+                "SELECT column_default FROM information_schema.columns WHERE table_name = ? AND column_name = 'id'",
+                [table]
+            ).fetchone()
+            if default and default[0]:
+                continue
+            # Restart the sequence after any rows inserted with explicit ids
+            start = conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+            conn.execute(f"DROP SEQUENCE IF EXISTS {table}_id_seq")
+            conn.execute(f"CREATE SEQUENCE {table}_id_seq START {start}")
+            conn.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+    
     def close(self):
         if self._connection:
             self._connection.close()
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from prometheus_client import Counter
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.admission import route_class
+from app.client_limits import client_id, read_body
+from app.config import settings
+from app.database import db
+from app.services.payloads import CODEC, compress_payload, decompress_payload
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENT_REPLAYS = Counter(
+    "idempotency_replays_total",
+    "Search requests answered from a stored Idempotency-Key response"
+)
+
+MAX_KEY_LENGTH = 255
+# Expired keys are deleted at most this often, from the request that stores a response
+_PURGE_INTERVAL_SECONDS = 300
+
+
+def _fingerprint(scope: Scope, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope["query_string"], body):
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+async def _send_json(send: Send, status_code: int, content: dict, headers: Optional[List[tuple]] = None):
+    body = json.dumps(content).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())] + (headers or [])
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+def load_response(client: str, key: str) -> Optional[tuple]:
+    """(fingerprint, status_code, content_type, body) of a stored response still within the window"""
+    row = db.connect().execute(
+        """
+        SELECT fingerprint, status_code, content_type, codec, body FROM idempotency_keys
+        WHERE client = ? AND key = ? AND created_at >= ?
+        """,
+        [client, key, datetime.now() - timedelta(seconds=settings.idempotency_ttl_seconds)]
+    ).fetchone()
+    if row is None:
+        return None
+    fingerprint, status_code, content_type, codec, body = row
+    return fingerprint, status_code, content_type, decompress_payload(codec, body)
+
+
+def save_response(client: str, key: str, fingerprint: str, status_code: int, content_type: Optional[str], body: bytes):
+    conn = db.connect()
+    conn.execute(
+        """
+        INSERT INTO idempotency_keys
+        (client, key, fingerprint, status_code, content_type, codec, body, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (client, key) DO UPDATE SET
+            fingerprint = excluded.fingerprint, status_code = excluded.status_code,
+            content_type = excluded.content_type, codec = excluded.codec,
+            body = excluded.body, created_at = excluded.created_at
+        """,
+        [client, key, fingerprint, status_code, content_type, CODEC, compress_payload(body), datetime.now()]
+    )
+    conn.commit()
+
+
+def purge_expired() -> int:
+    conn = db.connect()
+    deleted = conn.execute(
+        "DELETE FROM idempotency_keys WHERE created_at < ?",
+        [datetime.now() - timedelta(seconds=settings.idempotency_ttl_seconds)]
+    ).fetchone()[0]
+    conn.commit()
+    return deleted
+
+
+class IdempotencyMiddleware:
+    """
+    Idempotency-Key support for the search endpoints (the "search" admission class).
+
+    The first request with a given key (scoped per client, see app.client_limits.client_id)
+    runs normally and its successful response is stored, compressed, in
+    idempotency_keys. A repeat with the same key and an identical method, path,
+    query and body within idempotency_ttl_seconds gets the stored response back
+    (marked Idempotent-Replayed: true) without searching or saving again; while
+    the first is still running, repeats wait for it instead of running in
+    parallel. Reusing a key for a different request is rejected with 422.
+    Error responses are not stored, so retries after a failure run again.
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._inflight: Dict[Tuple[str, str], Tuple[str, asyncio.Future]] = {}
+        self._purged_at = time.monotonic()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        key = None
+        if (
+            scope["type"] == "http"
+            and settings.idempotency_enabled
+            and route_class(scope["method"], scope["path"]) == "search"
+        ):
+            key = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"idempotency-key"), None)
+        if not key:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, {"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters"})
+            return
+
+        body = await read_body(receive)
+        fingerprint = _fingerprint(scope, body)
+        slot = (client_id(scope), key)
+
+        while True:
+            stored = load_response(*slot)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    await self._reject_reuse(send)
+                    return
+                IDEMPOTENT_REPLAYS.inc()
+                await self._replay(send, *stored[1:])
+                return
+            pending = self._inflight.get(slot)
+            if pending is None:
+                break
+            if pending[0] != fingerprint:
+                await self._reject_reuse(send)
+                return
+            # Same request already running: wait for it, then replay (or run, if it failed)
+            await asyncio.shield(pending[1])
+
+        done = asyncio.get_running_loop().create_future()
+        self._inflight[slot] = (fingerprint, done)
+        response: Dict[str, object] = {"status": None, "content_type": None}
+        chunks: List[bytes] = []
+        body_sent = False
+
+        async def replay_receive() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message: Message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["content_type"] = next(
+                    (v.decode("latin-1") for k, v in message.get("headers", []) if k == b"content-type"), None
+                )
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if response["status"] is not None and 200 <= response["status"] < 300:
+                try:
+                    save_response(*slot, fingerprint, response["status"], response["content_type"], b"".join(chunks))
+                    if time.monotonic() - self._purged_at > _PURGE_INTERVAL_SECONDS:
+                        self._purged_at = time.monotonic()
+                        purge_expired()
+                except Exception:
+                    # The response has gone out already; a retry will just run again
+                    logger.exception("failed to store idempotent response")
+        finally:
+            del self._inflight[slot]
+            done.set_result(None)
+
+    async def _replay(self, send: Send, status_code: int, content_type: Optional[str], body: bytes):
+        headers = [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        if content_type:
+            headers.append((b"content-type", content_type.encode("latin-1")))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _reject_reuse(self, send: Send):
+        await _send_json(send, 422, {"detail": "Idempotency-Key was already used for a different request"})
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.config import settings
+
+# Still answered while draining, so load balancers and scrapers see the state
+_ALWAYS_SERVED = ("/health", "/health/ready", "/metrics")
+
+
+class Lifecycle:
+    """
+    Process state shared by the lifespan handler, the middleware and
+    long-lived streams: startup timing, in-flight requests and draining.
+    """
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.warm_up_seconds: Optional[float] = None
+        self.warm = False  # Background warm-up has finished (or given up)
+        self.draining = False
+        self.in_flight = 0
+        self._drain = asyncio.Event()
+
+    def ready(self, startup_seconds: float):
+        self.draining = False
+        self.warm = False
+        self._drain.clear()
+        self.started_at = time.time()
+        self.startup_seconds = startup_seconds
+
+    def begin_drain(self):
+        """Refuse new requests and tell open streams to finish"""
+        self.draining = True
+        self._drain.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for in-flight requests to finish; False if some are left"""
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return not self.in_flight
+
+    async def next_event(self, queue: asyncio.Queue, timeout: float) -> Optional[Any]:
+        """
+        queue.get() for event streams that also returns None as soon as the
+        process starts draining; raises asyncio.TimeoutError after `timeout`
+        """
+        if self.draining:
+            return None
+        get = asyncio.ensure_future(queue.get())
+        drain = asyncio.ensure_future(self._drain.wait())
+        try:
+            done, _ = await asyncio.wait({get, drain}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            drain.cancel()
+            if not get.done():
+                get.cancel()
+        if get in done:
+            return get.result()
+        if drain in done:
+            return None
+        raise asyncio.TimeoutError()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "status": "draining" if self.draining else "healthy",
+            "warm": self.warm,
+            "uptime_seconds": round(time.time() - self.started_at, 1) if self.started_at else None,
+            "startup_seconds": self.startup_seconds,
+            "warm_up_seconds": self.warm_up_seconds,
+            "in_flight": self.in_flight
+        }
+
+
+class LifecycleMiddleware:
+    """
+    Counts in-flight requests for the shutdown drain; once draining, new
+    requests (other than /health and /metrics) get 503 with Connection: close
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in _ALWAYS_SERVED:
+            await self.app(scope, receive, send)
+            return
+        if lifecycle.draining:
+            body = json.dumps({"detail": "Server is shutting down"}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(settings.admission_retry_after_seconds).encode()),
+                    (b"connection", b"close")
+                ]
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        lifecycle.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lifecycle.in_flight -= 1
+
+
+def drain_on_uvicorn_exit():
+    """
+    Uvicorn waits for open connections to close before it runs the lifespan
+    shutdown, so open event streams would hold a deploy up until they time out.
+    Start draining as soon as uvicorn receives the exit signal instead. Must run
+    at import of the app module, before uvicorn installs its signal handlers;
+    does nothing under other servers.
+    """
+    server = sys.modules.get("uvicorn.server")
+    if server is None or getattr(server.Server.handle_exit, "drains_app", False):
+        return
+    original = server.Server.handle_exit
+
+    def handle_exit(self, sig, frame):
+        lifecycle.begin_drain()
+        original(self, sig, frame)
+
+    handle_exit.drains_app = True
+    server.Server.handle_exit = handle_exit
+
+
+# Global lifecycle state
+lifecycle = Lifecycle()
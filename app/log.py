@@ -0,0 +1,111 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+
+# Request ID of the request being handled; None outside of a request
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message, request_id and extra fields"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None)
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread without formatting them.
+    The stock QueueHandler formats in the caller's thread (to make records
+    picklable); for an in-process queue only the request ID needs capturing here.
+    Records are dropped rather than blocking when the queue is full.
+    """
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            _NonBlockingQueueHandler.dropped += 1
+
+
+def sampled(rate: float) -> bool:
+    """Whether to emit one occurrence of a high-volume event logged at the given rate"""
+    return rate >= 1.0 or random.random() < rate
+
+
+def configure_logging():
+    """Route the app's loggers through a background writer thread (idempotent)"""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter())
+    records: queue.Queue = queue.Queue(maxsize=settings.log_queue_size)
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger = logging.getLogger("app")
+    logger.addHandler(_NonBlockingQueueHandler(records))
+    logger.setLevel(settings.log_level.upper())
+    logger.propagate = False
+
+
+class RequestIdMiddleware:
+    """
+    Assigns each HTTP request an ID (the incoming X-Request-ID header, or a new one),
+    makes it available to log records and echoes it in the response
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id")
+        rid = incoming.decode("latin-1")[:128] if incoming else uuid.uuid4().hex
+        token = request_id.set(rid)
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_id.reset(token)
@@ -1,17 +1,110 @@
+import asyncio
+import importlib
+import logging
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from pathlib import Path
-from app.api import auth, trips, airfare
+from app.admission import AdmissionMiddleware
+from app.api import auth, trips, airfare, locations, admin, watches, jobs
+from app.client_limits import ClientRateLimitMiddleware
+from app.config import settings
+from app.database import db
+from app.idempotency import IdempotencyMiddleware
+from app.lifecycle import LifecycleMiddleware, drain_on_uvicorn_exit, lifecycle
+from app.log import RequestIdMiddleware, configure_logging
+from app.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, TimedJSONResponse, render_metrics
+from app.services.jobs import job_runner
+from app.services.prefetch import PrefetchScheduler
+from app.services.price_watch import PriceWatchScheduler, watch_notifier
+from app.services.retention import RetentionJob
+
+configure_logging()
+drain_on_uvicorn_exit()
+logger = logging.getLogger(__name__)
+
+# Imported lazily by the modules that use them; loaded in the background after startup
+_DEFERRED_IMPORTS = ("jose.jwt", "passlib.context")
+
+
+async def warm_up():
+    """
+    Initialisation that does not need to hold up /health: auth libraries, the
+    Amadeus connection pool and access token. Requests arriving first simply
+    initialise what they need themselves.
+    """
+    start = time.perf_counter()
+    try:
+        for module in _DEFERRED_IMPORTS:
+            await asyncio.to_thread(importlib.import_module, module)
+        await airfare.amadeus.warm_up()
+        lifecycle.warm_up_seconds = round(time.perf_counter() - start, 3)
+        logger.info("warm-up complete", extra={"warm_up_seconds": lifecycle.warm_up_seconds})
+    except Exception:
+        logger.exception("warm-up failed")
+    finally:
+        lifecycle.warm = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup: open DuckDB and check the schema and start the background
+    services; everything else warms up in the background once serving.
+    Shutdown: refuse new requests, give in-flight ones and running jobs until
+    SHUTDOWN_TIMEOUT_SECONDS to finish, stop the services and close the pool
+    and the database.
+    """
+    start = time.perf_counter()
+    db.connect()
+    app.state.prefetcher.start()
+    app.state.price_watcher.start()
+    app.state.retention.start()
+    job_runner.start()
+    lifecycle.ready(round(time.perf_counter() - start, 3))
+    logger.info("startup complete", extra={"startup_seconds": lifecycle.startup_seconds})
+    warming = asyncio.get_running_loop().create_task(warm_up())
+    
+    yield
+    
+    warming.cancel()
+    deadline = time.monotonic() + settings.shutdown_timeout_seconds
+    lifecycle.begin_drain()
+    if not await lifecycle.wait_idle(settings.shutdown_timeout_seconds):
+        logger.warning("shutdown: %d requests still in flight", lifecycle.in_flight)
+    await app.state.prefetcher.stop()
+    await app.state.price_watcher.stop()
+    await app.state.retention.stop()
+    await job_runner.stop(timeout=max(0.0, deadline - time.monotonic()))
+    await airfare.amadeus.close()
+    db.close()
+    logger.info("shutdown complete")
+
 
 app = FastAPI(
     title="Travel Planner API",
     description="Airfare booking API with user authentication and trip management",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=TimedJSONResponse,
+    lifespan=lifespan
 )
 
+# Per-route-class concurrency limits, added first (innermost) so shed responses still carry CORS headers
+app.add_middleware(AdmissionMiddleware)
+
+# Per-client token buckets on the search endpoints (429 with Retry-After)
+app.add_middleware(ClientRateLimitMiddleware)
+
+# Idempotency-Key replays; outside the limits above so replayed retries cost nothing
+app.add_middleware(IdempotencyMiddleware)
+
+# In-flight request count for the shutdown drain; 503 for new requests once draining
+app.add_middleware(LifecycleMiddleware)
+
 # CORS middleware - allow frontend origin
 app.add_middleware(
     CORSMiddleware,
@@ -28,6 +121,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency and per-stage timing (Prometheus histograms, optional Server-Timing)
+app.add_middleware(MetricsMiddleware)
+
+# X-Request-ID propagation; outermost so every log line of a request carries the ID
+app.add_middleware(RequestIdMiddleware)
+
 # Serve static files from frontend dist if it exists
 frontend_dist = Path(__file__).parent.parent / "frontend" / "dist"
 if frontend_dist.exists():
@@ -62,6 +161,18 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 app.include_router(auth.router)
 app.include_router(trips.router)
 app.include_router(airfare.router)
+app.include_router(locations.router)
+app.include_router(watches.router)
+app.include_router(jobs.router)
+app.include_router(admin.router)
+
+
+# Keep fares for popular routes warm in the search cache
+app.state.prefetcher = PrefetchScheduler(airfare.amadeus)
+# Re-check saved price watches in coalesced batches
+app.state.price_watcher = PriceWatchScheduler(airfare.amadeus, watch_notifier)
+# Move old searches out of the live tables into Parquet
+app.state.retention = RetentionJob()
 
 
 @app.get("/")
@@ -75,5 +186,20 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
+    """503 once shutdown has started, so load balancers stop routing here"""
+    if lifecycle.draining:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=lifecycle.status())
+    return lifecycle.status()
+
+
+@app.get("/health/ready")
+async def ready():
+    """Readiness: 503 until background warm-up has finished, and again once draining"""
+    if lifecycle.draining or not lifecycle.warm:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=lifecycle.status())
+    return lifecycle.status()
+
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
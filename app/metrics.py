@@ -0,0 +1,146 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, List, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, Histogram, generate_latest
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.config import settings
+from app.log import request_id
+
+# Stages a request can spend time in; anything else is still recorded under its own name
+STAGES = ("auth", "upstream_token", "upstream_search", "parse", "db_write", "db_read", "serialize")
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+STAGE_DURATION = Histogram(
+    "http_request_stage_duration_seconds",
+    "Time spent per request stage by route",
+    ["route", "stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 10.0)
+)
+
+# Per-request stage accumulator; None outside of an instrumented request
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_stages", default=None)
+
+# Most recent requests / DuckDB statements over their slow thresholds
+slow_requests: Deque[Dict[str, Any]] = deque(maxlen=settings.slow_request_buffer)
+slow_queries: Deque[Dict[str, Any]] = deque(maxlen=settings.slow_query_buffer)
+
+
+def record_stage(name: str, seconds: float):
+    """Add time to a stage of the current request (no-op outside a request)"""
+    stages = _stages.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as a stage of the current request"""
+    stages = _stages.get()
+    if stages is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def current_stages() -> Optional[Dict[str, float]]:
+    return _stages.get()
+
+
+def record_query(sql: str, seconds: float):
+    """Keep a DuckDB statement in the slow-query buffer if it ran over the threshold"""
+    if seconds * 1000 >= settings.slow_query_threshold_ms:
+        slow_queries.append({
+            "at": time.time(),
+            "duration_ms": round(seconds * 1000, 3),
+            "sql": " ".join(sql.split())[:2000],
+            "request_id": request_id.get()
+        })
+
+
+def slowest(entries: Deque[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    return sorted(entries, key=lambda e: e["duration_ms"], reverse=True)[:limit]
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
+
+def _route_label(scope: Scope) -> str:
+    # FastAPI stores the matched route in the scope; use its template to bound cardinality
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose body encoding is recorded as the serialize stage"""
+    def render(self, content) -> bytes:
+        with stage("serialize"):
+            return super().render(content)
+
+
+class MetricsMiddleware:
+    """
+    Times each HTTP request and its stages, exports them as Prometheus histograms
+    and optionally reports them in a Server-Timing response header
+    """
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.server_timing = settings.server_timing_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages: Dict[str, float] = {}
+        token = _stages.set(stages)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    elapsed = time.perf_counter() - start
+                    timing = ", ".join(
+                        f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages.items()
+                    )
+                    timing = f"{timing}, total;dur={elapsed * 1000:.2f}" if timing else f"total;dur={elapsed * 1000:.2f}"
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _stages.reset(token)
+            route = _route_label(scope)
+            REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(elapsed)
+            for name, seconds in stages.items():
+                STAGE_DURATION.labels(route, name).observe(seconds)
+            if elapsed * 1000 >= settings.slow_request_threshold_ms:
+                slow_requests.append({
+                    "at": time.time(),
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status_code,
+                    "duration_ms": round(elapsed * 1000, 3),
+                    "stages_ms": {name: round(seconds * 1000, 3) for name, seconds in stages.items()},
+                    "request_id": request_id.get()
+                })
+
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Union
 from datetime import date, datetime
 
 
@@ -42,6 +42,20 @@ class TripResponse(BaseModel):
     created_at: datetime
 
 
+class TripBulkCreate(BaseModel):
+    trips: List[TripCreate] = Field(..., min_length=1)
+
+
+class TripBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1)
+
+
+class TripSummary(TripResponse):
+    """Trip with counts of what a delete would cascade to"""
+    searches: int
+    watches: int
+
+
 # Airfare Search Models
 class LocationInput(BaseModel):
     """Location can be airport code (IATA) or city name"""
@@ -49,6 +63,15 @@ class LocationInput(BaseModel):
     airport_code: Optional[str] = Field(None, description="Specific airport code if known")
 
 
+class LocationResult(BaseModel):
+    """Airport entry from the bundled location index"""
+    code: str
+    name: str
+    city: str
+    country: str
+    metro: Optional[str] = None
+
+
 class FlightSegment(BaseModel):
     origin: str = Field(..., description="Origin airport code or city")
     destination: str = Field(..., description="Destination airport code or city")
@@ -92,8 +115,97 @@ class AirfareSearchResponse(BaseModel):
     departure_date: date
     return_date: Optional[date]
     passengers: int
-    search_results: Optional[dict]
+    search_results: Optional[Union[Dict[str, Any], List[Any]]]
+    created_at: datetime
+    segments: Optional[List[FlightSegment]] = None  # Multi-city searches only
+
+
+class CalendarSearch(BaseModel):
+    """Cheapest fare for every departure date in a range"""
+    origin: str
+    destination: str
+    start_date: date
+    end_date: date
+    trip_length_days: Optional[int] = Field(None, ge=1, le=90, description="Return this many days after each departure")
+    passengers: int = Field(default=1, ge=1, le=9)
+    cabin_class: Optional[str] = Field(default="economy")
+
+
+# Search Job Models
+class SearchJobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str  # 'queued', 'running', 'succeeded', 'failed', 'cancelled'
+    progress_done: int
+    progress_total: int
+    partial_results: List[Any]
+    result: Optional[Any] = None
+    search_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+# Price Watch Models
+class PriceWatchCreate(BaseModel):
+    trip_id: int
+    origin: str
+    destination: str
+    departure_date: date
+    return_date: Optional[date] = None
+    passengers: int = Field(default=1, ge=1, le=9)
+    cabin_class: Optional[str] = Field(default="economy")
+    webhook_url: Optional[str] = Field(None, description="URL that receives a POST for every detected change; its host must be in PRICE_WATCH_WEBHOOK_HOSTS")
+
+
+class PriceWatchResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    trip_id: int
+    origin: str
+    destination: str
+    departure_date: date
+    return_date: Optional[date]
+    passengers: int
+    cabin_class: str
+    webhook_url: Optional[str]
+    active: bool
+    lowest_price: Optional[float]
+    last_checked_at: Optional[datetime]
     created_at: datetime
+    check_failures: int = 0  # Consecutive failed checks
+    last_error: Optional[str] = None
+
+
+class PriceWatchChange(BaseModel):
+    """One offer that appeared, disappeared or changed price between two checks"""
+    id: int
+    watch_id: int
+    change_type: str  # 'added', 'removed', 'price'
+    offer_id: str
+    old_price: Optional[float]
+    new_price: Optional[float]
+    currency: Optional[str]
+    detected_at: datetime
+
+
+# Batch Search Models
+class BatchSearchRequest(BaseModel):
+    trip_id: Optional[int] = None
+    searches: List[Union[AirfareSearchReturn, AirfareSearchOneWay]] = Field(
+        ..., min_length=1, description="One-way and return queries; items with a return_date are return searches"
+    )
+
+
+class BatchSearchItem(BaseModel):
+    """Outcome of one query in a batch, in request order"""
+    index: int
+    status_code: int
+    duplicate_of: Optional[int] = Field(None, description="Index of the identical query this one shares results with")
+    search: Optional[AirfareSearchResponse] = None
+    error: Optional[str] = None
 
 
 class FlightOption(BaseModel):
@@ -1,8 +1,33 @@
-import httpx
-from typing import List, Optional, Dict, Any
+import asyncio
+import heapq
+import importlib
+import logging
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
 from datetime import date, datetime, timedelta
 from app.config import settings
+from app.metrics import stage
 from app.services.airline_codes import get_airline_name
+from app.services.cache import TTLCache
+from app.services.itinerary import dedupe_flights, top_return_itineraries
+from app.services.locations import location_index
+from app.services.mock_flights import generate_flights
+from app.services.rate_limit import TokenBucket
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def nearby_pairs(origin: str, destination: str) -> List[Tuple[str, str]]:
+    """Airport pairs a nearby search covers, each searched (and cached) on its own"""
+    return [
+        (o, d)
+        for o in location_index.expand(origin)
+        for d in location_index.expand(destination)
+        if o != d
+    ]
 
 
 class AmadeusService:
@@ -13,24 +38,127 @@ class AmadeusService:
     def __init__(self):
         self.client_id = getattr(settings, 'amadeus_client_id', None)
         self.client_secret = getattr(settings, 'amadeus_client_secret', None)
-        self.base_url = "https://test.api.amadeus.com"  # Test API URL
+        if settings.amadeus_base_url:
+            self.base_url = settings.amadeus_base_url.rstrip("/")
+        elif settings.amadeus_use_production:
+            self.base_url = "https://api.amadeus.com"
+        else:
+            self.base_url = "https://test.api.amadeus.com"  # Test API URL
         self.token_url = f"{self.base_url}/v1/security/oauth2/token"
         self._access_token: Optional[str] = None
         self._token_expires_at: Optional[float] = None  # Store as timestamp
+        self._token_lock = asyncio.Lock()
+        # Per origin/destination/date results, shared by plain and nearby-airport searches
+        self._cache = TTLCache(
+            maxsize=settings.flight_cache_max_entries,
+            ttl=settings.flight_cache_ttl_seconds
+        )
+        # Global upstream budget for all flight-offer calls
+        self._rate_limiter = TokenBucket(
+            rate=settings.amadeus_rate_limit_per_second,
+            capacity=settings.amadeus_rate_limit_burst
+        )
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
     
-    async def _get_access_token(self) -> str:
-        """Get or refresh Amadeus OAuth2 access token"""
-        # Check if we have a valid token
+    def _http(self) -> "httpx.AsyncClient":
+        """Pooled client shared by all upstream calls, so connections are kept alive between searches"""
+        # Imported here rather than at module level: httpx is slow to import and not needed for startup
+        import httpx
+        
+        loop = asyncio.get_running_loop()
+        # Pooled connections belong to the loop that opened them
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client_loop = loop
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=settings.amadeus_max_connections,
+                    max_keepalive_connections=settings.amadeus_max_connections
+                )
+            )
+        return self._client
+    
+    async def warm_up(self):
+        """Open the connection pool and fetch an access token ahead of the first search"""
+        # Import httpx off the event loop: the app may already be serving requests
+        await asyncio.to_thread(importlib.import_module, "httpx")
+        self._http()
+        if not self.has_credentials:
+            return
+        try:
+            await self._get_access_token()
+        except ValueError as e:
+            # Not fatal: the first search will try again
+            logger.warning("amadeus token warm-up failed: %s", e)
+    
+    async def close(self):
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._client_loop = None
+    
+    @property
+    def has_credentials(self) -> bool:
+        return bool(self.client_id and self.client_secret)
+    
+    @staticmethod
+    def _cache_key(
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date],
+        passengers: int,
+        cabin_class: str
+    ) -> tuple:
+        return (
+            origin.upper(),
+            destination.upper(),
+            departure_date,
+            return_date,
+            passengers,
+            cabin_class.upper()
+        )
+    
+    def cache_expires_in(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date] = None,
+        passengers: int = 1,
+        cabin_class: str = "ECONOMY"
+    ) -> Optional[float]:
+        """Seconds until cached results for a search expire, or None if not cached"""
+        return self._cache.expires_in(
+            self._cache_key(origin, destination, departure_date, return_date, passengers, cabin_class)
+        )
+    
+    def _valid_token(self) -> Optional[str]:
         if self._access_token and self._token_expires_at:
             current_time = datetime.now().timestamp()
             if current_time < self._token_expires_at:
                 return self._access_token
+        return None
+    
+    async def _get_access_token(self) -> str:
+        """Get or refresh Amadeus OAuth2 access token"""
+        # Check if we have a valid token
+        token = self._valid_token()
+        if token:
+            return token
+        # Concurrent searches share a single token request
+        async with self._token_lock:
+            return self._valid_token() or await self._request_access_token()
+    
+    async def _request_access_token(self) -> str:
+        import httpx
         
         if not self.client_id or not self.client_secret:
             raise ValueError("Amadeus API credentials are required. Please set AMADEUS_CLIENT_ID and AMADEUS_CLIENT_SECRET in .env file")
         
         try:
-            async with httpx.AsyncClient() as client:
+            with stage("upstream_token"):
+                client = self._http()
                 response = await client.post(
                     self.token_url,
                     data={
@@ -40,15 +168,15 @@ class AmadeusService:
                     },
                     timeout=10.0
                 )
-                response.raise_for_status()
-                data = response.json()
-                self._access_token = data.get("access_token")
-                if not self._access_token:
-                    raise ValueError("Failed to obtain access token from Amadeus API")
-                # Token expires in data.get("expires_in") seconds (usually 1799 = ~30 min)
-                expires_in = data.get("expires_in", 1799)
-                self._token_expires_at = datetime.now().timestamp() + expires_in - 60  # Refresh 1 min early
-                return self._access_token
+            response.raise_for_status()
+            data = response.json()
+            self._access_token = data.get("access_token")
+            if not self._access_token:
+                raise ValueError("Failed to obtain access token from Amadeus API")
+            # Token expires in data.get("expires_in") seconds (usually 1799 = ~30 min)
+            expires_in = data.get("expires_in", 1799)
+            self._token_expires_at = datetime.now().timestamp() + expires_in - 60  # Refresh 1 min early
+            return self._access_token
         except httpx.HTTPStatusError as e:
             error_msg = f"Amadeus API authentication failed: {e.response.status_code}"
             try:
@@ -70,70 +198,86 @@ class AmadeusService:
         departure_date: date,
         return_date: Optional[date] = None,
         passengers: int = 1,
-        cabin_class: str = "ECONOMY"
+        cabin_class: str = "ECONOMY",
+        use_cache: bool = True
     ) -> List[Dict[str, Any]]:
         """
         Search for flights using Amadeus API
         Returns list of flight options
         Raises ValueError if API connection fails
+        With use_cache=False the cache is bypassed for reading but still refreshed
         """
+        import httpx
+        
+        cache_key = self._cache_key(origin, destination, departure_date, return_date, passengers, cabin_class)
+        if use_cache:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         token = await self._get_access_token()
         
         if not token:
             raise ValueError("Failed to obtain Amadeus API access token")
         
+        await self._rate_limiter.acquire()
+        
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {token}",
-                    "Content-Type": "application/json"
+            client = self._http()
+            headers = {
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json"
+            }
+            
+            if return_date:
+                # Return trip - use Flight Offers Search API
+                url = f"{self.base_url}/v2/shopping/flight-offers"
+                params = {
+                    "originLocationCode": origin.upper(),
+                    "destinationLocationCode": destination.upper(),
+                    "departureDate": departure_date.strftime("%Y-%m-%d"),
+                    "returnDate": return_date.strftime("%Y-%m-%d"),
+                    "adults": passengers,
+                    "max": settings.amadeus_max_offers  # Limit results
                 }
                 
-                if return_date:
-                    # Return trip - use Flight Offers Search API
-                    url = f"{self.base_url}/v2/shopping/flight-offers"
-                    params = {
-                        "originLocationCode": origin.upper(),
-                        "destinationLocationCode": destination.upper(),
-                        "departureDate": departure_date.strftime("%Y-%m-%d"),
-                        "returnDate": return_date.strftime("%Y-%m-%d"),
-                        "adults": passengers,
-                        "max": 10  # Limit results
-                    }
-                    
-                    response = await client.get(url, headers=headers, params=params, timeout=30.0)
-                else:
-                    # One-way trip
-                    url = f"{self.base_url}/v2/shopping/flight-offers"
-                    params = {
-                        "originLocationCode": origin.upper(),
-                        "destinationLocationCode": destination.upper(),
-                        "departureDate": departure_date.strftime("%Y-%m-%d"),
-                        "adults": passengers,
-                        "max": 10
-                    }
-                    
+                with stage("upstream_search"):
                     response = await client.get(url, headers=headers, params=params, timeout=30.0)
+            else:
+                # One-way trip
+                url = f"{self.base_url}/v2/shopping/flight-offers"
+                params = {
+                    "originLocationCode": origin.upper(),
+                    "destinationLocationCode": destination.upper(),
+                    "departureDate": departure_date.strftime("%Y-%m-%d"),
+                    "adults": passengers,
+                    "max": settings.amadeus_max_offers
+                }
                 
-                response.raise_for_status()
-                data = response.json()
-                
-                # Debug: Check response structure
-                if "data" not in data or not data.get("data"):
-                    error_detail = data.get("errors", [])
-                    if error_detail:
-                        error_msg = "; ".join([err.get("detail", str(err)) for err in error_detail])
-                        raise ValueError(f"Amadeus API returned no flight data: {error_msg}")
-                    raise ValueError(f"No flight data in response. Response keys: {list(data.keys())}")
-                
-                # Parse Amadeus response into our format
+                with stage("upstream_search"):
+                    response = await client.get(url, headers=headers, params=params, timeout=30.0)
+            
+            response.raise_for_status()
+            data = response.json()
+            
+            # Debug: Check response structure
+            if "data" not in data or not data.get("data"):
+                error_detail = data.get("errors", [])
+                if error_detail:
+                    error_msg = "; ".join([err.get("detail", str(err)) for err in error_detail])
+                    raise ValueError(f"Amadeus API returned no flight data: {error_msg}")
+                raise ValueError(f"No flight data in response. Response keys: {list(data.keys())}")
+            
+            # Parse Amadeus response into our format
+            with stage("parse"):
                 flights = self._parse_amadeus_response(data, return_date is not None)
-                
-                if not flights or (isinstance(flights, list) and len(flights) == 0):
-                    raise ValueError("No flights found for the given search criteria")
-                
-                return flights
-        
+            
+            if not flights or (isinstance(flights, list) and len(flights) == 0):
+                raise ValueError("No flights found for the given search criteria")
+            
+            self._cache.set(cache_key, flights)
+            return flights
+    
         except httpx.HTTPStatusError as e:
             error_msg = f"Amadeus API request failed: {e.response.status_code}"
             try:
@@ -154,14 +298,67 @@ class AmadeusService:
         except Exception as e:
             raise ValueError(f"Unexpected error in Amadeus flight search: {str(e)}") from e
     
+    async def search_nearby(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: date,
+        return_date: Optional[date] = None,
+        passengers: int = 1,
+        cabin_class: str = "ECONOMY"
+    ):
+        """
+        Search every airport pair of the origin and destination metro areas
+        (e.g. NYC -> LON covers JFK/LGA/EWR x LHR/LGW/STN/LCY/LTN) concurrently
+        and merge the results into one price-ranked list.
+        Pairs go through the same cache and rate limiter as search_flights.
+        """
+        pairs = nearby_pairs(origin, destination)
+        if not pairs:
+            raise ValueError("Origin and destination cover the same airports")
+        
+        semaphore = asyncio.Semaphore(settings.amadeus_max_concurrency)
+        
+        async def search_pair(pair_origin: str, pair_destination: str):
+            async with semaphore:
+                return await self.search_flights(
+                    origin=pair_origin,
+                    destination=pair_destination,
+                    departure_date=departure_date,
+                    return_date=return_date,
+                    passengers=passengers,
+                    cabin_class=cabin_class
+                )
+        
+        results = await asyncio.gather(
+            *(search_pair(o, d) for o, d in pairs),
+            return_exceptions=True
+        )
+        found = [r for r in results if not isinstance(r, BaseException)]
+        if not found:
+            # Every pair failed - surface the first error
+            raise results[0]
+        
+        # Each pair's list is already sorted by price, so a k-way merge is enough
+        by_price = lambda flight: flight["price"]
+        if return_date:
+            itineraries = heapq.merge(*(r.get("itineraries", []) for r in found), key=by_price)
+            return {
+                "outbound": list(heapq.merge(*(r["outbound"] for r in found), key=by_price)),
+                "return": list(heapq.merge(*(r["return"] for r in found), key=by_price)),
+                "itineraries": list(islice(itineraries, settings.return_itinerary_limit))
+            }
+        return list(heapq.merge(*found, key=by_price))
+    
     def _parse_amadeus_response(self, data: Dict[str, Any], is_return: bool = False) -> List[Dict[str, Any]]:
         """Parse Amadeus API response into our standard format"""
         flights = []
         outbound_flights = []
         return_flights = []
+        linked_offers = []
         
         if "data" not in data:
-            return flights if not is_return else {"outbound": [], "return": []}
+            return flights if not is_return else {"outbound": [], "return": [], "itineraries": []}
         
         for offer in data["data"]:
             # Amadeus returns complex nested structure
@@ -174,6 +371,7 @@ class AmadeusService:
             
             if is_return:
                 # For return flights, first itinerary is outbound, second is return
+                offer_legs = []
                 for idx, itinerary in enumerate(itineraries):
                     segments = itinerary.get("segments", [])
                     if not segments:
@@ -202,6 +400,7 @@ class AmadeusService:
                     airline_name = get_airline_name(carrier_code)
                     
                     flight_data = {
+                        "id": self._leg_id(segments),
                         "airline": carrier_code,
                         "airline_name": airline_name,
                         "flight_number": f"{carrier_code}{flight_number}",
@@ -220,6 +419,11 @@ class AmadeusService:
                         outbound_flights.append(flight_data)
                     else:
                         return_flights.append(flight_data)
+                    offer_legs.append(flight_data)
+                
+                # Keep the outbound/return pairing this offer prices together
+                if len(offer_legs) == 2:
+                    linked_offers.append((offer_legs[0], offer_legs[1], price, currency))
             else:
                 # One-way flight - process first itinerary only
                 if itineraries:
@@ -251,6 +455,7 @@ class AmadeusService:
                     airline_name = get_airline_name(carrier_code)
                     
                     flights.append({
+                        "id": self._leg_id(segments),
                         "airline": carrier_code,
                         "airline_name": airline_name,
                         "flight_number": f"{carrier_code}{flight_number}",
@@ -266,17 +471,22 @@ class AmadeusService:
                     })
         
         if is_return:
-            # Sort by price and return structured format
-            outbound_flights.sort(key=lambda x: x["price"])
-            return_flights.sort(key=lambda x: x["price"])
+            # Distinct legs priced at their cheapest round trip, plus the real pairs
             return {
-                "outbound": outbound_flights,
-                "return": return_flights
+                "outbound": dedupe_flights(outbound_flights),
+                "return": dedupe_flights(return_flights),
+                "itineraries": top_return_itineraries(linked_offers)
             }
         
         flights.sort(key=lambda x: x["price"])
         return flights
     
+    @staticmethod
+    def _leg_id(segments: List[Dict[str, Any]]) -> str:
+        """Stable identity of a leg: its flight numbers plus first departure time"""
+        numbers = "-".join(f"{seg.get('carrierCode', '')}{seg.get('number', '')}" for seg in segments)
+        return f"{numbers}@{segments[0].get('departure', {}).get('at', '')}"
+    
     def _get_mock_flights(
         self,
         origin: str,
@@ -284,75 +494,27 @@ class AmadeusService:
         departure_date: date,
         return_date: Optional[date] = None
     ) -> List[Dict[str, Any]]:
-        """Generate mock flight data for development/testing"""
-        import random
-        
-        flights = []
-        airlines = ["American Airlines", "Delta", "United", "Southwest", "JetBlue"]
-        
-        # Generate 5-10 mock flights
-        for i in range(random.randint(5, 10)):
-            departure_time = datetime.combine(
-                departure_date,
-                datetime.min.time().replace(hour=random.randint(6, 22))
-            )
-            duration_hours = random.randint(2, 12)
-            arrival_time = departure_time + timedelta(hours=duration_hours)
-            
-            flights.append({
-                "airline": random.choice(airlines),
-                "flight_number": f"{random.choice(['AA', 'DL', 'UA', 'WN', 'B6'])}{random.randint(100, 9999)}",
-                "origin": origin,
-                "destination": destination,
-                "departure_time": departure_time.isoformat(),
-                "arrival_time": arrival_time.isoformat(),
-                "duration": f"{duration_hours}h {random.randint(0, 59)}m",
-                "price": round(random.uniform(200, 1500), 2),
-                "currency": "USD",
-                "stops": random.choice([0, 0, 0, 1, 1, 2]),
-                "cabin_class": "economy"
-            })
-        
-        # Sort by price
-        flights.sort(key=lambda x: x["price"])
-        
-        if return_date:
-            # Add return flights
-            return_flights = []
-            for i in range(random.randint(5, 10)):
-                departure_time = datetime.combine(
-                    return_date,
-                    datetime.min.time().replace(hour=random.randint(6, 22))
-                )
-                duration_hours = random.randint(2, 12)
-                arrival_time = departure_time + timedelta(hours=duration_hours)
-                
-                return_flights.append({
-                    "airline": random.choice(airlines),
-                    "flight_number": f"{random.choice(['AA', 'DL', 'UA', 'WN', 'B6'])}{random.randint(100, 9999)}",
-                    "origin": destination,
-                    "destination": origin,
-                    "departure_time": departure_time.isoformat(),
-                    "arrival_time": arrival_time.isoformat(),
-                    "duration": f"{duration_hours}h {random.randint(0, 59)}m",
-                    "price": round(random.uniform(200, 1500), 2),
-                    "currency": "USD",
-                    "stops": random.choice([0, 0, 0, 1, 1, 2]),
-                    "cabin_class": "economy"
-                })
-            
-            return_flights.sort(key=lambda x: x["price"])
-            return {"outbound": flights, "return": return_flights}
-        
-        return flights
+        """Deterministic mock flights for development/testing (see app/services/mock_flights.py)"""
+        return generate_flights(
+            origin,
+            destination,
+            departure_date,
+            return_date,
+            count=settings.mock_flight_offers,
+            seed=settings.mock_flight_seed
+        )
     
     async def search_multi_city(
         self,
         segments: List[Dict[str, Any]],
         passengers: int = 1,
-        cabin_class: str = "ECONOMY"
+        cabin_class: str = "ECONOMY",
+        on_segment: Optional[Callable[[List[Dict[str, Any]]], None]] = None
     ) -> List[Dict[str, Any]]:
-        """Search for multi-city flights"""
+        """
+        Search for multi-city flights
+        on_segment, if given, is called with the results so far after each segment
+        """
         all_segments = []
         for segment in segments:
             flights = await self.search_flights(
@@ -366,5 +528,7 @@ class AmadeusService:
                 "segment": segment,
                 "flights": flights
             })
+            if on_segment is not None:
+                on_segment(all_segments)
         return all_segments
 
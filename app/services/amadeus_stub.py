@@ -0,0 +1,143 @@
+"""
+Local stand-in for the Amadeus token and flight-offers endpoints.
+
+Serves deterministic, seed-driven payloads (app/services/mock_flights.py) so
+load tests and benchmarks do not depend on test.api.amadeus.com quotas or
+network variance. Point the app at it with AMADEUS_BASE_URL=http://127.0.0.1:8081
+(any client id/secret is accepted).
+
+Run with:  python -m app.services.amadeus_stub --port 8081 --offers 100
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+from datetime import date
+from typing import List, Optional
+from fastapi import FastAPI, Form, Query
+from fastapi.responses import JSONResponse
+from app.config import settings
+from app.services.mock_flights import generate_offers
+
+
+def _error(status: int, code: int, title: str, detail: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"errors": [{"status": status, "code": code, "title": title, "detail": detail}]}
+    )
+
+
+def create_stub_app(
+    seed: Optional[int] = None,
+    offers: Optional[int] = None,
+    latency_ms: Optional[float] = None,
+    latency_jitter_ms: Optional[float] = None,
+    error_rate: Optional[float] = None,
+    throttle_rate: Optional[float] = None
+) -> FastAPI:
+    """Build the stand-in app; unset options fall back to the AMADEUS_STUB_* settings"""
+    config = {
+        "seed": settings.amadeus_stub_seed if seed is None else seed,
+        "offers": settings.amadeus_stub_offers if offers is None else offers,
+        "latency_ms": settings.amadeus_stub_latency_ms if latency_ms is None else latency_ms,
+        "latency_jitter_ms": settings.amadeus_stub_latency_jitter_ms if latency_jitter_ms is None else latency_jitter_ms,
+        "error_rate": settings.amadeus_stub_error_rate if error_rate is None else error_rate,
+        "throttle_rate": settings.amadeus_stub_throttle_rate if throttle_rate is None else throttle_rate
+    }
+    # Separate seeded RNG for fault injection so payloads stay identical across runs
+    faults = random.Random(config["seed"])
+    stats = {"token_requests": 0, "searches": 0, "errors": 0, "throttled": 0}
+
+    app = FastAPI(title="Amadeus stand-in", docs_url=None, redoc_url=None)
+    app.state.config = config
+    app.state.stats = stats
+
+    async def _delay():
+        delay = config["latency_ms"] + faults.uniform(0, config["latency_jitter_ms"])
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    @app.post("/v1/security/oauth2/token")
+    async def token(
+        grant_type: str = Form(...),
+        client_id: str = Form(...),
+        client_secret: str = Form(...)
+    ):
+        stats["token_requests"] += 1
+        await _delay()
+        return {
+            "type": "amadeusOAuth2Token",
+            "username": "stub@example.com",
+            "application_name": "amadeus-stub",
+            "client_id": client_id,
+            "token_type": "Bearer",
+            "access_token": hashlib.sha1(client_id.encode()).hexdigest(),
+            "expires_in": 1799,
+            "state": "approved",
+            "scope": ""
+        }
+
+    @app.get("/v2/shopping/flight-offers")
+    async def flight_offers(
+        originLocationCode: str = Query(..., min_length=3, max_length=3),
+        destinationLocationCode: str = Query(..., min_length=3, max_length=3),
+        departureDate: date = Query(...),
+        returnDate: Optional[date] = None,
+        adults: int = Query(1, ge=1, le=9),
+        max: int = Query(250, ge=1)
+    ):
+        stats["searches"] += 1
+        await _delay()
+
+        roll = faults.random()
+        if roll < config["throttle_rate"]:
+            stats["throttled"] += 1
+            return _error(429, 38194, "Too many requests", "The network rate limit is exceeded, please try again later")
+        if roll < config["throttle_rate"] + config["error_rate"]:
+            stats["errors"] += 1
+            return _error(500, 141, "SYSTEM ERROR HAS OCCURRED", "Injected stand-in failure")
+
+        return generate_offers(
+            originLocationCode.upper(),
+            destinationLocationCode.upper(),
+            departureDate,
+            returnDate,
+            adults,
+            count=min(max, config["offers"]),
+            seed=config["seed"]
+        )
+
+    @app.get("/__stub/stats")
+    async def get_stats():
+        return {"config": config, "stats": stats}
+
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local Amadeus stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--offers", type=int, help="Offers per search response")
+    parser.add_argument("--latency-ms", type=float)
+    parser.add_argument("--latency-jitter-ms", type=float)
+    parser.add_argument("--error-rate", type=float, help="Fraction of searches answered with 500")
+    parser.add_argument("--throttle-rate", type=float, help="Fraction of searches answered with 429")
+    args = parser.parse_args(argv)
+
+    app = create_stub_app(
+        seed=args.seed,
+        offers=args.offers,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
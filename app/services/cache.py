@@ -0,0 +1,52 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Small LRU cache with per-entry expiry.
+    Values are shared between callers, so they must be treated as read-only.
+    """
+    def __init__(self, maxsize: int = 1000, ttl: float = 900.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value or None if missing/expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """Seconds until an entry expires, or None if it is not cached"""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - time.monotonic())
+    
+    def clear(self):
+        self._data.clear()
+    
+    def __len__(self) -> int:
+        return len(self._data)
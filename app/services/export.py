@@ -0,0 +1,177 @@
+"""
+Streaming export of search history as Arrow IPC, Parquet or NDJSON.
+
+Rows are pulled from DuckDB as Arrow record batches of
+settings.export_batch_rows and each batch is encoded and handed on before the
+next one is read, so memory stays flat however long the history is. Results
+are looked up per batch from search_payloads and written as their stored
+canonical JSON; rows are never turned into Python dicts.
+
+    python -m app.services.export --format parquet --out history.parquet
+    python -m app.services.export --format ndjson --user-id 1 > history.ndjson
+"""
+import argparse
+import sys
+from typing import TYPE_CHECKING, Iterator, List, Optional
+from app.config import settings
+from app.database import db
+from app.services.payloads import decompress_payload
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "ndjson": "application/x-ndjson"
+}
+EXTENSIONS = {"arrow": "arrows", "parquet": "parquet", "ndjson": "ndjson"}
+
+_FIELDS = [
+    "id", "trip_id", "user_id", "search_type", "origin", "destination",
+    "departure_date", "return_date", "passengers", "created_at"
+]
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter whose bytes are taken after every batch"""
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _query(ndjson: bool, user_id: Optional[int], trip_id: Optional[int]) -> tuple:
+    where, params = [], []
+    if user_id is not None:
+        where.append("user_id = ?")
+        params.append(user_id)
+    if trip_id is not None:
+        where.append("trip_id = ?")
+        params.append(trip_id)
+    # NDJSON lines are built by DuckDB; only the results are spliced in afterwards
+    if ndjson:
+        columns = f"to_json(struct_pack({', '.join(f'{name} := {name}' for name in _FIELDS)})) AS line"
+    else:
+        columns = ", ".join(_FIELDS)
+    sql = f"""
+        SELECT {columns}, results_hash, CAST(search_results AS VARCHAR) AS inline_results
+        FROM airfare_searches
+        {"WHERE " + " AND ".join(where) if where else ""}
+    """
+    return sql, params
+
+
+def _results(lookup, batch: "pa.RecordBatch") -> List[Optional[str]]:
+    """Decompressed results JSON for one batch, fetching each referenced payload once"""
+    hashes = [h for h in set(batch.column("results_hash").to_pylist()) if h is not None]
+    payloads = {}
+    if hashes:
+        rows = lookup.execute(
+            "SELECT hash, codec, payload FROM search_payloads WHERE hash IN (SELECT unnest(?))",
+            [hashes]
+        ).fetchall()
+        payloads = {digest: decompress_payload(codec, payload).decode() for digest, codec, payload in rows}
+    return [
+        payloads.get(digest) if digest is not None else inline
+        for digest, inline in zip(
+            batch.column("results_hash").to_pylist(),
+            batch.column("inline_results").to_pylist()
+        )
+    ]
+
+
+def export_stream(fmt: str, user_id: Optional[int] = None, trip_id: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Encoded export, one chunk per record batch. Runs on its own DuckDB cursors so
+    it can be iterated from a worker thread while requests use the main connection.
+    """
+    if fmt not in MEDIA_TYPES:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    # pyarrow is only needed here, so it is not loaded at startup
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    conn = db.connect()
+    cursor = conn.cursor()
+    lookup = conn.cursor()
+    try:
+        sql, params = _query(fmt == "ndjson", user_id, trip_id)
+        reader = cursor.execute(sql, params).fetch_record_batch(settings.export_batch_rows)
+        keep = [name for name in reader.schema.names if name not in ("results_hash", "inline_results")]
+        schema = pa.schema([reader.schema.field(name) for name in keep] + [pa.field("search_results", pa.string())])
+
+        sink = _ChunkSink()
+        writer = None
+        if fmt == "arrow":
+            writer = pa.ipc.new_stream(sink, schema)
+        elif fmt == "parquet":
+            writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+        for batch in reader:
+            results = _results(lookup, batch)
+            if fmt == "ndjson":
+                # {"id":...,"created_at":...} + "search_results" spliced in before the closing brace
+                yield "".join(
+                    f'{line[:-1]},"search_results":{result or "null"}}}\n'
+                    for line, result in zip(batch.column("line").to_pylist(), results)
+                ).encode()
+                continue
+            out = pa.RecordBatch.from_arrays(
+                [batch.column(name) for name in keep] + [pa.array(results, pa.string())],
+                schema=schema
+            )
+            writer.write_batch(out)
+            yield sink.take()
+
+        if writer is not None:
+            writer.close()
+            yield sink.take()
+    finally:
+        lookup.close()
+        cursor.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Export search history")
+    parser.add_argument("--format", choices=list(MEDIA_TYPES), default="parquet")
+    parser.add_argument("--out", help="Output file (default stdout)")
+    parser.add_argument("--user-id", type=int, help="Only this user's searches (default all users)")
+    parser.add_argument("--trip-id", type=int)
+    args = parser.parse_args(argv)
+
+    out = open(args.out, "wb") if args.out else sys.stdout.buffer
+    try:
+        for chunk in export_stream(args.format, args.user_id, args.trip_id):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
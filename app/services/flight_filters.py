@@ -0,0 +1,226 @@
+import re
+from dataclasses import dataclass
+from datetime import time
+from typing import Any, Dict, List, Optional, Set
+import numpy as np
+
+SORT_KEYS = ("price", "duration", "departure", "best")
+
+_ISO_DURATION = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+_TEXT_DURATION = re.compile(r"(?:(\d+)h)?\s*(?:(\d+)m)?")
+
+
+@dataclass
+class FlightQuery:
+    """Server-side filters, ordering and paging applied to flight lists"""
+    max_stops: Optional[int] = None
+    airlines: Optional[Set[str]] = None
+    exclude_airlines: Optional[Set[str]] = None
+    depart_after: Optional[time] = None
+    depart_before: Optional[time] = None
+    arrive_after: Optional[time] = None
+    arrive_before: Optional[time] = None
+    max_duration_minutes: Optional[int] = None
+    sort: str = "price"
+    limit: Optional[int] = None
+    offset: int = 0
+
+    def has_filters(self) -> bool:
+        return any(
+            value is not None
+            for value in (
+                self.max_stops, self.airlines, self.exclude_airlines,
+                self.depart_after, self.depart_before,
+                self.arrive_after, self.arrive_before,
+                self.max_duration_minutes
+            )
+        )
+
+    def is_noop(self) -> bool:
+        """True when the query leaves results exactly as stored (sorted by price)"""
+        return not self.has_filters() and self.sort == "price" and self.limit is None and not self.offset
+
+
+def parse_duration_minutes(duration: str) -> int:
+    """Parse 'PT5H30M' (Amadeus) or '5h 30m' (mock data) into minutes; 0 if unknown"""
+    if not duration:
+        return 0
+    match = _ISO_DURATION.fullmatch(duration)
+    if match and any(match.groups()):
+        days, hours, minutes = (int(g) if g else 0 for g in match.groups())
+        return days * 1440 + hours * 60 + minutes
+    match = _TEXT_DURATION.fullmatch(duration.strip())
+    if match and any(match.groups()):
+        hours, minutes = (int(g) if g else 0 for g in match.groups())
+        return hours * 60 + minutes
+    return 0
+
+
+def _minute_of_day(timestamp: str) -> int:
+    # ISO timestamps from the parser: YYYY-MM-DDTHH:MM:SS
+    try:
+        return int(timestamp[11:13]) * 60 + int(timestamp[14:16])
+    except (TypeError, ValueError):
+        return -1
+
+
+def _window_mask(minutes: np.ndarray, after: Optional[time], before: Optional[time]) -> np.ndarray:
+    """Mask for minutes inside [after, before]; windows may wrap past midnight"""
+    mask = minutes >= 0
+    lo = after.hour * 60 + after.minute if after else None
+    hi = before.hour * 60 + before.minute if before else None
+    if lo is not None and hi is not None and lo > hi:
+        return mask & ((minutes >= lo) | (minutes <= hi))
+    if lo is not None:
+        mask &= minutes >= lo
+    if hi is not None:
+        mask &= minutes <= hi
+    return mask
+
+
+def pareto_ranks(prices: np.ndarray, durations: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated sorting on (price, duration), both minimized.
+    Rank 0 is the Pareto frontier; each later rank is the frontier of what remains.
+    Identical (price, duration) points do not dominate each other and share a rank.
+    """
+    n = len(prices)
+    ranks = np.full(n, -1, dtype=np.int64)
+    # Sort by price, ties broken by duration, so each frontier is a running minimum
+    order = np.lexsort((durations, prices))
+    remaining = order
+    rank = 0
+    while remaining.size:
+        p, d = prices[remaining], durations[remaining]
+        # best[k]: shortest duration among the first k points
+        best = np.minimum.accumulate(np.concatenate(([np.inf], d)))
+        # Compare each point only with points before its run of identical ones
+        new_point = np.ones(remaining.size, dtype=bool)
+        new_point[1:] = (p[1:] != p[:-1]) | (d[1:] != d[:-1])
+        run_start = np.maximum.accumulate(np.where(new_point, np.arange(remaining.size), 0))
+        on_front = d < best[run_start]
+        ranks[remaining[on_front]] = rank
+        remaining = remaining[~on_front]
+        rank += 1
+    return ranks
+
+
+def _durations(flights: List[Dict[str, Any]]) -> np.ndarray:
+    return np.fromiter(
+        (parse_duration_minutes(f.get("duration", "")) for f in flights), dtype=np.float64, count=len(flights)
+    )
+
+
+def _filter_mask(flights: List[Dict[str, Any]], query: FlightQuery, durations: np.ndarray) -> np.ndarray:
+    """Boolean mask of flights passing every filter in the query"""
+    n = len(flights)
+    mask = np.ones(n, dtype=bool)
+    if query.max_stops is not None:
+        stops = np.fromiter((f.get("stops", 0) for f in flights), dtype=np.int64, count=n)
+        mask &= stops <= query.max_stops
+    if query.airlines or query.exclude_airlines:
+        carriers = np.array([f.get("airline", "") for f in flights], dtype=object)
+        if query.airlines:
+            mask &= np.isin(carriers, list(query.airlines))
+        if query.exclude_airlines:
+            mask &= ~np.isin(carriers, list(query.exclude_airlines))
+    if query.max_duration_minutes is not None:
+        mask &= durations <= query.max_duration_minutes
+    if query.depart_after or query.depart_before:
+        departures = np.fromiter(
+            (_minute_of_day(f.get("departure_time", "")) for f in flights), dtype=np.int64, count=n
+        )
+        mask &= _window_mask(departures, query.depart_after, query.depart_before)
+    if query.arrive_after or query.arrive_before:
+        arrivals = np.fromiter(
+            (_minute_of_day(f.get("arrival_time", "")) for f in flights), dtype=np.int64, count=n
+        )
+        mask &= _window_mask(arrivals, query.arrive_after, query.arrive_before)
+    return mask
+
+
+def _select(
+    items: List[Dict[str, Any]],
+    mask: np.ndarray,
+    prices: np.ndarray,
+    durations: np.ndarray,
+    departure_times: List[str],
+    query: FlightQuery
+) -> List[Dict[str, Any]]:
+    """Order the items passing mask by query.sort and return the requested page"""
+    idx = np.flatnonzero(mask)
+    ranks = None
+    if query.sort == "duration":
+        idx = idx[np.lexsort((prices[idx], durations[idx]))]
+    elif query.sort == "departure":
+        # ISO timestamps sort lexicographically
+        departures = np.array([departure_times[i] for i in idx], dtype=object)
+        idx = idx[np.argsort(departures, kind="stable")]
+    elif query.sort == "best":
+        ranks = pareto_ranks(prices[idx], durations[idx])
+        order = np.lexsort((durations[idx], prices[idx], ranks))
+        idx, ranks = idx[order], ranks[order]
+    else:
+        idx = idx[np.argsort(prices[idx], kind="stable")]
+
+    end = None if query.limit is None else query.offset + query.limit
+    page = idx[query.offset:end]
+    if ranks is not None:
+        page_ranks = ranks[query.offset:end]
+        return [{**items[i], "pareto_rank": int(r)} for i, r in zip(page, page_ranks)]
+    return [items[i] for i in page]
+
+
+def apply_query(flights: List[Dict[str, Any]], query: FlightQuery) -> List[Dict[str, Any]]:
+    """Filter, order and slice a flat list of flights"""
+    if not flights or query.is_noop():
+        return flights
+
+    prices = np.fromiter((f.get("price", 0.0) for f in flights), dtype=np.float64, count=len(flights))
+    durations = _durations(flights)
+    mask = _filter_mask(flights, query, durations)
+    departure_times = [f.get("departure_time", "") for f in flights]
+    return _select(flights, mask, prices, durations, departure_times, query)
+
+
+def apply_to_itineraries(itineraries: List[Dict[str, Any]], query: FlightQuery) -> List[Dict[str, Any]]:
+    """
+    Filter, order and slice round-trip itineraries.
+    Filters must hold for both legs; durations are summed across legs.
+    """
+    if not itineraries or query.is_noop():
+        return itineraries
+
+    outbound = [it["outbound"] for it in itineraries]
+    inbound = [it["return"] for it in itineraries]
+    outbound_durations = _durations(outbound)
+    inbound_durations = _durations(inbound)
+    mask = _filter_mask(outbound, query, outbound_durations) & _filter_mask(inbound, query, inbound_durations)
+    prices = np.fromiter((it["price"] for it in itineraries), dtype=np.float64, count=len(itineraries))
+    departure_times = [leg.get("departure_time", "") for leg in outbound]
+    return _select(
+        itineraries, mask, prices, outbound_durations + inbound_durations, departure_times, query
+    )
+
+
+def apply_to_results(search_results: Any, query: FlightQuery) -> Any:
+    """Apply a query to stored search_results of any search type"""
+    if not search_results or query.is_noop():
+        return search_results
+    if isinstance(search_results, dict):
+        # Return search: filter each direction and the paired itineraries independently
+        filtered = {}
+        for key, value in search_results.items():
+            if key in ("outbound", "return"):
+                value = apply_query(value, query)
+            elif key == "itineraries":
+                value = apply_to_itineraries(value, query)
+            filtered[key] = value
+        return filtered
+    if search_results and isinstance(search_results[0], dict) and "segment" in search_results[0]:
+        # Multi-city: filter each segment's flights
+        return [
+            {**segment, "flights": apply_query(segment.get("flights") or [], query)}
+            for segment in search_results
+        ]
+    return apply_query(search_results, query)
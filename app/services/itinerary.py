@@ -0,0 +1,175 @@
+import heapq
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from app.config import settings
+from app.services.flight_filters import parse_duration_minutes
+
+T = TypeVar("T")
+
+
+def k_best_merge(
+    rows: List[List[T]],
+    k: int,
+    key: Callable[[T], float],
+    is_valid: Optional[Callable[[T], bool]] = None
+) -> List[T]:
+    """
+    Return the k smallest valid items across rows that are each sorted by key.
+    Only the current head of each row sits on the heap, so this costs
+    O((k + skipped) log len(rows)) instead of sorting everything.
+    """
+    heap = [(key(row[0]), i, 0) for i, row in enumerate(rows) if row]
+    heapq.heapify(heap)
+    best: List[T] = []
+    while heap and len(best) < k:
+        _, i, j = heapq.heappop(heap)
+        row = rows[i]
+        if j + 1 < len(row):
+            heapq.heappush(heap, (key(row[j + 1]), i, j + 1))
+        item = row[j]
+        if is_valid is None or is_valid(item):
+            best.append(item)
+    return best
+
+
+def dedupe_flights(flights: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cheapest copy of each distinct flight (by id), sorted by price"""
+    cheapest: Dict[str, Dict[str, Any]] = {}
+    for flight in flights:
+        current = cheapest.get(flight["id"])
+        if current is None or flight["price"] < current["price"]:
+            cheapest[flight["id"]] = flight
+    return sorted(cheapest.values(), key=lambda f: f["price"])
+
+
+def _is_valid_return(itinerary: Dict[str, Any]) -> bool:
+    # Return leg must leave after the outbound leg lands (local ISO timestamps)
+    return itinerary["return"]["departure_time"] > itinerary["outbound"]["arrival_time"]
+
+
+def top_return_itineraries(
+    linked_offers: Iterable[Tuple[Dict[str, Any], Dict[str, Any], float, str]],
+    k: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build deduplicated round-trip itineraries from (outbound, return, price, currency)
+    offers and return the k cheapest valid ones.
+    Offers are grouped by outbound leg; each group's returns are price-sorted and
+    the groups are k-way merged, so only priced pairs are ever considered.
+    """
+    if k is None:
+        k = settings.return_itinerary_limit
+
+    # Same outbound+return pair offered more than once: keep the cheapest fare
+    pairs: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for outbound, inbound, price, currency in linked_offers:
+        pair_key = (outbound["id"], inbound["id"])
+        current = pairs.get(pair_key)
+        if current is None or price < current["price"]:
+            pairs[pair_key] = {
+                "id": f"{outbound['id']}/{inbound['id']}",
+                "price": price,
+                "currency": currency,
+                "outbound": outbound,
+                "return": inbound
+            }
+
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for (outbound_id, _), itinerary in pairs.items():
+        groups.setdefault(outbound_id, []).append(itinerary)
+    rows = [sorted(group, key=lambda it: it["price"]) for group in groups.values()]
+
+    return k_best_merge(rows, k, key=lambda it: it["price"], is_valid=_is_valid_return)
+
+
+def _leg_cost(flight: Dict[str, Any], objective: str) -> float:
+    if objective == "duration":
+        return float(parse_duration_minutes(flight.get("duration", "")))
+    return float(flight.get("price", 0.0))
+
+
+def optimize_multi_city(
+    segment_results: List[Dict[str, Any]],
+    k: Optional[int] = None,
+    objective: str = "price",
+    min_connection_minutes: Optional[int] = None,
+    same_day: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Top-k full itineraries across multi-city segment results ({"segment", "flights"}),
+    ranked by total price or total flight time.
+
+    Each leg must leave at least min_connection_minutes after the previous leg lands
+    and, with same_day, on the date requested for its segment. Solved as a k-best
+    dynamic program: previous-leg flights are swept in arrival order while the
+    current leg is walked in departure order, so every feasible predecessor set is
+    a growing prefix whose k best partial paths are kept incrementally.
+    Cost is O(legs * flights * k) rather than the product of all leg sizes.
+    """
+    if k is None:
+        k = settings.multi_city_itinerary_limit
+    if min_connection_minutes is None:
+        min_connection_minutes = settings.multi_city_min_connection_minutes
+    connection = timedelta(minutes=min_connection_minutes)
+
+    legs: List[List[Dict[str, Any]]] = []
+    for result in segment_results:
+        flights = result.get("flights") or []
+        if same_day:
+            day = str(result.get("segment", {}).get("departure_date", ""))[:10]
+            flights = [f for f in flights if f.get("departure_time", "")[:10] == day]
+        legs.append(flights)
+    if not legs or any(not flights for flights in legs):
+        return []
+
+    # Partial path = (cost, flight index on this leg, parent partial path or None)
+    first = legs[0]
+    paths = [[(_leg_cost(f, objective), i, None)] for i, f in enumerate(first)]
+
+    for leg_no in range(1, len(legs)):
+        prev_flights, flights = legs[leg_no - 1], legs[leg_no]
+        by_arrival = sorted(
+            (i for i in range(len(prev_flights)) if paths[i]),
+            key=lambda i: prev_flights[i]["arrival_time"]
+        )
+        by_departure = sorted(range(len(flights)), key=lambda j: flights[j]["departure_time"])
+
+        next_paths: List[List[Tuple]] = [[] for _ in flights]
+        pool: List[Tuple] = []  # k best partial paths among feasible predecessors
+        pointer = 0
+        for j in by_departure:
+            flight = flights[j]
+            latest_arrival = datetime.fromisoformat(flight["departure_time"]) - connection
+            added = []
+            while pointer < len(by_arrival):
+                i = by_arrival[pointer]
+                if datetime.fromisoformat(prev_flights[i]["arrival_time"]) > latest_arrival:
+                    break
+                added.append(paths[i])
+                pointer += 1
+            if added:
+                pool = list(islice(heapq.merge(pool, *added, key=lambda p: p[0]), k))
+            if pool:
+                cost = _leg_cost(flight, objective)
+                next_paths[j] = [(path[0] + cost, j, path) for path in pool]
+        paths = next_paths
+
+    finals = list(islice(heapq.merge(*paths, key=lambda p: p[0]), k))
+
+    itineraries = []
+    for cost, j, parent in finals:
+        indices = [j]
+        while parent is not None:
+            indices.append(parent[1])
+            parent = parent[2]
+        indices.reverse()
+        chosen = [legs[n][i] for n, i in enumerate(indices)]
+        itineraries.append({
+            "id": "/".join(f.get("id", f.get("flight_number", "")) for f in chosen),
+            "total_price": round(sum(f.get("price", 0.0) for f in chosen), 2),
+            "total_duration_minutes": sum(parse_duration_minutes(f.get("duration", "")) for f in chosen),
+            "currency": chosen[0].get("currency", "USD"),
+            "flights": chosen
+        })
+    return itineraries
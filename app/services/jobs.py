@@ -0,0 +1,279 @@
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from app.config import settings
+from app.database import db
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("succeeded", "failed", "cancelled")
+
+_JOB_COLUMNS = """
+    id, kind, status, progress_done, progress_total, partial_results, result,
+    search_id, error, created_at, started_at, finished_at
+"""
+
+
+class JobQueueFull(Exception):
+    """Raised when the job queue is at capacity"""
+
+
+class Job:
+    """A job as seen by its handler: the submitted request plus progress reporting"""
+    def __init__(self, runner: "JobRunner", job_id: str, user_id: int, request: Dict[str, Any]):
+        self.id = job_id
+        self.user_id = user_id
+        self.request = request
+        self.partial_results: List[Any] = []
+        self.search_id: Optional[int] = None
+        self._runner = runner
+
+    def report(self, done: int, total: int, item: Any = None):
+        """Record progress and, optionally, one more partial result"""
+        if item is not None:
+            self.partial_results.append(item)
+        self._runner._save_progress(self, done, total, item)
+
+
+# A handler runs one job and returns its JSON-serialisable result
+JobHandler = Callable[[Job], Awaitable[Any]]
+
+
+def _job_row_to_dict(row: tuple) -> Dict[str, Any]:
+    return {
+        "id": row[0],
+        "kind": row[1],
+        "status": row[2],
+        "progress_done": row[3],
+        "progress_total": row[4],
+        "partial_results": json.loads(row[5]) if row[5] else [],
+        "result": json.loads(row[6]) if row[6] else None,
+        "search_id": row[7],
+        "error": row[8],
+        "created_at": row[9],
+        "started_at": row[10],
+        "finished_at": row[11]
+    }
+
+
+class JobRunner:
+    """
+    Bounded in-process worker pool for long-running searches.
+
+    Jobs are persisted in the search_jobs table and executed by
+    settings.job_workers worker tasks pulling from a queue of at most
+    settings.job_queue_size waiting jobs, so total job concurrency is capped
+    process-wide. Progress and partial results are written back after every
+    step and fanned out to subscribers for streaming. Jobs still queued when
+    the process stops are picked up again on the next start.
+    """
+    def __init__(self):
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.job_queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        self._busy: Set[asyncio.Task] = set()  # Workers in the middle of a job
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._stopping = False
+
+    def register(self, kind: str, handler: JobHandler):
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, user_id: int, request: Dict[str, Any]) -> str:
+        """Persist and enqueue a job; raises JobQueueFull when the queue is at capacity"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind '{kind}'")
+        if self._queue.full():
+            raise JobQueueFull("Too many queued jobs, try again later")
+        job_id = uuid.uuid4().hex
+        conn = db.connect()
+        conn.execute(
+            "INSERT INTO search_jobs (id, user_id, kind, status, request) VALUES (?, ?, ?, 'queued', ?)",
+            [job_id, user_id, kind, json.dumps(request, default=str)]
+        )
+        conn.commit()
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    def get(self, job_id: str, user_id: int) -> Optional[Dict[str, Any]]:
+        row = db.connect().execute(
+            f"SELECT {_JOB_COLUMNS} FROM search_jobs WHERE id = ? AND user_id = ?",
+            [job_id, user_id]
+        ).fetchone()
+        return _job_row_to_dict(row) if row else None
+
+    def list_jobs(self, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = db.connect().execute(
+            f"SELECT {_JOB_COLUMNS} FROM search_jobs WHERE user_id = ? ORDER BY created_at DESC LIMIT ?",
+            [user_id, limit]
+        ).fetchall()
+        return [_job_row_to_dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job; False if it has already finished"""
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+            return True
+        conn = db.connect()
+        row = conn.execute("SELECT status FROM search_jobs WHERE id = ?", [job_id]).fetchone()
+        if row is None or row[0] != "queued":
+            return False
+        # The worker skips jobs that are no longer queued when it dequeues them
+        conn.execute(
+            "UPDATE search_jobs SET status = 'cancelled', finished_at = ? WHERE id = ?",
+            [datetime.now(), job_id]
+        )
+        conn.commit()
+        self._publish(job_id, {"event": "cancelled", "status": "cancelled"})
+        return True
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self._subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(job_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[job_id]
+
+    def _publish(self, job_id: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(job_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                pass
+
+    def _save_progress(self, job: Job, done: int, total: int, item: Any):
+        conn = db.connect()
+        conn.execute(
+            "UPDATE search_jobs SET progress_done = ?, progress_total = ?, partial_results = ? WHERE id = ?",
+            [done, total, json.dumps(job.partial_results, default=str), job.id]
+        )
+        conn.commit()
+        self._publish(job.id, {"event": "progress", "done": done, "total": total, "item": item})
+
+    def _finish(self, job_id: str, status: str, result: Any = None, search_id: Optional[int] = None, error: Optional[str] = None):
+        conn = db.connect()
+        conn.execute(
+            "UPDATE search_jobs SET status = ?, result = ?, search_id = ?, error = ?, finished_at = ? WHERE id = ?",
+            [
+                status,
+                json.dumps(result, default=str) if result is not None else None,
+                search_id,
+                error,
+                datetime.now(),
+                job_id
+            ]
+        )
+        conn.commit()
+        self._publish(job_id, {"event": status, "status": status, "search_id": search_id, "error": error})
+
+    async def _execute(self, job_id: str):
+        conn = db.connect()
+        # No UPDATE ... RETURNING: DuckDB rejects it on tables with a primary key index
+        row = conn.execute(
+            "SELECT kind, user_id, request, status FROM search_jobs WHERE id = ?",
+            [job_id]
+        ).fetchone()
+        if row is None or row[3] != "queued":
+            # Cancelled while queued
+            return
+        kind, user_id, request, _ = row
+        conn.execute(
+            "UPDATE search_jobs SET status = 'running', started_at = ? WHERE id = ?",
+            [datetime.now(), job_id]
+        )
+        conn.commit()
+        job = Job(self, job_id, user_id, json.loads(request))
+        self._publish(job_id, {"event": "running", "status": "running"})
+
+        task = asyncio.get_running_loop().create_task(self._handlers[kind](job))
+        self._running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if self._stopping:
+                # Shutting down: leave the job to be re-run on the next start
+                conn.execute(
+                    "UPDATE search_jobs SET status = 'queued', started_at = NULL WHERE id = ?",
+                    [job_id]
+                )
+                conn.commit()
+                raise
+            self._finish(job_id, "cancelled", search_id=job.search_id)
+        except Exception as e:
+            logger.warning("job %s (%s) failed: %s", job_id, kind, e)
+            self._finish(job_id, "failed", search_id=job.search_id, error=str(e))
+        else:
+            self._finish(job_id, "succeeded", result=result, search_id=job.search_id)
+        finally:
+            self._running.pop(job_id, None)
+
+    async def _worker(self):
+        worker = asyncio.current_task()
+        while not self._stopping:
+            job_id = await self._queue.get()
+            if self._stopping:
+                # Still 'queued' in the database, so the next start picks it up
+                return
+            self._busy.add(worker)
+            try:
+                await self._execute(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job worker error on %s", job_id)
+            finally:
+                self._busy.discard(worker)
+
+    def start(self):
+        """Re-queue jobs left over from a previous run and start the workers"""
+        if self._workers:
+            return
+        self._stopping = False
+        # A fresh queue per start: asyncio queues belong to the loop that first waits
+        # on them, and a restarted app (tests, reloads) runs on a new loop. Anything
+        # left in the old queue is still 'queued' in the database and re-read below.
+        self._queue = asyncio.Queue(maxsize=settings.job_queue_size)
+        conn = db.connect()
+        # Jobs that were mid-run when the process died cannot be resumed
+        conn.execute(
+            "UPDATE search_jobs SET status = 'failed', error = 'Interrupted by restart', finished_at = ? WHERE status = 'running'",
+            [datetime.now()]
+        )
+        conn.commit()
+        pending = conn.execute(
+            "SELECT id FROM search_jobs WHERE status = 'queued' ORDER BY created_at LIMIT ?",
+            [settings.job_queue_size]
+        ).fetchall()
+        for (job_id,) in pending:
+            if self._queue.full():
+                break
+            self._queue.put_nowait(job_id)
+
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._worker()) for _ in range(settings.job_workers)]
+
+    async def stop(self, timeout: float = 0.0):
+        """
+        Stop the workers. Running jobs get up to `timeout` seconds to finish; any
+        still running after that are put back in the queue for the next start.
+        """
+        self._stopping = True
+        if self._busy and timeout > 0:
+            await asyncio.wait(list(self._busy), timeout=timeout)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+
+# Global job runner
+job_runner = JobRunner()
@@ -0,0 +1,164 @@
+import csv
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from app.config import settings
+
+AIRPORTS_CSV = Path(__file__).parent.parent / "data" / "airports.csv"
+
+
+class Airport(NamedTuple):
+    code: str
+    name: str
+    city: str
+    country: str
+    metro: Optional[str]
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace for index keys"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().replace("-", " ").split())
+
+
+class LocationIndex:
+    """
+    In-memory index over the bundled airport dataset.
+    Exact lookups (airport code, metro code, city name) are plain dict hits;
+    prefix autocomplete is a bisect over one sorted key array.
+    """
+    def __init__(self, airports: List[Airport]):
+        self._airports: Dict[str, Airport] = {}
+        self._metros: Dict[str, Tuple[str, ...]] = {}
+        self._cities: Dict[str, Tuple[str, ...]] = {}
+
+        metros: Dict[str, List[str]] = {}
+        cities: Dict[str, List[str]] = {}
+        for airport in airports:
+            self._airports[airport.code] = airport
+            if airport.metro:
+                metros.setdefault(airport.metro, []).append(airport.code)
+            cities.setdefault(_normalize(airport.city), []).append(airport.code)
+        self._metros = {code: tuple(members) for code, members in metros.items()}
+        self._cities = {city: tuple(members) for city, members in cities.items()}
+
+        # Parallel sorted arrays: normalized key -> airport code
+        entries = set()
+        for airport in airports:
+            entries.add((airport.code.lower(), airport.code))
+            entries.add((_normalize(airport.city), airport.code))
+            name = _normalize(airport.name)
+            entries.add((name, airport.code))
+            for word in name.split()[1:]:
+                entries.add((word, airport.code))
+        ordered = sorted(entries)
+        self._keys: List[str] = [key for key, _ in ordered]
+        self._key_codes: List[str] = [code for _, code in ordered]
+
+    @classmethod
+    def from_csv(cls, path: Path = AIRPORTS_CSV) -> "LocationIndex":
+        """Load the index from a CSV file with iata,name,city,country,metro columns"""
+        with open(path, newline="", encoding="utf-8") as f:
+            airports = [
+                Airport(
+                    code=row["iata"].strip().upper(),
+                    name=row["name"].strip(),
+                    city=row["city"].strip(),
+                    country=row["country"].strip(),
+                    metro=row["metro"].strip().upper() or None
+                )
+                for row in csv.DictReader(f)
+            ]
+        return cls(airports)
+
+    def __len__(self) -> int:
+        return len(self._airports)
+
+    def get_airport(self, code: str) -> Optional[Airport]:
+        """Get airport details by IATA code"""
+        return self._airports.get(code.upper())
+
+    def city_airports(self, city: str) -> Tuple[str, ...]:
+        """Get airport codes serving a city name (empty if unknown)"""
+        return self._cities.get(_normalize(city), ())
+
+    def metro_airports(self, code: str) -> Tuple[str, ...]:
+        """Get airport codes grouped under a metro/city IATA code (empty if unknown)"""
+        return self._metros.get(code.upper(), ())
+
+    def resolve(self, location: str) -> str:
+        """
+        Resolve an airport code, metro code or city name to the IATA code to search.
+        Cities with a metro code resolve to it (e.g. 'London' -> 'LON'), otherwise
+        to their primary airport. Raises ValueError for unknown locations.
+        """
+        value = location.strip() if location else ""
+        if not value:
+            raise ValueError("Location is required")
+
+        code = value.upper()
+        if len(code) == 3 and code.isalpha():
+            if code in self._airports or code in self._metros:
+                return code
+            if not settings.location_strict_codes:
+                # Not in the bundled subset, but syntactically a valid IATA code; Amadeus decides
+                return code
+
+        members = self._cities.get(_normalize(value))
+        if members:
+            metro = self._airports[members[0]].metro
+            if metro and all(self._airports[m].metro == metro for m in members):
+                return metro
+            return members[0]
+
+        raise ValueError(
+            f"Unknown location '{location}'. Use an IATA airport code (e.g. 'JFK') or a known city name"
+        )
+
+    def expand(self, location: str) -> Tuple[str, ...]:
+        """
+        Expand a location to all airports serving its metro area
+        (e.g. 'NYC' or 'JFK' -> JFK, LGA, EWR). Unknown codes expand to themselves.
+        """
+        code = self.resolve(location)
+        members = self._metros.get(code)
+        if members:
+            return members
+        airport = self._airports.get(code)
+        if airport is None:
+            return (code,)
+        if airport.metro:
+            return self._metros[airport.metro]
+        return self._cities.get(_normalize(airport.city), (code,))
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Airport]:
+        """Airports whose code, city or name (or a word of it) starts with prefix"""
+        query = _normalize(prefix)
+        if not query:
+            return []
+
+        results: List[Airport] = []
+        seen = set()
+
+        # Exact code match always ranks first
+        exact = self._airports.get(query.upper())
+        if exact:
+            results.append(exact)
+            seen.add(exact.code)
+
+        i = bisect_left(self._keys, query)
+        while i < len(self._keys) and len(results) < limit:
+            if not self._keys[i].startswith(query):
+                break
+            code = self._key_codes[i]
+            if code not in seen:
+                seen.add(code)
+                results.append(self._airports[code])
+            i += 1
+        return results
+
+
+# Global location index, loaded once from the bundled dataset
+location_index = LocationIndex.from_csv()
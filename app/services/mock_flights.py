@@ -0,0 +1,269 @@
+"""
+Deterministic mock flight offers for development and load tests.
+
+Shared by the local Amadeus stand-in and the services' mock fallbacks. All
+random draws for a search are made in a handful of NumPy batches from an RNG
+seeded by (seed, route, dates, adults), so the same search always gets the same
+offers and sampling costs a few milliseconds per thousand offers; only the
+final dicts are built one offer at a time. Two output shapes:
+
+- generate_offers: a raw Amadeus flight-offers response, to exercise the
+  parser, cache and storage at scale
+- generate_flights: the same offers in our internal format, identical to
+  AmadeusService._parse_amadeus_response(generate_offers(...))
+
+Run with:  python -m app.services.mock_flights JFK LHR 2030-06-01 --count 5000 --format amadeus
+"""
+import argparse
+import hashlib
+import json
+import sys
+import time
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import count as counter
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import numpy as np
+from app.services.airline_codes import AIRLINE_NAMES, get_airline_name
+from app.services.itinerary import dedupe_flights, top_return_itineraries
+
+CARRIERS = sorted(AIRLINE_NAMES)
+HUBS = ["ATL", "ORD", "DFW", "DEN", "LHR", "CDG", "FRA", "AMS", "IST", "DXB", "DOH", "SIN", "HKG", "NRT"]
+AIRCRAFT = ["320", "321", "738", "77W", "789", "359"]
+MAX_STOPS = 2
+_STOP_WEIGHTS = np.array([6, 3, 1]) / 10  # P(0, 1, 2 stops)
+
+
+def route_rng(seed: int, *parts: Any) -> np.random.Generator:
+    """RNG seeded by the global seed plus the route/date, so offers are reproducible"""
+    key = "|".join(str(p) for p in (seed, *parts)).encode()
+    return np.random.default_rng(int.from_bytes(hashlib.sha256(key).digest()[:8], "big"))
+
+
+@lru_cache(maxsize=None)
+def iso_duration(minutes: int) -> str:
+    hours, mins = divmod(minutes, 60)
+    return f"PT{hours}H{mins}M" if mins else f"PT{hours}H"
+
+
+@dataclass
+class _Legs:
+    """One directional leg per offer as parallel per-offer lists (row i belongs to offer i)"""
+    points: List[List[str]]  # Airports in order, origin first
+    carriers: List[str]
+    numbers: List[List[int]]  # Flight number per segment
+    aircraft: List[List[int]]  # Index into AIRCRAFT per segment
+    departures: List[List[str]]  # Local ISO timestamp per segment
+    arrivals: List[List[str]]
+    segment_minutes: List[List[int]]
+    total_minutes: List[int]  # First departure to last arrival
+    stops: np.ndarray
+
+
+def _sample_legs(rng: np.random.Generator, n: int, origin: str, destination: str, day: date) -> _Legs:
+    segments = MAX_STOPS + 1
+    stops = rng.choice(segments, size=n, p=_STOP_WEIGHTS)
+    hubs = [h for h in HUBS if h not in (origin, destination)]
+    # Distinct hubs per offer: the first columns of a random permutation of each row
+    via = rng.random((n, len(hubs))).argsort(axis=1)[:, :MAX_STOPS]
+    carriers = rng.integers(len(CARRIERS), size=n)
+    numbers = rng.integers(1, 10000, size=(n, segments))
+    aircraft = rng.integers(len(AIRCRAFT), size=(n, segments))
+    # Departures 05:00-22:55, segments 55 min-11h55, layovers 45 min-3h55, on 5-minute steps
+    first = rng.integers(60, 276, size=n) * 5
+    flying = rng.integers(11, 144, size=(n, segments)) * 5
+    layovers = rng.integers(9, 48, size=(n, segments - 1)) * 5
+
+    # Minutes after midnight of every boundary: depart, arrive, depart, arrive, ...
+    steps = np.empty((n, 2 * segments - 1), dtype=np.int64)
+    steps[:, 0::2] = flying
+    steps[:, 1::2] = layovers
+    boundaries = np.concatenate([first[:, None], first[:, None] + np.cumsum(steps, axis=1)], axis=1)
+    # Every boundary is on a 5-minute step, so format each step once and index into that
+    steps_from_midnight = np.arange(int(boundaries.max()) // 5 + 1) * np.timedelta64(5, "m")
+    labels = np.datetime_as_string(np.datetime64(day, "m") + steps_from_midnight, unit="s").astype(object)
+    timestamps = labels[boundaries // 5]
+    total = boundaries[np.arange(n), 2 * stops + 1] - first
+
+    return _Legs(
+        points=[
+            [origin, *(hubs[j] for j in row[:k]), destination]
+            for row, k in zip(via.tolist(), stops.tolist())
+        ],
+        carriers=[CARRIERS[i] for i in carriers.tolist()],
+        numbers=numbers.tolist(),
+        aircraft=aircraft.tolist(),
+        departures=timestamps[:, 0::2].tolist(),
+        arrivals=timestamps[:, 1::2].tolist(),
+        segment_minutes=flying.tolist(),
+        total_minutes=total.tolist(),
+        stops=stops
+    )
+
+
+def _sample(
+    origin: str,
+    destination: str,
+    departure_date: date,
+    return_date: Optional[date],
+    adults: int,
+    count: int,
+    seed: int
+) -> Tuple[_Legs, Optional[_Legs], List[float], List[int]]:
+    """(outbound legs, return legs or None, prices, bookable seats) for `count` offers"""
+    rng = route_rng(seed, origin, destination, departure_date, return_date, adults)
+    base_fare = rng.uniform(80, 600)
+    outbound = _sample_legs(rng, count, origin, destination, departure_date)
+    inbound = _sample_legs(rng, count, destination, origin, return_date) if return_date else None
+    stops = outbound.stops + (inbound.stops if inbound else 0)
+    totals = base_fare * rng.uniform(0.7, 2.5, size=count) * (1 - 0.08 * stops) * (1.8 if return_date else 1) * adults
+    seats = rng.integers(1, 10, size=count).tolist()
+    return outbound, inbound, [round(total, 2) for total in totals.tolist()], seats
+
+
+def _itinerary(legs: _Legs, i: int, segment_ids: Iterator[int]) -> Dict[str, Any]:
+    points, carrier = legs.points[i], legs.carriers[i]
+    return {
+        "duration": iso_duration(legs.total_minutes[i]),
+        "segments": [
+            {
+                "departure": {"iataCode": points[s], "at": legs.departures[i][s]},
+                "arrival": {"iataCode": points[s + 1], "at": legs.arrivals[i][s]},
+                "carrierCode": carrier,
+                "number": str(legs.numbers[i][s]),
+                "aircraft": {"code": AIRCRAFT[legs.aircraft[i][s]]},
+                "operating": {"carrierCode": carrier},
+                "duration": iso_duration(legs.segment_minutes[i][s]),
+                "id": str(next(segment_ids)),
+                "numberOfStops": 0,
+                "blacklistedInEU": False
+            }
+            for s in range(len(points) - 1)
+        ]
+    }
+
+
+def _flight(legs: _Legs, i: int, price: float) -> Dict[str, Any]:
+    points, carrier = legs.points[i], legs.carriers[i]
+    last = len(points) - 2
+    numbers = "-".join(f"{carrier}{number}" for number in legs.numbers[i][:last + 1])
+    return {
+        "id": f"{numbers}@{legs.departures[i][0]}",
+        "airline": carrier,
+        "airline_name": get_airline_name(carrier),
+        "flight_number": f"{carrier}{legs.numbers[i][0]}",
+        "origin": points[0],
+        "destination": points[-1],
+        "departure_time": legs.departures[i][0],
+        "arrival_time": legs.arrivals[i][last],
+        "duration": iso_duration(legs.total_minutes[i]),
+        "price": price,
+        "currency": "USD",
+        "stops": last,
+        "cabin_class": "economy"
+    }
+
+
+def generate_offers(
+    origin: str,
+    destination: str,
+    departure_date: date,
+    return_date: Optional[date] = None,
+    adults: int = 1,
+    count: int = 50,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Build an Amadeus-shaped flight-offers response for one search"""
+    outbound, inbound, prices, seats = _sample(origin, destination, departure_date, return_date, adults, count, seed)
+    segment_ids = counter(1)
+    last_ticketing = (departure_date - timedelta(days=1)).isoformat()
+
+    offers = []
+    for i in range(count):
+        itineraries = [_itinerary(outbound, i, segment_ids)]
+        if inbound is not None:
+            itineraries.append(_itinerary(inbound, i, segment_ids))
+        total = prices[i]
+        offers.append({
+            "type": "flight-offer",
+            "id": str(i + 1),
+            "source": "GDS",
+            "instantTicketingRequired": False,
+            "nonHomogeneous": False,
+            "oneWay": return_date is None,
+            "lastTicketingDate": last_ticketing,
+            "numberOfBookableSeats": seats[i],
+            "itineraries": itineraries,
+            "price": {
+                "currency": "USD",
+                "total": f"{total:.2f}",
+                "base": f"{total * 0.8:.2f}",
+                "grandTotal": f"{total:.2f}"
+            },
+            "validatingAirlineCodes": [outbound.carriers[i]]
+        })
+
+    return {
+        "meta": {"count": len(offers)},
+        "data": offers,
+        "dictionaries": {
+            "carriers": {code: AIRLINE_NAMES[code].upper() for code in CARRIERS}
+        }
+    }
+
+
+def generate_flights(
+    origin: str,
+    destination: str,
+    departure_date: date,
+    return_date: Optional[date] = None,
+    adults: int = 1,
+    count: int = 10,
+    seed: int = 42
+) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    The offers generate_offers would return, already in our internal format:
+    a price-sorted list, or {"outbound", "return", "itineraries"} for return trips
+    """
+    outbound, inbound, prices, _ = _sample(origin, destination, departure_date, return_date, adults, count, seed)
+    if inbound is None:
+        return sorted((_flight(outbound, i, prices[i]) for i in range(count)), key=lambda f: f["price"])
+
+    linked_offers = [
+        (_flight(outbound, i, prices[i]), _flight(inbound, i, prices[i]), prices[i], "USD")
+        for i in range(count)
+    ]
+    return {
+        "outbound": dedupe_flights(offer[0] for offer in linked_offers),
+        "return": dedupe_flights(offer[1] for offer in linked_offers),
+        "itineraries": top_return_itineraries(linked_offers)
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Print deterministic mock flight offers as JSON")
+    parser.add_argument("origin")
+    parser.add_argument("destination")
+    parser.add_argument("departure_date", type=date.fromisoformat)
+    parser.add_argument("--return-date", type=date.fromisoformat)
+    parser.add_argument("--adults", type=int, default=1)
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["amadeus", "internal"], default="amadeus")
+    args = parser.parse_args(argv)
+
+    generate = generate_offers if args.format == "amadeus" else generate_flights
+    start = time.perf_counter()
+    result = generate(
+        args.origin.upper(), args.destination.upper(), args.departure_date, args.return_date,
+        args.adults, count=args.count, seed=args.seed
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    json.dump(result, sys.stdout)
+    sys.stdout.write("\n")
+    print(f"{args.count} offers in {elapsed_ms:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
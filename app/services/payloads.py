@@ -0,0 +1,196 @@
+"""
+Content-addressed storage of search result payloads.
+
+Results are serialised to canonical JSON, hashed with SHA-256 and stored once,
+zstd-compressed, in search_payloads; airfare_searches rows reference them by
+results_hash. Identical results (repeat searches served from the cache, batch
+duplicates, unchanged fares) therefore cost one copy. Payloads are only
+decompressed when full results are read.
+
+Rows saved before this scheme keep their inline search_results JSON until
+migrated:
+
+    python -m app.services.payloads migrate
+    python -m app.services.payloads report
+"""
+import argparse
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional
+import zstandard
+from app.config import settings
+from app.database import db
+from app.metrics import stage
+
+CODEC = "zstd"
+
+_compressor = zstandard.ZstdCompressor(level=settings.payload_compression_level)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def canonical_json(value: Any) -> bytes:
+    """Stable serialisation, so equal results always hash the same"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def encode_payload(value: Any) -> tuple:
+    """(hash, raw_size, compressed bytes) for a search result"""
+    with stage("serialize"):
+        data = canonical_json(value)
+        return hashlib.sha256(data).hexdigest(), len(data), _compressor.compress(data)
+
+
+def compress_payload(data: bytes) -> bytes:
+    """Compress already-serialised bytes with CODEC"""
+    return _compressor.compress(data)
+
+
+def decompress_payload(codec: str, payload: bytes) -> bytes:
+    """The canonical JSON of a stored payload"""
+    if codec != CODEC:
+        raise ValueError(f"Unknown payload codec '{codec}'")
+    return _decompressor.decompress(payload)
+
+
+def decode_payload(codec: str, payload: bytes) -> Any:
+    with stage("serialize"):
+        return json.loads(decompress_payload(codec, payload))
+
+
+def store_payloads(conn, values: Iterable[Any]) -> List[str]:
+    """Store each result once (existing hashes are skipped); returns one hash per value"""
+    hashes = []
+    rows: Dict[str, list] = {}
+    for value in values:
+        digest, raw_size, compressed = encode_payload(value)
+        hashes.append(digest)
+        if digest not in rows:
+            rows[digest] = [digest, CODEC, raw_size, len(compressed), compressed]
+    if rows:
+        conn.executemany(
+            """
+            INSERT INTO search_payloads (hash, codec, raw_size, stored_size, payload)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT DO NOTHING
+            """,
+            list(rows.values())
+        )
+    return hashes
+
+
+def store_payload(conn, value: Any) -> str:
+    return store_payloads(conn, [value])[0]
+
+
+def delete_unreferenced(conn, candidates: str, parameters: Optional[list] = None) -> int:
+    """Delete the payloads among `candidates` (a subquery of hashes) that no search references any more"""
+    return conn.execute(
+        f"""
+        DELETE FROM search_payloads
+        WHERE hash IN ({candidates})
+          AND hash NOT IN (SELECT results_hash FROM airfare_searches WHERE results_hash IS NOT NULL)
+        """,
+        parameters
+    ).fetchone()[0]
+
+
+def storage_report(conn) -> Dict[str, Any]:
+    """Logical size of all stored results versus what is actually kept on disk"""
+    referenced, logical = conn.execute(
+        """
+        SELECT COUNT(*), COALESCE(SUM(p.raw_size), 0)
+        FROM airfare_searches s JOIN search_payloads p ON p.hash = s.results_hash
+        """
+    ).fetchone()
+    payloads, raw, stored = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(raw_size), 0), COALESCE(SUM(stored_size), 0) FROM search_payloads"
+    ).fetchone()
+    inline_rows, inline_bytes = conn.execute(
+        """
+        SELECT COUNT(*), COALESCE(SUM(strlen(CAST(search_results AS VARCHAR))), 0)
+        FROM airfare_searches
+        WHERE results_hash IS NULL AND search_results IS NOT NULL
+        """
+    ).fetchone()
+    return {
+        "searches": referenced,
+        "payloads": payloads,
+        "logical_bytes": logical,
+        "unique_bytes": raw,
+        "stored_bytes": stored,
+        "saved_bytes": logical - stored,
+        "ratio": round(logical / stored, 2) if stored else None,
+        "unmigrated_rows": inline_rows,
+        "unmigrated_bytes": inline_bytes
+    }
+
+
+def migrate(conn, batch_size: int = 500, limit: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Move inline search_results into search_payloads, batch by batch, each batch
+    in its own transaction. Safe to re-run; returns what the migrated rows took
+    before and after.
+    """
+    migrated = 0
+    before = 0
+    stored_before = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM search_payloads").fetchone()[0]
+    while limit is None or migrated < limit:
+        size = batch_size if limit is None else min(batch_size, limit - migrated)
+        rows = conn.execute(
+            """
+            SELECT id, search_results FROM airfare_searches
+            WHERE results_hash IS NULL AND search_results IS NOT NULL
+            ORDER BY id
+            LIMIT ?
+            """,
+            [size]
+        ).fetchall()
+        if not rows:
+            break
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            hashes = store_payloads(conn, (json.loads(blob) for _, blob in rows))
+            conn.executemany(
+                "UPDATE airfare_searches SET results_hash = ?, search_results = NULL WHERE id = ?",
+                [[digest, search_id] for digest, (search_id, _) in zip(hashes, rows)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        migrated += len(rows)
+        before += sum(len(blob.encode()) for _, blob in rows)
+    stored_after = conn.execute("SELECT COALESCE(SUM(stored_size), 0) FROM search_payloads").fetchone()[0]
+    added = stored_after - stored_before
+    return {
+        "migrated_rows": migrated,
+        "inline_bytes": before,
+        "stored_bytes_added": added,
+        "saved_bytes": before - added,
+        "ratio": round(before / added, 2) if added else None
+    }
+
+
+def _print_report(title: str, report: Dict[str, Any]):
+    print(title)
+    for key, value in report.items():
+        print(f"  {key:<20}{value}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Search payload storage maintenance")
+    parser.add_argument("command", choices=["migrate", "report"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--limit", type=int, help="Migrate at most this many rows")
+    args = parser.parse_args(argv)
+
+    conn = db.connect()
+    if args.command == "migrate":
+        _print_report("migration", migrate(conn, args.batch_size, args.limit))
+        # Let DuckDB reuse the space freed by the emptied JSON column
+        conn.execute("CHECKPOINT")
+    _print_report("storage", storage_report(conn))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from app.config import settings
+from app.database import db
+from app.services.amadeus import AmadeusService, nearby_pairs
+from app.services.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class HotRoute(NamedTuple):
+    origin: str
+    destination: str
+    departure_date: date
+    return_date: Optional[date]
+    passengers: int
+    cabin_class: str
+    score: float
+
+
+class PrefetchScheduler:
+    """
+    Keeps fares for popular routes warm in the AmadeusService cache.
+
+    Every interval the recent one-way/return searches in airfare_searches are
+    scored with exponentially decayed popularity (each search counts 1, halving
+    every prefetch_half_life_hours). Scores are kept per AmadeusService cache key,
+    so a nearby (metro-wide) search counts towards each airport pair it searched.
+    Keys above prefetch_min_score whose cached fares are missing or about to
+    expire are re-fetched, so once a route stops being searched its score decays
+    below the threshold and it is dropped. Refreshes draw from their own token
+    bucket sized to prefetch_quota_share of the upstream rate limit, on top of
+    the service's global limiter.
+    """
+    def __init__(self, service: AmadeusService):
+        self.service = service
+        self._bucket = TokenBucket(
+            rate=settings.amadeus_rate_limit_per_second * settings.prefetch_quota_share,
+            capacity=1
+        )
+        self._task: Optional[asyncio.Task] = None
+        self.routes: List[HotRoute] = []
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run_at: Optional[float] = None
+
+    def hot_routes(self) -> List[HotRoute]:
+        """Most popular future searches by decayed search count, one per cache key"""
+        conn = db.connect()
+        rows = conn.execute(
+            """
+            SELECT origin, destination, departure_date, return_date, passengers,
+                   coalesce(cabin_class, 'ECONOMY'), coalesce(nearby, FALSE),
+                   SUM(pow(0.5, (epoch(CAST(current_timestamp AS TIMESTAMP)) - epoch(created_at)) / ?)) AS score
+            FROM airfare_searches
+            WHERE search_type IN ('one-way', 'return')
+              AND departure_date >= current_date
+              AND created_at >= CAST(current_timestamp AS TIMESTAMP) - to_hours(CAST(? AS BIGINT))
+            GROUP BY ALL
+            """,
+            [settings.prefetch_half_life_hours * 3600, settings.prefetch_window_hours]
+        ).fetchall()
+
+        scores: Dict[Tuple, float] = {}
+        for origin, destination, departure_date, return_date, passengers, cabin_class, nearby, score in rows:
+            # Nearby searches are cached per concrete airport pair, never under the metro codes
+            pairs = nearby_pairs(origin, destination) if nearby else [(origin, destination)]
+            for pair_origin, pair_destination in pairs:
+                key = (pair_origin, pair_destination, departure_date, return_date, passengers, cabin_class.upper())
+                scores[key] = scores.get(key, 0.0) + score
+        routes = [HotRoute(*key, score) for key, score in scores.items() if score >= settings.prefetch_min_score]
+        routes.sort(key=lambda route: route.score, reverse=True)
+        return routes[:settings.prefetch_max_routes]
+
+    async def run_once(self) -> int:
+        """Refresh hot routes whose cached fares are missing or expiring; returns the refresh count"""
+        self.last_run_at = time.time()
+        if not self.service.has_credentials:
+            return 0
+        self.routes = self.hot_routes()
+
+        refreshed = 0
+        for route in self.routes:
+            expires_in = self.service.cache_expires_in(
+                route.origin, route.destination, route.departure_date, route.return_date, route.passengers,
+                route.cabin_class
+            )
+            if expires_in is not None and expires_in > settings.prefetch_refresh_ahead_seconds:
+                continue
+            await self._bucket.acquire()
+            try:
+                await self.service.search_flights(
+                    origin=route.origin,
+                    destination=route.destination,
+                    departure_date=route.departure_date,
+                    return_date=route.return_date,
+                    passengers=route.passengers,
+                    cabin_class=route.cabin_class,
+                    use_cache=False
+                )
+                refreshed += 1
+            except ValueError as e:
+                self.failed += 1
+                logger.warning("prefetch of %s-%s failed: %s", route.origin, route.destination, e)
+        self.refreshed += refreshed
+        return refreshed
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("prefetch run failed")
+            await asyncio.sleep(settings.prefetch_interval_seconds)
+
+    def start(self):
+        if self._task is None and settings.prefetch_enabled:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "last_run_at": self.last_run_at,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "routes": [route._asdict() for route in self.routes]
+        }
@@ -0,0 +1,289 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+from app.config import settings
+from app.database import db
+from app.services.amadeus import AmadeusService
+
+logger = logging.getLogger(__name__)
+
+# offer id -> (price, currency)
+Snapshot = Dict[str, Tuple[float, str]]
+
+_WATCH_COLUMNS = """
+    id, trip_id, user_id, origin, destination, departure_date, return_date,
+    passengers, cabin_class, webhook_url, snapshot
+"""
+
+
+def offer_snapshot(results: Any) -> Snapshot:
+    """Cheapest price per offer id: flights for one-way, itineraries for return searches"""
+    if isinstance(results, dict):
+        offers = results.get("itineraries") or results.get("outbound", []) + results.get("return", [])
+    else:
+        offers = results or []
+    snapshot: Snapshot = {}
+    for offer in offers:
+        current = snapshot.get(offer["id"])
+        if current is None or offer["price"] < current[0]:
+            snapshot[offer["id"]] = (offer["price"], offer.get("currency", "USD"))
+    return snapshot
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> List[Dict[str, Any]]:
+    """Offers added, removed or repriced between two snapshots"""
+    changes = []
+    for offer_id, (price, currency) in new.items():
+        previous = old.get(offer_id)
+        if previous is None:
+            changes.append({"change_type": "added", "offer_id": offer_id, "old_price": None, "new_price": price, "currency": currency})
+        elif previous[0] != price:
+            changes.append({"change_type": "price", "offer_id": offer_id, "old_price": previous[0], "new_price": price, "currency": currency})
+    for offer_id, (price, currency) in old.items():
+        if offer_id not in new:
+            changes.append({"change_type": "removed", "offer_id": offer_id, "old_price": price, "new_price": None, "currency": currency})
+    return changes
+
+
+def webhook_url_error(url: str) -> Optional[str]:
+    """
+    Why a webhook URL may not be used, or None if it may: the server POSTs to it,
+    so only http(s) URLs on hosts listed in PRICE_WATCH_WEBHOOK_HOSTS are accepted
+    """
+    allowed = {host.strip().lower() for host in settings.price_watch_webhook_hosts.split(",") if host.strip()}
+    if not allowed:
+        return "Webhooks are disabled on this server; use GET /watches/events instead"
+    try:
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        parts.port  # Raises on a malformed port
+    except ValueError:
+        return "webhook_url is not a valid URL"
+    if parts.scheme not in ("http", "https") or not host:
+        return "webhook_url must be an http or https URL"
+    if parts.username or parts.password:
+        return "webhook_url must not contain credentials"
+    if host not in allowed:
+        return f"webhook_url host '{host}' is not allowed"
+    return None
+
+
+class WatchNotifier:
+    """In-process fan-out of price-change events to SSE subscribers, per user"""
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def publish(self, user_id: int, event: Dict[str, Any]):
+        for queue in self._subscribers.get(user_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Slow consumer: drop rather than stall the scheduler
+                pass
+
+
+class PriceWatchScheduler:
+    """
+    Re-checks active price watches in batches.
+
+    Due watches are grouped by route/date/passengers/cabin so identical watches
+    share one upstream search (which also goes through the search cache). Each
+    result is reduced to a snapshot of offer prices and diffed against the
+    watch's previous snapshot; only the differences are stored in
+    price_watch_changes and pushed to SSE subscribers and the watch's webhook.
+    The first check of a watch only records its baseline.
+    """
+    def __init__(self, service: AmadeusService, notifier: WatchNotifier):
+        self.service = service
+        self.notifier = notifier
+        self._task: Optional[asyncio.Task] = None
+        self._webhooks: Set[asyncio.Task] = set()
+        self.checks = 0
+        self.searches = 0
+        self.changes = 0
+
+    def _due_watches(self, watch_ids: Optional[List[int]] = None) -> List[tuple]:
+        conn = db.connect()
+        if watch_ids is not None:
+            placeholders = ", ".join("?" for _ in watch_ids)
+            return conn.execute(
+                f"SELECT {_WATCH_COLUMNS} FROM price_watches WHERE id IN ({placeholders})",
+                watch_ids
+            ).fetchall()
+        return conn.execute(
+            f"""
+            SELECT {_WATCH_COLUMNS}
+            FROM price_watches
+            WHERE active
+              AND departure_date >= current_date
+              AND (last_checked_at IS NULL
+                   OR last_checked_at <= CAST(current_timestamp AS TIMESTAMP) - to_seconds(CAST(
+                       least(? * pow(2, coalesce(check_failures, 0)), ?) AS BIGINT)))
+            ORDER BY last_checked_at NULLS FIRST
+            LIMIT ?
+            """,
+            [
+                settings.price_watch_interval_seconds,
+                max(settings.price_watch_interval_seconds, settings.price_watch_max_backoff_seconds),
+                settings.price_watch_batch_size
+            ]
+        ).fetchall()
+
+    async def run_once(self, watch_ids: Optional[List[int]] = None) -> int:
+        """Check due watches (or the given ones); returns the number of changes found"""
+        if not self.service.has_credentials:
+            return 0
+        groups: Dict[tuple, List[tuple]] = {}
+        for watch in self._due_watches(watch_ids):
+            # origin, destination, departure, return, passengers, cabin
+            groups.setdefault(watch[3:9], []).append(watch)
+
+        found = 0
+        for (origin, destination, departure_date, return_date, passengers, cabin_class), watches in groups.items():
+            try:
+                results = await self.service.search_flights(
+                    origin=origin,
+                    destination=destination,
+                    departure_date=departure_date,
+                    return_date=return_date,
+                    passengers=passengers,
+                    cabin_class=cabin_class
+                )
+            except ValueError as e:
+                logger.warning("price watch check of %s-%s failed: %s", origin, destination, e)
+                self._record_failure(watches, str(e))
+                continue
+            self.searches += 1
+            found += self._apply(watches, offer_snapshot(results))
+        return found
+
+    def _record_failure(self, watches: List[tuple], error: str):
+        """
+        Count a failed check: it still counts as checked, so a broken route waits
+        out its (backed-off) interval instead of being re-searched every poll and
+        crowding healthy watches out of the batch
+        """
+        conn = db.connect()
+        conn.executemany(
+            """
+            UPDATE price_watches
+            SET last_checked_at = ?, check_failures = coalesce(check_failures, 0) + 1, last_error = ?
+            WHERE id = ?
+            """,
+            [[datetime.now(), error, watch[0]] for watch in watches]
+        )
+        conn.commit()
+
+    def _apply(self, watches: List[tuple], snapshot: Snapshot) -> int:
+        """Diff and persist one search result for every watch sharing it, then notify"""
+        lowest = min((price for price, _ in snapshot.values()), default=None)
+        snapshot_json = json.dumps(snapshot)
+        checked_at = datetime.now()
+        events = []
+
+        conn = db.connect()
+        conn.execute("BEGIN TRANSACTION")
+        try:
+            for watch in watches:
+                watch_id, trip_id, user_id = watch[0], watch[1], watch[2]
+                previous = watch[10]
+                changes = []
+                if previous is not None:
+                    old = {offer_id: tuple(value) for offer_id, value in json.loads(previous).items()}
+                    changes = diff_snapshots(old, snapshot)
+                conn.execute(
+                    """
+                    UPDATE price_watches
+                    SET snapshot = ?, lowest_price = ?, last_checked_at = ?, check_failures = 0, last_error = NULL
+                    WHERE id = ?
+                    """,
+                    [snapshot_json, lowest, checked_at, watch_id]
+                )
+                if changes:
+                    conn.executemany(
+                        """
+                        INSERT INTO price_watch_changes
+                        (watch_id, change_type, offer_id, old_price, new_price, currency, detected_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        [
+                            [watch_id, c["change_type"], c["offer_id"], c["old_price"], c["new_price"], c["currency"], checked_at]
+                            for c in changes
+                        ]
+                    )
+                    events.append((user_id, watch[9], {
+                        "watch_id": watch_id,
+                        "trip_id": trip_id,
+                        "checked_at": checked_at.isoformat(),
+                        "lowest_price": lowest,
+                        "changes": changes
+                    }))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        self.checks += len(watches)
+        for user_id, webhook_url, event in events:
+            self.changes += len(event["changes"])
+            self.notifier.publish(user_id, event)
+            if webhook_url:
+                task = asyncio.get_running_loop().create_task(self._post_webhook(webhook_url, event))
+                self._webhooks.add(task)
+                task.add_done_callback(self._webhooks.discard)
+        return sum(len(event["changes"]) for _, _, event in events)
+
+    async def _post_webhook(self, url: str, event: Dict[str, Any]):
+        import httpx
+
+        # Checked again on send: the allowed hosts may have changed since the watch was saved
+        error = webhook_url_error(url)
+        if error:
+            logger.warning("price watch webhook %s skipped: %s", url, error)
+            return
+        try:
+            async with httpx.AsyncClient() as client:
+                response = await client.post(url, json=event, timeout=settings.price_watch_webhook_timeout)
+                response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning("price watch webhook %s failed: %s", url, e)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("price watch run failed")
+            await asyncio.sleep(settings.price_watch_poll_seconds)
+
+    def start(self):
+        if self._task is None and settings.price_watch_enabled:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global notifier shared by the scheduler and the SSE endpoint
+watch_notifier = WatchNotifier()
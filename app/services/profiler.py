@@ -0,0 +1,81 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler over all Python threads.
+    A background thread snapshots sys._current_frames() at a fixed interval and
+    counts identical stacks, producing the collapsed ("folded") format read by
+    flamegraph.pl and speedscope. Only one run can be active at a time.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._started_at: Optional[float] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005):
+        """Start sampling for `seconds`; raises ValueError if a run is already active"""
+        with self._lock:
+            if self.running:
+                raise ValueError("A profiling run is already in progress")
+            self._stacks = Counter()
+            self._samples = 0
+            self._started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(seconds, interval), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, seconds: float, interval: float):
+        own_id = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self._stacks[";".join(reversed(stack))] += 1
+            self._samples += 1
+            self._stop.wait(interval)
+
+    def folded(self) -> str:
+        """Collapsed stacks, one "frame;frame;... count" line per distinct stack"""
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "running": self.running,
+            "started_at": self._started_at,
+            "samples": self._samples,
+            "distinct_stacks": len(self._stacks)
+        }
+
+
+# Global profiler instance
+profiler = SamplingProfiler()
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter.
+    `rate` tokens are added per second up to `capacity`; each call consumes tokens.
+    Not thread-safe - intended for use from the event loop.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+    
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Consume tokens if available, without waiting"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+    
+    def try_borrow(self, tokens: float) -> bool:
+        """
+        Like try_acquire, but a request for more than the capacity is let through
+        once the bucket is full, leaving it in debt until the refill catches up
+        """
+        self._refill()
+        if self._tokens >= min(tokens, self.capacity):
+            self._tokens -= tokens
+            return True
+        return False
+    
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` will be available"""
+        self._refill()
+        if self._tokens >= tokens:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (tokens - self._tokens) / self.rate
+    
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until tokens are available, then consume them"""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep(self.retry_after(tokens))
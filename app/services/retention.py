@@ -0,0 +1,254 @@
+"""
+Tiered retention for search history.
+
+Searches older than settings.retention_days are copied to Parquet under
+settings.archive_path and then deleted from the live tables, together with
+their multi-city segments and any result payloads no longer referenced:
+
+    archive/airfare_searches/created_month=2026-01/route=JFK-LHR/part_<uuid>.parquet
+    archive/multi_city_segments/created_month=2026-01/part_<uuid>.parquet
+
+Archived rows carry their full results as JSON. They stay queryable in
+DuckDB through the archived_airfare_searches and archived_multi_city_segments
+views (hive-partitioned Parquet scans, so filters on created_month and route
+skip whole directories), and all_airfare_searches unions live and archived
+search metadata for analytics.
+
+    python -m app.services.retention            # archive once with the configured age
+    python -m app.services.retention --days 30
+"""
+import argparse
+import asyncio
+import glob
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from app.config import settings
+from app.database import db
+from app.services.payloads import decompress_payload, delete_unreferenced
+
+logger = logging.getLogger(__name__)
+
+_SEARCH_COLUMNS = """
+    id, trip_id, user_id, search_type, origin, destination, departure_date,
+    return_date, passengers, created_at
+"""
+
+
+def _archive_dir(name: str) -> str:
+    return os.path.join(os.path.abspath(settings.archive_path), name)
+
+
+def _sql_path(path: str) -> str:
+    return path.replace("'", "''")
+
+
+def _has_files(name: str) -> bool:
+    return bool(glob.glob(os.path.join(_archive_dir(name), "**", "*.parquet"), recursive=True))
+
+
+def ensure_views(conn):
+    """(Re)create the archive views; archived_* views only exist once something was archived"""
+    archived = []
+    if _has_files("airfare_searches"):
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW archived_airfare_searches AS
+            SELECT {_SEARCH_COLUMNS}, CAST(search_results AS JSON) AS search_results, created_month, route
+            FROM read_parquet('{_sql_path(_archive_dir("airfare_searches"))}/**/*.parquet', hive_partitioning = true)
+        """)
+        archived.append(f"SELECT {_SEARCH_COLUMNS}, TRUE AS archived FROM archived_airfare_searches")
+    if _has_files("multi_city_segments"):
+        conn.execute(f"""
+            CREATE OR REPLACE VIEW archived_multi_city_segments AS
+            SELECT id, airfare_search_id, segment_order, origin, destination, departure_date, created_month
+            FROM read_parquet('{_sql_path(_archive_dir("multi_city_segments"))}/**/*.parquet', hive_partitioning = true)
+        """)
+    union = " UNION ALL ".join([f"SELECT {_SEARCH_COLUMNS}, FALSE AS archived FROM airfare_searches"] + archived)
+    conn.execute(f"CREATE OR REPLACE VIEW all_airfare_searches AS {union}")
+    conn.commit()
+
+
+def write_batch(conn, cutoff: datetime, batch_size: int) -> Tuple[List[int], int]:
+    """
+    Copy up to batch_size searches created before cutoff, and their segments, to
+    Parquet; returns (search ids, segment count). Only reads the live tables, so
+    it can run off the event loop on its own cursor.
+    """
+    conn.execute(
+        """
+        CREATE OR REPLACE TEMP TABLE retention_batch AS
+        SELECT id, results_hash FROM airfare_searches
+        WHERE created_at < ?
+        ORDER BY id
+        LIMIT ?
+        """,
+        [cutoff, batch_size]
+    )
+    ids = [row[0] for row in conn.execute("SELECT id FROM retention_batch ORDER BY id").fetchall()]
+    if not ids:
+        return [], 0
+
+    # Parquet gets plain JSON, so decompress each referenced payload once
+    payloads = conn.execute(
+        """
+        SELECT hash, codec, payload FROM search_payloads
+        WHERE hash IN (SELECT results_hash FROM retention_batch)
+        """
+    ).fetchall()
+    conn.execute("CREATE OR REPLACE TEMP TABLE retention_payloads (hash VARCHAR, search_results VARCHAR)")
+    if payloads:
+        conn.executemany(
+            "INSERT INTO retention_payloads VALUES (?, ?)",
+            [[digest, decompress_payload(codec, payload).decode()] for digest, codec, payload in payloads]
+        )
+
+    # COPY creates the partition directories but not their parents
+    os.makedirs(_archive_dir("airfare_searches"), exist_ok=True)
+    os.makedirs(_archive_dir("multi_city_segments"), exist_ok=True)
+    conn.execute(f"""
+        COPY (
+            SELECT s.id, s.trip_id, s.user_id, s.search_type, s.origin, s.destination, s.departure_date,
+                   s.return_date, s.passengers, s.created_at,
+                   COALESCE(p.search_results, CAST(s.search_results AS VARCHAR)) AS search_results,
+                   strftime(s.created_at, '%Y-%m') AS created_month,
+                   s.origin || '-' || s.destination AS route
+            FROM airfare_searches s
+            JOIN retention_batch b ON b.id = s.id
+            LEFT JOIN retention_payloads p ON p.hash = s.results_hash
+        ) TO '{_sql_path(_archive_dir("airfare_searches"))}'
+        (FORMAT PARQUET, PARTITION_BY (created_month, route), OVERWRITE_OR_IGNORE, FILENAME_PATTERN 'part_{{uuid}}')
+    """)
+    segments = conn.execute(
+        "SELECT COUNT(*) FROM multi_city_segments WHERE airfare_search_id IN (SELECT id FROM retention_batch)"
+    ).fetchone()[0]
+    if segments:
+        conn.execute(f"""
+            COPY (
+                SELECT m.id, m.airfare_search_id, m.segment_order, m.origin, m.destination, m.departure_date,
+                       strftime(s.created_at, '%Y-%m') AS created_month
+                FROM multi_city_segments m
+                JOIN retention_batch b ON b.id = m.airfare_search_id
+                JOIN airfare_searches s ON s.id = m.airfare_search_id
+            ) TO '{_sql_path(_archive_dir("multi_city_segments"))}'
+            (FORMAT PARQUET, PARTITION_BY (created_month), OVERWRITE_OR_IGNORE, FILENAME_PATTERN 'part_{{uuid}}')
+        """)
+
+    return ids, segments
+
+
+def delete_batch(conn, ids: List[int]) -> int:
+    """
+    Delete archived searches and their segments, and the payloads only they
+    referenced; returns the number of payloads freed. Runs on the event loop's
+    connection, so no request can save a search reusing one of those payloads
+    in between.
+    """
+    hashes = [
+        row[0] for row in conn.execute(
+            "SELECT DISTINCT results_hash FROM airfare_searches WHERE id IN (SELECT UNNEST(?::INTEGER[])) AND results_hash IS NOT NULL",
+            [ids]
+        ).fetchall()
+    ]
+    # Separate statements: DuckDB checks foreign keys against the committed state
+    conn.execute("DELETE FROM multi_city_segments WHERE airfare_search_id IN (SELECT UNNEST(?::INTEGER[]))", [ids])
+    conn.execute("DELETE FROM airfare_searches WHERE id IN (SELECT UNNEST(?::INTEGER[]))", [ids])
+    freed = delete_unreferenced(conn, "SELECT UNNEST(?::VARCHAR[])", [hashes]) if hashes else 0
+    conn.commit()
+    return freed
+
+
+class RetentionJob:
+    """Periodically moves searches past the retention age from DuckDB to Parquet"""
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.archived_searches = 0
+        self.archived_segments = 0
+        self.freed_payloads = 0
+        self.last_run_at: Optional[float] = None
+        self.last_cutoff: Optional[datetime] = None
+
+    async def run_once(self, days: Optional[int] = None) -> Dict[str, int]:
+        """
+        Archive everything older than `days` (default retention_days), one batch
+        at a time. Decompressing and writing Parquet runs in a worker thread on
+        its own cursor; only the deletes run on the event loop. The Parquet files
+        are written before anything is deleted, so a failure can only leave rows
+        both archived and live, never lost.
+        """
+        self.last_run_at = time.time()
+        cutoff = datetime.now() - timedelta(days=settings.retention_days if days is None else days)
+        self.last_cutoff = cutoff
+        conn = db.connect()
+        cursor = conn.cursor()
+        totals = {"searches": 0, "segments": 0, "payloads": 0}
+        try:
+            while True:
+                ids, segments = await asyncio.to_thread(write_batch, cursor, cutoff, settings.retention_batch_size)
+                if not ids:
+                    break
+                totals["searches"] += len(ids)
+                totals["segments"] += segments
+                totals["payloads"] += delete_batch(conn, ids)
+                if len(ids) < settings.retention_batch_size:
+                    break
+        finally:
+            cursor.close()
+        if totals["searches"]:
+            ensure_views(conn)
+            logger.info("archived searches", extra={"cutoff": cutoff.isoformat(), **totals})
+        self.archived_searches += totals["searches"]
+        self.archived_segments += totals["segments"]
+        self.freed_payloads += totals["payloads"]
+        return totals
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("retention run failed")
+            await asyncio.sleep(settings.retention_interval_seconds)
+
+    def start(self):
+        ensure_views(db.connect())
+        if self._task is None and settings.retention_enabled:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "retention_days": settings.retention_days,
+            "archive_path": os.path.abspath(settings.archive_path),
+            "last_run_at": self.last_run_at,
+            "last_cutoff": self.last_cutoff,
+            "archived_searches": self.archived_searches,
+            "archived_segments": self.archived_segments,
+            "freed_payloads": self.freed_payloads
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Archive old searches to Parquet")
+    parser.add_argument("--days", type=int, help=f"Archive searches older than this (default {settings.retention_days})")
+    args = parser.parse_args(argv)
+
+    totals = asyncio.run(RetentionJob().run_once(args.days))
+    print(
+        f"archived {totals['searches']} searches and {totals['segments']} segments, "
+        f"freed {totals['payloads']} payloads"
+    )
+
+
+if __name__ == "__main__":
+    main()
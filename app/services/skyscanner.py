@@ -1,8 +1,12 @@
 import httpx
+import logging
 from typing import List, Optional, Dict, Any
 from datetime import date
 from app.config import settings
 from app.models import FlightOption
+from app.services.mock_flights import generate_flights
+
+logger = logging.getLogger(__name__)
 
 
 class SkyscannerService:
@@ -95,7 +99,7 @@ class SkyscannerService:
         
         except httpx.HTTPError as e:
             # Fallback to mock data on API errors
-            print(f"Skyscanner API error: {e}")
+            logger.warning("Skyscanner API error, using mock data: %s", e)
             return self._get_mock_flights(origin, destination, departure_date, return_date)
     
     def _parse_skyscanner_response(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
@@ -112,68 +116,15 @@ class SkyscannerService:
         departure_date: date,
         return_date: Optional[date] = None
     ) -> List[Dict[str, Any]]:
-        """Generate mock flight data for development/testing"""
-        import random
-        from datetime import datetime, timedelta
-        
-        flights = []
-        airlines = ["American Airlines", "Delta", "United", "Southwest", "JetBlue"]
-        
-        # Generate 5-10 mock flights
-        for i in range(random.randint(5, 10)):
-            departure_time = datetime.combine(
-                departure_date,
-                datetime.min.time().replace(hour=random.randint(6, 22))
-            )
-            duration_hours = random.randint(2, 12)
-            arrival_time = departure_time + timedelta(hours=duration_hours)
-            
-            flights.append({
-                "airline": random.choice(airlines),
-                "flight_number": f"{random.choice(['AA', 'DL', 'UA', 'WN', 'B6'])}{random.randint(100, 9999)}",
-                "origin": origin,
-                "destination": destination,
-                "departure_time": departure_time.isoformat(),
-                "arrival_time": arrival_time.isoformat(),
-                "duration": f"{duration_hours}h {random.randint(0, 59)}m",
-                "price": round(random.uniform(200, 1500), 2),
-                "currency": "USD",
-                "stops": random.choice([0, 0, 0, 1, 1, 2]),  # More direct flights
-                "cabin_class": "economy"
-            })
-        
-        # Sort by price
-        flights.sort(key=lambda x: x["price"])
-        
-        if return_date:
-            # Add return flights
-            return_flights = []
-            for i in range(random.randint(5, 10)):
-                departure_time = datetime.combine(
-                    return_date,
-                    datetime.min.time().replace(hour=random.randint(6, 22))
-                )
-                duration_hours = random.randint(2, 12)
-                arrival_time = departure_time + timedelta(hours=duration_hours)
-                
-                return_flights.append({
-                    "airline": random.choice(airlines),
-                    "flight_number": f"{random.choice(['AA', 'DL', 'UA', 'WN', 'B6'])}{random.randint(100, 9999)}",
-                    "origin": destination,
-                    "destination": origin,
-                    "departure_time": departure_time.isoformat(),
-                    "arrival_time": arrival_time.isoformat(),
-                    "duration": f"{duration_hours}h {random.randint(0, 59)}m",
-                    "price": round(random.uniform(200, 1500), 2),
-                    "currency": "USD",
-                    "stops": random.choice([0, 0, 0, 1, 1, 2]),
-                    "cabin_class": "economy"
-                })
-            
-            return_flights.sort(key=lambda x: x["price"])
-            return {"outbound": flights, "return": return_flights}
-        
-        return flights
+        """Deterministic mock flights for development/testing (see app/services/mock_flights.py)"""
+        return generate_flights(
+            origin,
+            destination,
+            departure_date,
+            return_date,
+            count=settings.mock_flight_offers,
+            seed=settings.mock_flight_seed
+        )
     
     async def search_multi_city(
         self,
@@ -0,0 +1,134 @@
+import json
+import math
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / "benchmarks" / "results"
+
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0-100) of an already sorted sequence"""
+    if not sorted_values:
+        return float("nan")
+    pos = (len(sorted_values) - 1) * q / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """count/mean/p50/p95/p99/max of a list of samples"""
+    values = sorted(samples)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1]
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_metadata(**config: Any) -> Dict[str, Any]:
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": config
+    }
+
+
+def write_results(name: str, data: Dict[str, Any], out_dir: Optional[Path] = None) -> Path:
+    """Save results as JSON named <name>-<commit>-<timestamp>.json"""
+    out_dir = Path(out_dir or RESULTS_DIR)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    path = out_dir / f"{name}-{data['meta'].get('commit') or 'nogit'}-{stamp}.json"
+    path.write_text(json.dumps(data, indent=2, default=str))
+    return path
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Nothing listening on port {port} after {timeout}s")
+            time.sleep(0.05)
+
+
+def start_stub(port: int, **options: Any) -> subprocess.Popen:
+    """
+    Start the local Amadeus stand-in in its own process, so generating payloads
+    does not compete with the app under test for the GIL
+    """
+    cmd = [sys.executable, "-m", "app.services.amadeus_stub", "--port", str(port)]
+    for name, value in options.items():
+        if value is not None:
+            cmd += [f"--{name.replace('_', '-')}", str(value)]
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT)
+    try:
+        wait_for_port(port)
+    except RuntimeError:
+        proc.terminate()
+        raise
+    return proc
+
+
+def stub_stats(port: int) -> Dict[str, Any]:
+    import httpx
+
+    return httpx.get(f"http://127.0.0.1:{port}/__stub/stats", timeout=5).json()["stats"]
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], metrics: Sequence[str]):
+    """Print per-key metric deltas between two result sets"""
+    print(f"\n{'name':<28}" + "".join(f"{m:>24}" for m in metrics))
+    for name in sorted(set(current) | set(baseline)):
+        row = f"{name:<28}"
+        for metric in metrics:
+            now = current.get(name, {}).get(metric)
+            before = baseline.get(name, {}).get(metric)
+            if now is None or before is None:
+                row += f"{'-':>24}"
+                continue
+            change = (now - before) / before * 100 if before else float("nan")
+            row += f"{now:>12.3f} ({change:+7.1f}%)"
+        print(row)
@@ -0,0 +1,285 @@
+"""
+End-to-end load benchmark for the airfare API.
+
+Drives app.main:app in-process (httpx ASGI transport) through a weighted mix of
+one-way/return/multi-city searches, history reads and trip CRUD, with upstream
+calls served by the local Amadeus stand-in (in a separate process). Reports
+throughput, p50/p95/p99 latency, event-loop lag and DuckDB time per endpoint,
+and saves JSON results.
+
+    python -m benchmarks.load --duration 30 --concurrency 16
+    python -m benchmarks.load --compare benchmarks/results/load-<commit>-<ts>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.common import compare, free_port, run_metadata, start_stub, stub_stats, summarize, write_results
+
+ROUTE_CODES = [
+    "JFK", "LAX", "ORD", "ATL", "SFO", "SEA", "BOS", "MIA", "DEN", "LHR",
+    "CDG", "FRA", "AMS", "MAD", "FCO", "IST", "DXB", "NRT", "SIN", "SYD"
+]
+DEFAULT_MIX = "one_way=35,return=20,multi_city=5,history=15,get_search=5,trip_create=7,trip_list=8,trip_delete=5"
+
+# Request stages app.database.TimedConnection charges DuckDB time to
+DB_STAGES = ("db_read", "db_write")
+
+
+def _duckdb_ms(server_timing: str) -> float:
+    """DuckDB time (ms) from a Server-Timing header, e.g. db_read;dur=1.20, total;dur=9.81"""
+    total = 0.0
+    for entry in server_timing.split(","):
+        name, _, params = entry.strip().partition(";")
+        if name in DB_STAGES and params.startswith("dur="):
+            total += float(params[4:])
+    return total
+
+
+class Workload:
+    """Seeded generator of requests for one virtual user"""
+    def __init__(self, seed: int, mix: Dict[str, float], state: Dict[str, List[int]]):
+        self.rng = random.Random(seed)
+        self.ops = list(mix)
+        self.weights = list(mix.values())
+        self.state = state
+        self.today = date.today()
+
+    def _route(self):
+        origin, destination = self.rng.sample(ROUTE_CODES, 2)
+        return origin, destination
+
+    def _date(self, earliest: int = 7) -> date:
+        return self.today + timedelta(days=self.rng.randint(earliest, earliest + 90))
+
+    def next(self):
+        """Return (endpoint name, method, url, json body)"""
+        op = self.rng.choices(self.ops, weights=self.weights)[0]
+        if op == "one_way":
+            origin, destination = self._route()
+            return op, "POST", "/airfare/search/one-way", {
+                "origin": origin, "destination": destination,
+                "departure_date": self._date().isoformat(), "passengers": self.rng.randint(1, 3)
+            }
+        if op == "return":
+            origin, destination = self._route()
+            departure = self._date()
+            return op, "POST", "/airfare/search/return", {
+                "origin": origin, "destination": destination,
+                "departure_date": departure.isoformat(),
+                "return_date": (departure + timedelta(days=self.rng.randint(2, 21))).isoformat(),
+                "passengers": self.rng.randint(1, 3)
+            }
+        if op == "multi_city":
+            points = self.rng.sample(ROUTE_CODES, 4)
+            day = self._date()
+            segments = []
+            for i, (origin, destination) in enumerate(zip(points, points[1:])):
+                segments.append({
+                    "origin": origin, "destination": destination,
+                    "departure_date": (day + timedelta(days=3 * i)).isoformat()
+                })
+            return op, "POST", "/airfare/search/multi-city", {"segments": segments, "passengers": 1}
+        if op == "history":
+            return op, "GET", "/airfare/searches?limit=20", None
+        if op == "get_search" and self.state["searches"]:
+            return op, "GET", f"/airfare/searches/{self.rng.choice(self.state['searches'])}", None
+        if op == "trip_create":
+            return op, "POST", "/trips", {"name": f"bench-trip-{self.rng.randint(0, 10**6)}"}
+        if op == "trip_delete" and self.state["trips"]:
+            trip_id = self.state["trips"].pop(self.rng.randrange(len(self.state["trips"])))
+            return op, "DELETE", f"/trips/{trip_id}", None
+        return "trip_list", "GET", "/trips", None
+
+
+async def _monitor_loop_lag(samples: List[float], stop: asyncio.Event, interval: float = 0.01):
+    """Record how late the event loop wakes a sleeping task (ms)"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - start - interval) * 1000)
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+    from app.main import app
+
+    mix = {
+        name: float(weight)
+        for name, weight in (item.split("=") for item in args.mix.split(","))
+    }
+    state = {"searches": [], "trips": []}
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    db_times: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    lag_samples: List[float] = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def worker(index: int, deadline: float, record: bool):
+            workload = Workload(args.seed * 1000 + index, mix, state)
+            while time.monotonic() < deadline:
+                name, method, url, body = workload.next()
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body)
+                    status = response.status_code
+                except Exception:
+                    response, status = None, 599
+                elapsed = time.perf_counter() - start
+
+                if response is not None and status < 300:
+                    if name in ("one_way", "return", "multi_city"):
+                        search_id = response.json().get("id")
+                        if search_id:
+                            state["searches"].append(search_id)
+                    elif name == "trip_create":
+                        state["trips"].append(response.json()["id"])
+                if record:
+                    latencies[name].append(elapsed * 1000)
+                    timing = response.headers.get("server-timing", "") if response is not None else ""
+                    db_times[name].append(_duckdb_ms(timing))
+                    statuses[name][status] += 1
+
+        if args.warmup > 0:
+            deadline = time.monotonic() + args.warmup
+            await asyncio.gather(*(worker(i, deadline, False) for i in range(args.concurrency)))
+
+        stop = asyncio.Event()
+        monitor = asyncio.create_task(_monitor_loop_lag(lag_samples, stop))
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(worker(i, deadline, True) for i in range(args.concurrency)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await monitor
+
+    endpoints = {}
+    for name, samples in latencies.items():
+        errors = sum(count for status, count in statuses[name].items() if status >= 400)
+        endpoints[name] = {
+            "requests": len(samples),
+            "throughput_rps": len(samples) / wall,
+            "error_rate": errors / len(samples),
+            "status_counts": dict(statuses[name]),
+            "latency_ms": summarize(samples),
+            "duckdb_ms": summarize(db_times[name]),
+            "duckdb_share": sum(db_times[name]) / sum(samples) if sum(samples) else 0.0
+        }
+    total = sum(len(s) for s in latencies.values())
+    non_2xx = sum(
+        count for counts in statuses.values() for status, count in counts.items() if not 200 <= status < 300
+    )
+    return {
+        "endpoints": endpoints,
+        "overall": {
+            "requests": total,
+            "non_2xx_share": non_2xx / total if total else 0.0,
+            "wall_seconds": wall,
+            "throughput_rps": total / wall,
+            "latency_ms": summarize([v for s in latencies.values() for v in s])
+        },
+        "event_loop_lag_ms": summarize(lag_samples)
+    }
+
+
+def _flatten(endpoints: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    return {
+        name: {
+            "rps": data["throughput_rps"],
+            "p50_ms": data["latency_ms"].get("p50"),
+            "p99_ms": data["latency_ms"].get("p99"),
+            "duckdb_p50_ms": data["duckdb_ms"].get("p50")
+        }
+        for name, data in endpoints.items()
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=3, help="Unmeasured warm-up seconds")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Weighted endpoint mix, name=weight,...")
+    parser.add_argument("--stub-offers", type=int, default=50)
+    parser.add_argument("--stub-latency-ms", type=float, default=120)
+    parser.add_argument("--stub-jitter-ms", type=float, default=60)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-throttle-rate", type=float, default=0.0)
+    parser.add_argument("--upstream-rps", type=float, default=1000, help="AmadeusService rate limit")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the per-route flight cache")
+    parser.add_argument("--database", help="DuckDB file (default: fresh temp file)")
+    parser.add_argument("--out", type=Path, help="Results directory")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to diff against")
+    args = parser.parse_args(argv)
+
+    # Settings are read at import time, so configure the app before importing it
+    stub_port = free_port()
+    db_path = args.database or os.path.join(tempfile.mkdtemp(prefix="bench-"), "bench.duckdb")
+    os.environ.update({
+        "DATABASE_PATH": db_path,
+        "AMADEUS_BASE_URL": f"http://127.0.0.1:{stub_port}",
+        "AMADEUS_CLIENT_ID": "bench",
+        "AMADEUS_CLIENT_SECRET": "bench",
+        "AMADEUS_MAX_OFFERS": str(args.stub_offers),
+        "AMADEUS_RATE_LIMIT_PER_SECOND": str(args.upstream_rps),
+        "AMADEUS_RATE_LIMIT_BURST": str(int(args.upstream_rps)),
+        "FLIGHT_CACHE_TTL_SECONDS": "0" if args.no_cache else os.environ.get("FLIGHT_CACHE_TTL_SECONDS", "900"),
+        # DuckDB time per request comes from the app's own stage timings
+        "SERVER_TIMING_HEADER": "true",
+        # Every virtual user shares the one ASGI client address, so the per-client
+        # search limit would answer nearly everything with 429
+        "RATE_LIMIT_ENABLED": "false"
+    })
+
+    stub = start_stub(
+        stub_port,
+        seed=args.seed,
+        offers=args.stub_offers,
+        latency_ms=args.stub_latency_ms,
+        latency_jitter_ms=args.stub_jitter_ms,
+        error_rate=args.stub_error_rate,
+        throttle_rate=args.stub_throttle_rate
+    )
+    try:
+        results = asyncio.run(run(args))
+        results["upstream"] = stub_stats(stub_port)
+    finally:
+        stub.terminate()
+        stub.wait()
+
+    config = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()}
+    results = {"meta": run_metadata(**config), **results}
+    path = write_results("load", results, args.out)
+
+    print(f"{'endpoint':<14}{'req':>8}{'rps':>9}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'db p50':>9}")
+    for name, data in sorted(results["endpoints"].items()):
+        lat = data["latency_ms"]
+        print(
+            f"{name:<14}{data['requests']:>8}{data['throughput_rps']:>9.1f}{data['error_rate'] * 100:>7.1f}"
+            f"{lat['p50']:>9.1f}{lat['p95']:>9.1f}{lat['p99']:>9.1f}{data['duckdb_ms']['p50']:>9.2f}"
+        )
+    overall = results["overall"]
+    lag = results["event_loop_lag_ms"]
+    print(f"\noverall: {overall['requests']} requests, {overall['throughput_rps']:.1f} req/s, "
+          f"{overall['non_2xx_share'] * 100:.1f}% non-2xx; "
+          f"event-loop lag p99 {lag.get('p99', float('nan')):.1f} ms, max {lag.get('max', float('nan')):.1f} ms")
+    print(f"results: {path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        compare(_flatten(results["endpoints"]), _flatten(baseline["endpoints"]), ["rps", "p50_ms", "p99_ms", "duckdb_p50_ms"])
+
+
+if __name__ == "__main__":
+    main()
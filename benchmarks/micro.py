@@ -0,0 +1,301 @@
+"""
+Microbenchmarks for the CPU-heavy hot paths.
+
+Covers _parse_amadeus_response on small and large payloads, json.dumps/json.loads
+of search_results, the history row-to-dict conversion, get_airline_name lookups,
+DuckDB insert/select paths, search payload compression and the mock flight
+generator itself. Inputs are generated offline by app.services.mock_flights,
+so no network or credentials are needed.
+
+Each benchmark is auto-ranged so one sample takes at least --min-sample-ms, then
+sampled --repeats times with GC disabled. Reported: median, IQR, mean with 95%
+confidence interval, min, and peak traced memory of a single call.
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter parse --repeats 30
+    python -m benchmarks.micro --compare benchmarks/results/micro-<commit>-<ts>.json
+"""
+import argparse
+import gc
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import compare, percentile, run_metadata, write_results
+
+# Registry of name -> setup(); setup returns the zero-argument callable to time
+BENCHMARKS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+DEPARTURE = date.today() + timedelta(days=30)
+RETURN = DEPARTURE + timedelta(days=7)
+
+
+def bench(name: str):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _payload(count: int, is_return: bool = False) -> Dict[str, Any]:
+    from app.services.mock_flights import generate_offers
+
+    return generate_offers("JFK", "LHR", DEPARTURE, RETURN if is_return else None, count=count)
+
+
+def _parsed(count: int, is_return: bool = False):
+    from app.services.amadeus import AmadeusService
+
+    return AmadeusService()._parse_amadeus_response(_payload(count, is_return), is_return)
+
+
+for _size, _count in (("small", 10), ("large", 250), ("xlarge", 2000)):
+    for _kind, _is_return in (("one_way", False), ("return", True)):
+        def _setup(count=_count, is_return=_is_return):
+            from app.services.amadeus import AmadeusService
+
+            service = AmadeusService()
+            data = _payload(count, is_return)
+            return lambda: service._parse_amadeus_response(data, is_return)
+        bench(f"parse.{_kind}.{_size}")(_setup)
+
+    def _dumps_setup(count=_count):
+        results = _parsed(count, True)
+        return lambda: json.dumps(results)
+    bench(f"json.dumps.{_size}")(_dumps_setup)
+
+    def _loads_setup(count=_count):
+        blob = json.dumps(_parsed(count, True))
+        return lambda: json.loads(blob)
+    bench(f"json.loads.{_size}")(_loads_setup)
+
+
+def _history_rows(rows: int, offers: int) -> List[tuple]:
+    """Rows as selected with app.api.airfare._SEARCH_FIELDS: results in search_payloads, none inline"""
+    from datetime import datetime
+    from app.services.payloads import CODEC, encode_payload
+
+    _, _, compressed = encode_payload(_parsed(offers))
+    now = datetime.now()
+    return [
+        (i, None, "one-way", "JFK", "LHR", DEPARTURE, None, 1, None, now, CODEC, compressed, None)
+        for i in range(rows)
+    ]
+
+
+@bench("history.rows_to_dicts.100x10")
+def _history_small():
+    from app.api.airfare import _search_row_to_dict
+
+    rows = _history_rows(100, 10)
+    return lambda: [_search_row_to_dict(row) for row in rows]
+
+
+@bench("history.rows_to_dicts.100x250")
+def _history_large():
+    from app.api.airfare import _search_row_to_dict
+
+    rows = _history_rows(100, 250)
+    return lambda: [_search_row_to_dict(row) for row in rows]
+
+
+@bench("airline_name.hit")
+def _airline_hit():
+    from app.services.airline_codes import AIRLINE_NAMES, get_airline_name
+
+    codes = list(AIRLINE_NAMES) * 10
+    return lambda: [get_airline_name(code) for code in codes]
+
+
+@bench("airline_name.miss")
+def _airline_miss():
+    from app.services.airline_codes import get_airline_name
+
+    codes = [f"Z{i % 10}" for i in range(600)]
+    return lambda: [get_airline_name(code) for code in codes]
+
+
+def _search_db():
+    from app.database import db
+
+    conn = db.connect()
+    user = conn.execute("SELECT id FROM users LIMIT 1").fetchone()
+    if user is None:
+        conn.execute(
+            "INSERT INTO users (username, email, hashed_password) VALUES (?, ?, ?)",
+            ["bench", "bench@example.com", "x"]
+        )
+        user = conn.execute("SELECT id FROM users LIMIT 1").fetchone()
+    conn.commit()
+    return conn, user[0]
+
+
+_INSERT_SEARCH = """
+    INSERT INTO airfare_searches
+    (trip_id, user_id, search_type, origin, destination, departure_date, passengers, search_results)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+@bench("duckdb.insert_search.250")
+def _db_insert():
+    conn, user_id = _search_db()
+    blob = json.dumps(_parsed(250))
+
+    def run():
+        conn.execute(_INSERT_SEARCH, [None, user_id, "one-way", "JFK", "LHR", DEPARTURE, 1, blob])
+        conn.commit()
+    return run
+
+
+@bench("duckdb.select_history.200")
+def _db_select():
+    conn, user_id = _search_db()
+    blob = json.dumps(_parsed(50))
+    existing = conn.execute("SELECT COUNT(*) FROM airfare_searches").fetchone()[0]
+    for _ in range(max(0, 200 - existing)):
+        conn.execute(_INSERT_SEARCH, [None, user_id, "one-way", "JFK", "LHR", DEPARTURE, 1, blob])
+    conn.commit()
+
+    def run():
+        return conn.execute(
+            """
+            SELECT id, trip_id, search_type, origin, destination, departure_date, return_date, passengers, search_results, created_at
+            FROM airfare_searches
+            WHERE user_id = ?
+            ORDER BY created_at DESC
+            """,
+            [user_id]
+        ).fetchall()
+    return run
+
+
+@bench("payload.encode.250")
+def _payload_encode():
+    from app.services.payloads import encode_payload
+
+    flights = _parsed(250)
+    return lambda: encode_payload(flights)
+
+
+@bench("payload.decode.250")
+def _payload_decode():
+    from app.services.payloads import CODEC, decode_payload, encode_payload
+
+    _, _, compressed = encode_payload(_parsed(250))
+    return lambda: decode_payload(CODEC, compressed)
+
+
+@bench("mock.offers.return.5000")
+def _mock_offers():
+    from app.services.mock_flights import generate_offers
+
+    return lambda: generate_offers("JFK", "LHR", DEPARTURE, RETURN, count=5000)
+
+
+@bench("mock.flights.return.5000")
+def _mock_flights():
+    from app.services.mock_flights import generate_flights
+
+    return lambda: generate_flights("JFK", "LHR", DEPARTURE, RETURN, count=5000)
+
+
+def _autorange(fn: Callable[[], Any], min_seconds: float) -> int:
+    """Smallest loop count (1, 2, 5, 10, 20, ...) whose run takes at least min_seconds"""
+    loops = 1
+    while True:
+        for factor in (1, 2, 5):
+            number = loops * factor
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - start >= min_seconds:
+                return number
+        loops *= 10
+
+
+def measure(fn: Callable[[], Any], repeats: int, min_sample_ms: float) -> Dict[str, float]:
+    fn()  # warm caches and lazy imports
+    loops = _autorange(fn, min_sample_ms / 1000)
+
+    samples = []
+    gc_was_enabled = gc.isenabled()
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(loops):
+                fn()
+            samples.append((time.perf_counter() - start) / loops * 1e6)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ordered = sorted(samples)
+    mean = statistics.fmean(samples)
+    stdev = statistics.stdev(samples) if len(samples) > 1 else 0.0
+    return {
+        "loops": loops,
+        "repeats": repeats,
+        "median_us": statistics.median(samples),
+        "iqr_us": percentile(ordered, 75) - percentile(ordered, 25),
+        "mean_us": mean,
+        "stdev_us": stdev,
+        "ci95_us": 1.96 * stdev / len(samples) ** 0.5,
+        "min_us": ordered[0],
+        "peak_memory_kb": peak / 1024
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=15)
+    parser.add_argument("--min-sample-ms", type=float, default=50)
+    parser.add_argument("--list", action="store_true", help="List benchmark names and exit")
+    parser.add_argument("--out", type=Path, help="Results directory")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to diff against")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+
+    # Persistence benchmarks use a throwaway database, configured before app import
+    os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="micro-"), "micro.duckdb")
+
+    results = {}
+    print(f"{'benchmark':<34}{'median':>12}{'iqr':>10}{'ci95':>10}{'min':>12}{'peak KB':>10}")
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        stats = measure(setup(), args.repeats, args.min_sample_ms)
+        results[name] = stats
+        print(
+            f"{name:<34}{stats['median_us']:>10.1f}us{stats['iqr_us']:>10.1f}{stats['ci95_us']:>10.1f}"
+            f"{stats['min_us']:>10.1f}us{stats['peak_memory_kb']:>10.1f}"
+        )
+
+    data = {"meta": run_metadata(**{k: str(v) for k, v in vars(args).items()}), "benchmarks": results}
+    path = write_results("micro", data, args.out)
+    print(f"\nresults: {path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["benchmarks"]
+        compare(results, baseline, ["median_us", "peak_memory_kb"])
+
+
+if __name__ == "__main__":
+    main()
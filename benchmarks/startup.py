@@ -0,0 +1,163 @@
+"""
+Cold-start benchmark.
+
+Each sample starts a fresh interpreter, so nothing is cached between runs:
+
+- import: time to `import app.main`
+- healthy: from spawning `uvicorn app.main:app` to the first 200 from /health
+- ready: to the first 200 from /health/ready, once background warm-up is done
+- first_search: the first one-way search after that (against the local stand-in)
+
+The database is created by an unrecorded first run, so samples measure a
+restart rather than a first install. With --importtime the slowest modules
+under app.main (python -X importtime, cumulative) are listed as well.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeats 10 --target-ms 1000 --importtime
+    python -m benchmarks.startup --compare benchmarks/results/startup-<commit>-<ts>.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import (
+    REPO_ROOT, compare, free_port, run_metadata, start_stub, summarize, write_results
+)
+
+# Time to first healthy /health. Importing FastAPI/pydantic and uvicorn alone takes
+# about a second on a small VM, so this leaves ~0.5 s for the app's own imports and startup.
+DEFAULT_TARGET_MS = 1500.0
+
+
+def _import_ms(env: Dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _import_profile(env: Dict[str, str], top: int) -> List[tuple]:
+    """(module, cumulative ms) of the slowest imports triggered by app.main"""
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules.append((name.rstrip(), int(cumulative) / 1000))
+    return sorted(modules, key=lambda item: -item[1])[:top]
+
+
+def _poll(client: httpx.Client, proc: subprocess.Popen, path: str, start: float) -> float:
+    """ms from `start` until `path` answers 200"""
+    while True:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            if client.get(path).status_code == 200:
+                return (time.perf_counter() - start) * 1000
+        except httpx.TransportError:
+            pass
+        if time.perf_counter() - start > 60:
+            raise RuntimeError(f"{path} not 200 after 60s")
+        time.sleep(0.01)
+
+
+def _serve_once(env: Dict[str, str], search: bool) -> Dict[str, float]:
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            sample = {"healthy": _poll(client, proc, "/health", start)}
+            sample["ready"] = _poll(client, proc, "/health/ready", start)
+            if search:
+                t = time.perf_counter()
+                response = client.post(
+                    "/airfare/search/one-way",
+                    json={"origin": "JFK", "destination": "LHR", "departure_date": "2030-06-01"}
+                )
+                response.raise_for_status()
+                sample["first_search"] = (time.perf_counter() - t) * 1000
+            return sample
+    finally:
+        proc.terminate()
+        proc.wait(30)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=DEFAULT_TARGET_MS, help="p50 time-to-healthy goal")
+    parser.add_argument("--no-search", action="store_true", help="Skip the first-search sample")
+    parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports")
+    parser.add_argument("--top", type=int, default=25, help="Modules listed with --importtime")
+    parser.add_argument("--out", type=Path, help="Results directory")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to diff against")
+    args = parser.parse_args(argv)
+
+    stub_port = free_port()
+    stub = start_stub(stub_port, offers=50)
+    env = dict(
+        os.environ,
+        DATABASE_PATH=os.path.join(tempfile.mkdtemp(prefix="startup-"), "startup.duckdb"),
+        AMADEUS_BASE_URL=f"http://127.0.0.1:{stub_port}",
+        AMADEUS_CLIENT_ID="bench",
+        AMADEUS_CLIENT_SECRET="bench",
+        PRICE_WATCH_ENABLED="false",
+        PREFETCH_ENABLED="false",
+        LOG_LEVEL="WARNING"
+    )
+    try:
+        _serve_once(env, search=False)  # creates the database
+        samples: Dict[str, List[float]] = {"import": [], "healthy": [], "ready": [], "first_search": []}
+        for _ in range(args.repeats):
+            samples["import"].append(_import_ms(env))
+            for name, value in _serve_once(env, search=not args.no_search).items():
+                samples[name].append(value)
+        profile = _import_profile(env, args.top) if args.importtime else []
+    finally:
+        stub.terminate()
+
+    results = {name: summarize(values) for name, values in samples.items() if values}
+    print(f"{'benchmark':<16}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}")
+    for name, stats in results.items():
+        print(f"{name:<16}{stats['p50']:>10.1f}{stats['mean']:>10.1f}{stats['max']:>10.1f}")
+    healthy = results["healthy"]["p50"]
+    verdict = "ok" if healthy <= args.target_ms else "MISSED"
+    print(f"\ntime to healthy p50 {healthy:.0f} ms, target {args.target_ms:.0f} ms: {verdict}")
+
+    if profile:
+        print(f"\n{'module':<60}{'cumulative ms':>14}")
+        for name, ms in profile:
+            print(f"{name:<60}{ms:>14.1f}")
+
+    data = {
+        "meta": run_metadata(**{k: str(v) for k, v in vars(args).items()}),
+        "benchmarks": results,
+        "imports": profile
+    }
+    path = write_results("startup", data, args.out)
+    print(f"\nresults: {path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["benchmarks"]
+        compare(results, baseline, ["p50", "mean"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Trip bulk-operation benchmark.
+
+Times the cascading trip delete for trips with a growing number of searches
+(a tenth of them multi-city with three segments, results shared through
+search_payloads) against a row-at-a-time cascade, and bulk trip creation
+against one INSERT per trip. Each sample runs on freshly seeded rows in a
+throwaway database; a second trip's history is kept alongside so deletes
+have to be selective.
+
+    python -m benchmarks.trips
+    python -m benchmarks.trips --searches 1000,10000 --repeats 5
+    python -m benchmarks.trips --compare benchmarks/results/trips-<commit>-<ts>.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.common import compare, run_metadata, summarize, write_results
+
+DEPARTURE = date.today() + timedelta(days=30)
+
+
+def _seed_trip(conn, user_id: int, searches: int) -> int:
+    """One trip with `searches` searches, set-based so seeding stays cheap"""
+    from app.services.payloads import store_payloads
+
+    trip_id = conn.execute(
+        "INSERT INTO trips (user_id, name) VALUES (?, 'bench') RETURNING id", [user_id]
+    ).fetchone()[0]
+    hashes = store_payloads(conn, [[{"id": f"offer-{i}", "price": 100.0 + i}] for i in range(20)])
+    conn.execute(
+        """
+        INSERT INTO airfare_searches
+        (trip_id, user_id, search_type, origin, destination, departure_date, passengers, results_hash)
+        SELECT ?, ?, CASE WHEN range % 10 = 0 THEN 'multi-city' ELSE 'one-way' END,
+               'JFK', 'LHR', ?, 1, list_extract(?, CAST(range % 20 + 1 AS INTEGER))
+        FROM range(?)
+        """,
+        [trip_id, user_id, DEPARTURE, hashes, searches]
+    )
+    conn.execute(
+        """
+        INSERT INTO multi_city_segments (airfare_search_id, segment_order, origin, destination, departure_date)
+        SELECT s.id, o.range, 'JFK', 'LHR', ?
+        FROM airfare_searches s, range(1, 4) o
+        WHERE s.trip_id = ? AND s.search_type = 'multi-city'
+        """,
+        [DEPARTURE, trip_id]
+    )
+    conn.commit()
+    return trip_id
+
+
+def _row_at_a_time_delete(conn, user_id: int, trip_id: int):
+    """Baseline: walk the trip's searches and delete children one search at a time"""
+    search_ids = [row[0] for row in conn.execute(
+        "SELECT id FROM airfare_searches WHERE trip_id = ?", [trip_id]
+    ).fetchall()]
+    for search_id in search_ids:
+        conn.execute("DELETE FROM multi_city_segments WHERE airfare_search_id = ?", [search_id])
+    conn.commit()
+    for search_id in search_ids:
+        conn.execute("DELETE FROM airfare_searches WHERE id = ?", [search_id])
+    conn.commit()
+    conn.execute("DELETE FROM trips WHERE id = ? AND user_id = ?", [trip_id, user_id])
+    conn.commit()
+
+
+def _one_by_one_create(conn, user_id: int, names: List[str]):
+    """Baseline: what N calls to POST /trips cost in the database"""
+    for name in names:
+        conn.execute("INSERT INTO trips (user_id, name) VALUES (?, ?)", [user_id, name])
+        conn.commit()
+        conn.execute(
+            "SELECT id, user_id, name, created_at FROM trips WHERE user_id = ? AND name = ? ORDER BY created_at DESC LIMIT 1",
+            [user_id, name]
+        ).fetchone()
+
+
+def _time(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", default="100,1000,5000", help="Searches per deleted trip, comma-separated")
+    parser.add_argument("--trips", type=int, default=2000, help="Trips per bulk create")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--out", type=Path, help="Results directory")
+    parser.add_argument("--compare", type=Path, help="Previous results JSON to diff against")
+    args = parser.parse_args(argv)
+
+    os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="trips-"), "trips.duckdb")
+    from app.api.trips import delete_trips, insert_trips
+    from app.database import db
+    from app.models import TripCreate
+
+    conn = db.connect()
+    user_id = conn.execute(
+        "INSERT INTO users (username, email, hashed_password) VALUES ('bench', 'bench@example.com', 'x') RETURNING id"
+    ).fetchone()[0]
+    conn.commit()
+    _seed_trip(conn, user_id, 1000)  # bystander history
+
+    cases: Dict[str, Callable[[], Callable[[], Any]]] = {}
+    for size in [int(n) for n in args.searches.split(",")]:
+        def set_based(size=size):
+            trip_id = _seed_trip(conn, user_id, size)
+            return lambda: delete_trips(user_id, [trip_id])
+
+        def row_at_a_time(size=size):
+            trip_id = _seed_trip(conn, user_id, size)
+            return lambda: _row_at_a_time_delete(conn, user_id, trip_id)
+
+        cases[f"delete.set_based.{size}"] = set_based
+        cases[f"delete.row_at_a_time.{size}"] = row_at_a_time
+
+    names = [f"trip-{i}" for i in range(args.trips)]
+    cases[f"create.bulk.{args.trips}"] = lambda: lambda: insert_trips(user_id, [TripCreate(name=n) for n in names])
+    cases[f"create.one_by_one.{args.trips}"] = lambda: lambda: _one_by_one_create(conn, user_id, names)
+
+    results = {}
+    print(f"{'benchmark':<34}{'p50 ms':>10}{'mean ms':>10}{'max ms':>10}")
+    for name, setup in cases.items():
+        samples = [_time(setup()) for _ in range(args.repeats)]
+        stats = summarize(samples)
+        results[name] = stats
+        print(f"{name:<34}{stats['p50']:>10.1f}{stats['mean']:>10.1f}{stats['max']:>10.1f}")
+
+    data = {"meta": run_metadata(**{k: str(v) for k, v in vars(args).items()}), "benchmarks": results}
+    path = write_results("trips", data, args.out)
+    print(f"\nresults: {path}")
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["benchmarks"]
+        compare(results, baseline, ["p50", "mean"])
+
+
+if __name__ == "__main__":
+    main()
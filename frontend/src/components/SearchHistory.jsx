@@ -8,6 +8,7 @@ function SearchHistory() {
   const [selectedTrip, setSelectedTrip] = useState('')
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState('')
+  const [results, setResults] = useState({})
 
   useEffect(() => {
     loadTrips()
@@ -35,6 +36,16 @@ function SearchHistory() {
     }
   }
 
+  // History comes without results; fetch one search's results when asked
+  const loadResults = async (searchId) => {
+    try {
+      const response = await airfareAPI.getSearch(searchId)
+      setResults((prev) => ({ ...prev, [searchId]: response.data.search_results }))
+    } catch (err) {
+      setError('Failed to load search results')
+    }
+  }
+
   const renderFlightResults = (flights) => {
     if (!flights) return <p>No results</p>
 
@@ -103,10 +114,14 @@ function SearchHistory() {
                     </p>
                   </div>
                 </div>
-                {search.search_results && (
+                {search.id in results ? (
                   <div className="search-results-summary">
-                    {renderFlightResults(search.search_results)}
+                    {renderFlightResults(results[search.id])}
                   </div>
+                ) : (
+                  <button className="btn" onClick={() => loadResults(search.id)}>
+                    Show results
+                  </button>
                 )}
               </div>
             ))}
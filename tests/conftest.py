@@ -0,0 +1,45 @@
+"""
+Settings are read when app.config is first imported, so the environment is
+pointed at a throwaway database and the local Amadeus stand-in here, before
+any test module imports the app.
+"""
+import os
+import tempfile
+
+import pytest
+
+from benchmarks.common import free_port, start_stub
+
+STUB_PORT = free_port()
+DATA_DIR = tempfile.mkdtemp(prefix="travel-planner-tests-")
+
+os.environ.update(
+    DATABASE_PATH=os.path.join(DATA_DIR, "test.duckdb"),
+    ARCHIVE_PATH=os.path.join(DATA_DIR, "archive"),
+    AMADEUS_BASE_URL=f"http://127.0.0.1:{STUB_PORT}",
+    AMADEUS_CLIENT_ID="test",
+    AMADEUS_CLIENT_SECRET="test",
+    PRICE_WATCH_ENABLED="false",
+    PREFETCH_ENABLED="false",
+    # Every test shares the TestClient's address; rate limit tests use their own clients
+    RATE_LIMIT_SEARCH_BURST="10000",
+    LOG_LEVEL="WARNING"
+)
+
+
+@pytest.fixture(scope="session")
+def amadeus_stub():
+    proc = start_stub(STUB_PORT, offers=20)
+    yield STUB_PORT
+    proc.terminate()
+    proc.wait(10)
+
+
+@pytest.fixture
+def client(amadeus_stub):
+    """The app with its lifespan running, against the stand-in"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
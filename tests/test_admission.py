@@ -0,0 +1,88 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app import admission
+from app.admission import AdmissionLimiter, AdmissionMiddleware, AdmissionRejected, route_class
+
+
+def test_route_class():
+    assert route_class("POST", "/airfare/search/one-way") == "search"
+    assert route_class("POST", "/watches/3/check") == "search"
+    assert route_class("GET", "/airfare/searches/export") == "export"
+    assert route_class("GET", "/admin/searches/export") == "export"
+    assert route_class("GET", "/jobs/abc/events") == "events"
+    assert route_class("GET", "/trips") == "default"
+    for method, path in (("GET", "/health"), ("GET", "/metrics"), ("GET", "/admin/admission"), ("OPTIONS", "/trips")):
+        assert route_class(method, path) is None
+
+
+def test_limiter_queues_then_hands_over_slots():
+    async def run():
+        limiter = AdmissionLimiter("test", limit=1, queue=1, timeout=5)
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.waiting) == (1, 1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_full"
+
+        limiter.release()
+        await waiter
+        assert (limiter.active, limiter.waiting) == (1, 0)
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_limiter_times_out_queued_requests():
+    async def run():
+        limiter = AdmissionLimiter("test", limit=1, queue=5, timeout=0.05)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "timeout"
+        assert (limiter.active, limiter.waiting) == (1, 0)
+        # The abandoned wait does not take the next released slot
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(run())
+
+
+def test_middleware_sheds_only_the_saturated_class(monkeypatch):
+    monkeypatch.setitem(admission.limiters, "search", AdmissionLimiter("search", 1, 1, 5))
+    release = asyncio.Event()
+
+    async def search(request):
+        await release.wait()
+        return JSONResponse({"ok": True})
+
+    async def trips(request):
+        return JSONResponse([])
+
+    app = AdmissionMiddleware(Starlette(routes=[
+        Route("/airfare/search/one-way", search, methods=["POST"]),
+        Route("/trips", trips)
+    ]))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            running = [asyncio.ensure_future(client.post("/airfare/search/one-way")) for _ in range(2)]
+            await asyncio.sleep(0.05)  # One admitted, one queued
+            shed = await client.post("/airfare/search/one-way")
+            other = await client.get("/trips")
+            release.set()
+            return shed, other, await asyncio.gather(*running)
+
+    shed, other, admitted = asyncio.run(run())
+    assert shed.status_code == 503
+    assert "Retry-After" in shed.headers
+    assert other.status_code == 200
+    assert [r.status_code for r in admitted] == [200, 200]
@@ -0,0 +1,14 @@
+from app.api.airfare import _SEARCH_FIELDS, _SEARCH_FROM, _search_row_to_dict
+from app.database import db
+from benchmarks.micro import _history_rows
+
+
+def test_history_fixture_rows_match_search_fields():
+    # The history benchmarks build rows by hand; they must keep up with the real SELECT
+    columns = db.connect().execute(f"SELECT {_SEARCH_FIELDS} FROM {_SEARCH_FROM} LIMIT 0").description
+    row = _history_rows(1, 5)[0]
+    assert len(row) == len(columns)
+
+    search = _search_row_to_dict(row)
+    assert len(search["search_results"]) == 5
+    assert search["segments"] is None
@@ -0,0 +1,88 @@
+import itertools
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from app.admission import route_class
+from app.client_limits import search_cost
+from app.config import settings
+from app.services.rate_limit import TokenBucket
+
+DEPARTURE = date.today() + timedelta(days=30)
+_addresses = (f"10.0.0.{i}" for i in itertools.count(1))
+
+
+@pytest.fixture
+def limited(client, monkeypatch):
+    """Headers for a fresh client with a 5-search burst that does not refill during the test"""
+    monkeypatch.setattr(settings, "rate_limit_trust_forwarded_for", True)
+    monkeypatch.setattr(settings, "rate_limit_search_burst", 5)
+    monkeypatch.setattr(settings, "rate_limit_search_per_minute", 0.01)
+    return {"X-Forwarded-For": next(_addresses)}
+
+
+def _one_way(destination: str = "LHR") -> dict:
+    return {"origin": "JFK", "destination": destination, "departure_date": DEPARTURE.isoformat()}
+
+
+def test_search_cost():
+    batch = json.dumps({"searches": [_one_way()] * 7}).encode()
+    segments = json.dumps({"segments": [_one_way(), _one_way("CDG"), _one_way("FRA")]}).encode()
+    calendar = json.dumps({"start_date": "2030-06-01", "end_date": "2030-06-10"}).encode()
+    assert search_cost("/airfare/search/batch", batch) == 7
+    assert search_cost("/airfare/search/multi-city", segments) == 3
+    assert search_cost("/jobs/multi-city", segments) == 3
+    assert search_cost("/jobs/calendar", calendar) == 10
+    assert search_cost("/airfare/search/one-way", json.dumps(_one_way()).encode()) == 1
+    assert search_cost("/airfare/search/batch", b"not json") == 1
+    assert search_cost("/jobs/calendar", b'{"start_date": "bad"}') == 1
+
+
+def test_job_submissions_are_searches():
+    assert route_class("POST", "/jobs/calendar") == "search"
+    assert route_class("POST", "/jobs/multi-city") == "search"
+    assert route_class("GET", "/jobs/abc") == "default"
+    assert route_class("DELETE", "/jobs/abc") == "default"
+
+
+def test_token_bucket_borrow():
+    bucket = TokenBucket(rate=0.0, capacity=5)
+    assert bucket.try_borrow(3)
+    assert not bucket.try_borrow(3)  # 2 left
+    full = TokenBucket(rate=0.0, capacity=5)
+    assert full.try_borrow(8)  # Larger than the capacity: allowed from full, then in debt
+    assert not full.try_acquire()
+
+
+def test_single_searches_are_limited(client, limited):
+    statuses = [
+        client.post("/airfare/search/one-way", json=_one_way(), headers=limited).status_code
+        for _ in range(6)
+    ]
+    assert statuses == [200] * 5 + [429]
+
+
+def test_batch_is_charged_per_search(client, limited):
+    batch = {"searches": [_one_way(), _one_way("CDG"), _one_way("FRA")]}
+    assert client.post("/airfare/search/batch", json=batch, headers=limited).status_code == 200
+    response = client.post("/airfare/search/batch", json=batch, headers=limited)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def test_large_batch_needs_a_full_budget(client, limited):
+    batch = {"searches": [_one_way(code) for code in ("CDG", "FRA", "AMS", "MAD", "FCO", "DUB", "ZRH")]}
+    assert client.post("/airfare/search/one-way", json=_one_way(), headers=limited).status_code == 200
+    assert client.post("/airfare/search/batch", json=batch, headers=limited).status_code == 429
+
+
+def test_calendar_jobs_are_charged_per_day(client, limited):
+    calendar = {
+        "origin": "JFK",
+        "destination": "LHR",
+        "start_date": DEPARTURE.isoformat(),
+        "end_date": (DEPARTURE + timedelta(days=3)).isoformat()
+    }
+    assert client.post("/jobs/calendar", json=calendar, headers=limited).status_code == 202
+    assert client.post("/jobs/calendar", json=calendar, headers=limited).status_code == 429
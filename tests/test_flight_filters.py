@@ -0,0 +1,85 @@
+from datetime import time
+
+import numpy as np
+
+from app.services.flight_filters import FlightQuery, apply_query, pareto_ranks, parse_duration_minutes
+
+
+def _ranks(points):
+    prices, durations = (np.array(values, dtype=np.float64) for values in zip(*points))
+    return pareto_ranks(prices, durations).tolist()
+
+
+def _brute_force_ranks(points):
+    ranks, remaining, rank = [None] * len(points), set(range(len(points))), 0
+    while remaining:
+        front = {
+            i for i in remaining
+            if not any(
+                points[j][0] <= points[i][0] and points[j][1] <= points[i][1] and points[j] != points[i]
+                for j in remaining
+            )
+        }
+        for i in front:
+            ranks[i] = rank
+        remaining -= front
+        rank += 1
+    return ranks
+
+
+def test_pareto_ranks():
+    # (price, duration)
+    points = [(100, 600), (200, 300), (150, 450), (300, 290), (120, 700), (250, 500)]
+    assert _ranks(points) == [0, 0, 0, 0, 1, 1]
+
+
+def test_identical_points_share_a_rank():
+    points = [(100, 300), (100, 300), (100, 300), (90, 400), (90, 400), (120, 350)]
+    assert _ranks(points) == [0, 0, 0, 0, 0, 1]
+
+
+def test_equal_price_or_duration_still_dominates():
+    assert _ranks([(100, 300), (100, 320), (110, 300)]) == [0, 1, 1]
+
+
+def test_pareto_ranks_match_brute_force():
+    rng = np.random.default_rng(7)
+    for _ in range(50):
+        points = [tuple(p) for p in rng.integers(1, 6, size=(int(rng.integers(1, 30)), 2)).tolist()]
+        assert _ranks(points) == _brute_force_ranks(points)
+
+
+def test_parse_duration_minutes():
+    assert parse_duration_minutes("PT5H30M") == 330
+    assert parse_duration_minutes("P1DT2H") == 1560
+    assert parse_duration_minutes("5h 30m") == 330
+    assert parse_duration_minutes("") == 0
+    assert parse_duration_minutes("garbage") == 0
+
+
+def _flight(price, duration, stops=0, airline="AA", departure="2030-06-01T08:00:00"):
+    return {
+        "id": f"{airline}{price}{duration}",
+        "price": price,
+        "duration": duration,
+        "stops": stops,
+        "airline": airline,
+        "departure_time": departure,
+        "arrival_time": departure
+    }
+
+
+def test_apply_query_filters_sorts_and_pages():
+    flights = [
+        _flight(300, "PT5H", stops=1, airline="BA", departure="2030-06-01T22:00:00"),
+        _flight(100, "PT9H", stops=2),
+        _flight(200, "PT6H"),
+        _flight(150, "PT7H", airline="DL", departure="2030-06-01T06:00:00")
+    ]
+    assert [f["price"] for f in apply_query(flights, FlightQuery(max_stops=1))] == [150, 200, 300]
+    assert [f["price"] for f in apply_query(flights, FlightQuery(sort="duration", limit=2))] == [300, 200]
+    assert [f["price"] for f in apply_query(flights, FlightQuery(exclude_airlines={"AA"}))] == [150, 300]
+    assert [f["price"] for f in apply_query(flights, FlightQuery(depart_after=time(21), depart_before=time(7)))] == [150, 300]
+    best = apply_query(flights, FlightQuery(sort="best"))
+    assert [f["pareto_rank"] for f in best] == [0, 0, 0, 0]
+    assert apply_query(flights, FlightQuery()) is flights
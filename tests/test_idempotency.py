@@ -0,0 +1,49 @@
+import uuid
+from datetime import date, timedelta
+
+from app.database import db
+
+
+def _search(days: int = 30) -> dict:
+    return {"origin": "JFK", "destination": "LHR", "departure_date": (date.today() + timedelta(days=days)).isoformat()}
+
+
+def _count(table: str) -> int:
+    return db.connect().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_repeated_key_replays_the_stored_response(client):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    first = client.post("/airfare/search/one-way", json=_search(), headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+    searches, keys = _count("airfare_searches"), _count("idempotency_keys")
+
+    replay = client.post("/airfare/search/one-way", json=_search(), headers=headers)
+    assert replay.status_code == 200
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.content == first.content
+    assert (_count("airfare_searches"), _count("idempotency_keys")) == (searches, keys)
+
+
+def test_key_reused_for_a_different_request_is_rejected(client):
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    assert client.post("/airfare/search/one-way", json=_search(30), headers=headers).status_code == 200
+
+    reused = client.post("/airfare/search/one-way", json=_search(31), headers=headers)
+    assert reused.status_code == 422
+    assert "Idempotent-Replayed" not in reused.headers
+
+
+def test_requests_without_a_key_run_every_time(client):
+    searches = _count("airfare_searches")
+    for _ in range(2):
+        response = client.post("/airfare/search/one-way", json=_search())
+        assert response.status_code == 200
+        assert "Idempotent-Replayed" not in response.headers
+    assert _count("airfare_searches") == searches + 2
+
+
+def test_overlong_key_is_rejected(client):
+    response = client.post("/airfare/search/one-way", json=_search(), headers={"Idempotency-Key": "k" * 256})
+    assert response.status_code == 400
@@ -0,0 +1,127 @@
+import itertools
+import random
+from datetime import date, datetime, timedelta
+
+from app.services.flight_filters import parse_duration_minutes
+from app.services.itinerary import dedupe_flights, k_best_merge, optimize_multi_city, top_return_itineraries
+
+
+def test_k_best_merge():
+    rows = [[1, 4, 9], [2, 3, 10], [], [0, 8]]
+    assert k_best_merge(rows, 5, key=lambda x: x) == [0, 1, 2, 3, 4]
+    assert k_best_merge(rows, 100, key=lambda x: x) == sorted(itertools.chain(*rows))
+    assert k_best_merge(rows, 3, key=lambda x: x, is_valid=lambda x: x % 2) == [1, 3, 9]
+    assert k_best_merge([], 3, key=lambda x: x) == []
+
+
+def test_dedupe_flights_keeps_cheapest_copy():
+    flights = [{"id": "a", "price": 300}, {"id": "b", "price": 100}, {"id": "a", "price": 200}]
+    assert dedupe_flights(flights) == [{"id": "b", "price": 100}, {"id": "a", "price": 200}]
+
+
+def _leg(leg_id: str, departure: str, arrival: str) -> dict:
+    return {"id": leg_id, "departure_time": departure, "arrival_time": arrival}
+
+
+def test_top_return_itineraries():
+    out_a = _leg("A", "2030-06-01T08:00:00", "2030-06-01T16:00:00")
+    out_b = _leg("B", "2030-06-01T10:00:00", "2030-06-01T18:00:00")
+    ret_x = _leg("X", "2030-06-08T09:00:00", "2030-06-08T17:00:00")
+    ret_y = _leg("Y", "2030-06-08T12:00:00", "2030-06-08T20:00:00")
+    # Returns before the outbound lands are dropped
+    early = _leg("E", "2030-06-01T12:00:00", "2030-06-01T20:00:00")
+    offers = [
+        (out_a, ret_x, 500.0, "USD"),
+        (out_a, ret_x, 450.0, "USD"),  # Same pair, cheaper fare
+        (out_a, ret_y, 520.0, "USD"),
+        (out_b, ret_x, 480.0, "USD"),
+        (out_a, early, 100.0, "USD")
+    ]
+    itineraries = top_return_itineraries(offers, k=10)
+    assert [(it["id"], it["price"]) for it in itineraries] == [("A/X", 450.0), ("B/X", 480.0), ("A/Y", 520.0)]
+    assert [it["id"] for it in top_return_itineraries(offers, k=2)] == ["A/X", "B/X"]
+
+
+def test_top_return_itineraries_match_brute_force():
+    rng = random.Random(3)
+    outbounds = [_leg(f"O{i}", f"2030-06-01T{6 + i:02d}:00:00", f"2030-06-01T{12 + i:02d}:00:00") for i in range(6)]
+    returns = [_leg(f"R{i}", f"2030-06-01T{10 + 2 * i:02d}:00:00", "2030-06-02T08:00:00") for i in range(6)]
+    offers = [(rng.choice(outbounds), rng.choice(returns), float(rng.randint(100, 999)), "USD") for _ in range(60)]
+
+    cheapest = {}
+    for outbound, inbound, price, _ in offers:
+        if inbound["departure_time"] > outbound["arrival_time"]:
+            key = f"{outbound['id']}/{inbound['id']}"
+            cheapest[key] = min(price, cheapest.get(key, price))
+    expected = sorted(cheapest.values())[:7]
+    assert [it["price"] for it in top_return_itineraries(offers, k=7)] == expected
+
+
+def _flight(flight_id: str, departure: datetime, minutes: int, price: float) -> dict:
+    return {
+        "id": flight_id,
+        "departure_time": departure.isoformat(),
+        "arrival_time": (departure + timedelta(minutes=minutes)).isoformat(),
+        "duration": f"PT{minutes // 60}H{minutes % 60}M",
+        "price": price,
+        "currency": "USD"
+    }
+
+
+def _segments(rng: random.Random, legs: int, per_leg: int) -> list:
+    results = []
+    for leg in range(legs):
+        day = date(2030, 6, 1) + timedelta(days=leg)
+        flights = [
+            _flight(
+                f"L{leg}F{i}",
+                datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randrange(0, 24 * 60, 30)),
+                rng.randrange(60, 20 * 60, 30),
+                float(rng.randint(50, 500))
+            )
+            for i in range(per_leg)
+        ]
+        results.append({"segment": {"departure_date": day.isoformat()}, "flights": flights})
+    return results
+
+
+def _brute_force(segment_results: list, k: int, objective: str, connection_minutes: int) -> list:
+    legs = [
+        [f for f in r["flights"] if f["departure_time"][:10] == r["segment"]["departure_date"]]
+        for r in segment_results
+    ]
+    costs = []
+    for chosen in itertools.product(*legs):
+        if all(
+            datetime.fromisoformat(b["departure_time"]) - datetime.fromisoformat(a["arrival_time"])
+            >= timedelta(minutes=connection_minutes)
+            for a, b in zip(chosen, chosen[1:])
+        ):
+            costs.append(sum(
+                parse_duration_minutes(f["duration"]) if objective == "duration" else f["price"] for f in chosen
+            ))
+    return sorted(costs)[:k]
+
+
+def test_optimize_multi_city_matches_brute_force():
+    rng = random.Random(11)
+    for _ in range(20):
+        segments = _segments(rng, legs=rng.randint(2, 4), per_leg=rng.randint(1, 7))
+        for objective in ("price", "duration"):
+            itineraries = optimize_multi_city(segments, k=5, objective=objective, min_connection_minutes=60)
+            field = "total_price" if objective == "price" else "total_duration_minutes"
+            assert [it[field] for it in itineraries] == _brute_force(segments, 5, objective, 60)
+
+
+def test_optimize_multi_city_respects_connections():
+    segments = [
+        {"segment": {"departure_date": "2030-06-01"}, "flights": [_flight("A", datetime(2030, 6, 1, 8), 120, 100.0)]},
+        {"segment": {"departure_date": "2030-06-01"}, "flights": [
+            _flight("tight", datetime(2030, 6, 1, 10, 30), 60, 10.0),  # 30 min after A lands
+            _flight("ok", datetime(2030, 6, 1, 12), 60, 50.0)
+        ]}
+    ]
+    itineraries = optimize_multi_city(segments, k=5, min_connection_minutes=60)
+    assert [it["id"] for it in itineraries] == ["A/ok"]
+    assert itineraries[0]["total_price"] == 150.0
+    assert optimize_multi_city([segments[0], {"segment": {}, "flights": []}]) == []
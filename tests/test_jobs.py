@@ -0,0 +1,56 @@
+import time
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+START = date.today() + timedelta(days=60)
+
+
+def _run_calendar_job(client: TestClient) -> dict:
+    response = client.post("/jobs/calendar", json={
+        "origin": "JFK",
+        "destination": "LHR",
+        "start_date": START.isoformat(),
+        "end_date": (START + timedelta(days=2)).isoformat()
+    })
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job still {job['status']} after 20s")
+
+
+def test_calendar_job_runs(client):
+    job = _run_calendar_job(client)
+    assert job["status"] == "succeeded"
+    assert job["progress_done"] == job["progress_total"] == 3
+
+
+def test_jobs_run_after_restart(amadeus_stub):
+    # Each lifespan runs on its own event loop, as in test suites and reloads
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert _run_calendar_job(client)["status"] == "succeeded"
+
+
+def test_unknown_location_is_rejected_at_submit(client):
+    jobs_before = len(client.get("/jobs").json())
+    calendar = client.post("/jobs/calendar", json={
+        "origin": "Atlantis",
+        "destination": "LHR",
+        "start_date": START.isoformat(),
+        "end_date": START.isoformat()
+    })
+    multi_city = client.post("/jobs/multi-city", json={"segments": [
+        {"origin": "JFK", "destination": "LHR", "departure_date": START.isoformat()},
+        {"origin": "LHR", "destination": "Atlantis", "departure_date": (START + timedelta(days=3)).isoformat()}
+    ]})
+    assert (calendar.status_code, multi_city.status_code) == (400, 400)
+    assert len(client.get("/jobs").json()) == jobs_before
+
@@ -0,0 +1,43 @@
+from datetime import date, timedelta
+
+import pytest
+
+from benchmarks.common import stub_stats
+from app.config import settings
+from app.database import db
+from app.services.locations import location_index
+
+
+def test_resolves_codes_and_cities():
+    assert location_index.resolve("jfk") == "JFK"
+    assert location_index.resolve("London") == "LON"
+    assert set(location_index.expand("NYC")) >= {"JFK", "LGA", "EWR"}
+
+
+@pytest.mark.parametrize("location", ["Atlantis", "", "JF", "J1K"])
+def test_unknown_locations_are_rejected(location):
+    with pytest.raises(ValueError):
+        location_index.resolve(location)
+
+
+def test_unlisted_codes_pass_through_by_default():
+    assert location_index.resolve("qqq") == "QQQ"
+
+
+def test_unlisted_codes_are_rejected_when_strict(monkeypatch):
+    monkeypatch.setattr(settings, "location_strict_codes", True)
+    with pytest.raises(ValueError):
+        location_index.resolve("QQQ")
+
+
+def test_strict_unknown_code_is_rejected_before_searching(client, amadeus_stub, monkeypatch):
+    monkeypatch.setattr(settings, "location_strict_codes", True)
+    searches_before = stub_stats(amadeus_stub)["searches"]
+    rows_before = db.connect().execute("SELECT COUNT(*) FROM airfare_searches").fetchone()[0]
+
+    response = client.post("/airfare/search/one-way", json={
+        "origin": "QQQ", "destination": "LHR", "departure_date": (date.today() + timedelta(days=30)).isoformat()
+    })
+    assert response.status_code == 400
+    assert stub_stats(amadeus_stub)["searches"] == searches_before
+    assert db.connect().execute("SELECT COUNT(*) FROM airfare_searches").fetchone()[0] == rows_before
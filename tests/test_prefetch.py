@@ -0,0 +1,79 @@
+import asyncio
+from datetime import date, timedelta
+
+from app.api.trips import get_default_user_id
+from app.config import settings
+from app.database import db
+from app.services.prefetch import PrefetchScheduler
+
+# Far enough out that no other test searches this date
+DEPARTURE = date.today() + timedelta(days=300)
+
+
+class _RecordingService:
+    has_credentials = True
+
+    def __init__(self):
+        self.searches = []
+
+    def cache_expires_in(self, *key):
+        return None
+
+    async def search_flights(self, **search):
+        self.searches.append(search)
+        return []
+
+
+async def _no_wait():
+    pass
+
+
+def _save_search(origin: str, destination: str, cabin_class: str = "ECONOMY", nearby: bool = False):
+    conn = db.connect()
+    conn.execute(
+        """
+        INSERT INTO airfare_searches
+        (user_id, search_type, origin, destination, departure_date, passengers, cabin_class, nearby)
+        VALUES (?, 'one-way', ?, ?, ?, 1, ?, ?)
+        """,
+        [get_default_user_id(), origin, destination, DEPARTURE, cabin_class, nearby]
+    )
+    conn.commit()
+
+
+def test_hot_routes_use_search_cache_keys(monkeypatch):
+    monkeypatch.setattr(settings, "prefetch_min_score", 1.5)
+    monkeypatch.setattr(settings, "prefetch_max_routes", 1000)
+    _save_search("NYC", "LHR", nearby=True)
+    _save_search("JFK", "LHR")
+    _save_search("BOS", "CDG", cabin_class="BUSINESS")
+    _save_search("BOS", "CDG", cabin_class="BUSINESS")
+
+    routes = {
+        (r.origin, r.destination, r.cabin_class): r.score
+        for r in PrefetchScheduler(_RecordingService()).hot_routes()
+        if r.departure_date == DEPARTURE
+    }
+    # JFK-LHR was searched directly and as part of NYC-LHR; LGA/EWR-LHR only once
+    assert set(routes) == {("JFK", "LHR", "ECONOMY"), ("BOS", "CDG", "BUSINESS")}
+    assert routes[("JFK", "LHR", "ECONOMY")] > 1.9
+
+
+def test_refresh_searches_each_airport_pair_in_its_cabin(monkeypatch):
+    monkeypatch.setattr(settings, "prefetch_min_score", 0.5)
+    monkeypatch.setattr(settings, "prefetch_max_routes", 1000)
+    _save_search("NYC", "SIN", cabin_class="FIRST", nearby=True)
+
+    service = _RecordingService()
+    scheduler = PrefetchScheduler(service)
+    monkeypatch.setattr(scheduler._bucket, "acquire", _no_wait)
+    asyncio.run(scheduler.run_once())
+
+    pairs = {
+        (s["origin"], s["destination"]) for s in service.searches
+        if s["departure_date"] == DEPARTURE and s["destination"] == "SIN"
+    }
+    assert pairs >= {("JFK", "SIN"), ("LGA", "SIN"), ("EWR", "SIN")}
+    assert ("NYC", "SIN") not in pairs
+    assert all(s["cabin_class"] == "FIRST" for s in service.searches if s["destination"] == "SIN")
+
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+
+from app.database import db
+from app.services.retention import RetentionJob
+
+DEPARTURE = date.today() + timedelta(days=20)
+
+
+def _search(client, destination: str) -> int:
+    response = client.post("/airfare/search/one-way", json={
+        "origin": "JFK", "destination": destination, "departure_date": DEPARTURE.isoformat()
+    })
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_old_searches_move_to_parquet(client):
+    old_id = _search(client, "BOS")
+    kept_id = _search(client, "MIA")
+    conn = db.connect()
+    conn.execute("UPDATE airfare_searches SET created_at = ? WHERE id = ?", [datetime.now() - timedelta(days=400), old_id])
+    conn.commit()
+
+    totals = asyncio.run(RetentionJob().run_once(days=365))
+    assert totals["searches"] >= 1
+
+    assert client.get(f"/airfare/searches/{old_id}").status_code == 404
+    assert client.get(f"/airfare/searches/{kept_id}").status_code == 200
+    archived = conn.execute(
+        "SELECT route, search_results FROM archived_airfare_searches WHERE id = ?", [old_id]
+    ).fetchone()
+    assert archived[0] == "JFK-BOS"
+    assert archived[1] is not None
+    # Payloads still referenced by live searches are kept
+    missing = conn.execute(
+        """
+        SELECT COUNT(*) FROM airfare_searches s
+        LEFT JOIN search_payloads p ON p.hash = s.results_hash
+        WHERE s.results_hash IS NOT NULL AND p.hash IS NULL
+        """
+    ).fetchone()[0]
+    assert missing == 0
+
+
+def test_requests_are_served_while_archiving(client, monkeypatch):
+    from app.services import retention
+
+    _search(client, "SFO")
+    conn = db.connect()
+    conn.execute("UPDATE airfare_searches SET created_at = ? WHERE destination = 'SFO'", [datetime.now() - timedelta(days=400)])
+    conn.commit()
+    slow_write = retention.write_batch
+
+    def write_batch(*args):
+        time.sleep(0.3)
+        return slow_write(*args)
+
+    monkeypatch.setattr(retention, "write_batch", write_batch)
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        await RetentionJob().run_once(days=365)
+        ticker.cancel()
+        return ticks
+
+    # The event loop keeps running while a batch is written
+    assert asyncio.run(run()) >= 10